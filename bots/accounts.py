@@ -1,21 +1,34 @@
+import os
 import random
 import logging
 import asyncio
-import json
 from typing import List, Dict, Optional
 from bson import ObjectId
 from datetime import datetime, timedelta
+from dotenv import load_dotenv
 
-from db import users, experiences, skills, education
+from storage import storage
 from llm import llm_client
+from schemas import Profile, Experience, Skill, Education
 
 # Configure logging
 logger = logging.getLogger("network-nexus-simulator")
 
+# Load environment variables
+load_dotenv()
+
+# Configuration
+PROFILE_BACKFILL_CONCURRENCY = int(os.getenv("PROFILE_BACKFILL_CONCURRENCY", "2"))  # profile sections generated at once
+
+# Profile sections every bot should have, by the collection holding them
+PROFILE_SECTIONS = ("experiences", "skills", "educations")
+
+# Background backfill task, referenced so it is not garbage collected
+_backfill_task: Optional[asyncio.Task] = None
+
 def get_existing_bot_names() -> List[str]:
     """Get names of all existing bot accounts"""
-    existing_bots = users.find({"sub": {"$regex": "^sim-"}}, {"name": 1})
-    return [bot["name"] for bot in existing_bots]
+    return [bot["name"] for bot in storage.find_bot_users(fields=["name"])]
 
 async def create_bot_account() -> Optional[str]:
     """Create a new bot account with basic profile information"""
@@ -66,43 +79,35 @@ Make it different from ALL the examples above but keep the same JSON structure.
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            # Generate profile JSON
-            profile_text = await llm_client.generate(prompt)
-            
-            # Try to parse the JSON
-            profile_data = json.loads(profile_text)
-            
-            # Validate required fields
-            if not all(key in profile_data for key in ["name", "title", "bio"]):
-                raise ValueError("Missing required fields in profile data")
+            # Generate a schema-validated profile
+            profile = await llm_client.generate_structured(prompt, Profile, template="profile")
+            if profile is None:
+                raise ValueError("No valid profile generated")
             
             # Check if the name already exists
-            existing_bot = users.find_one({"name": profile_data["name"], "sub": {"$regex": "^sim-"}})
+            existing_bot = storage.find_bot_user_by_name(profile.name)
             if existing_bot:
-                logger.warning(f"Bot name '{profile_data['name']}' already exists, retrying with a different name")
+                logger.warning(f"Bot name '{profile.name}' already exists, retrying with a different name")
                 continue
             
             # Create user in the database
             user = {
                 "sub": f"sim-{random.randint(10000, 99999)}",
-                "username": profile_data["name"].lower().replace(" ", "") + str(random.randint(100, 999)),
-                "name": profile_data["name"],
-                "title": profile_data["title"],
+                "username": profile.name.lower().replace(" ", "") + str(random.randint(100, 999)),
+                "name": profile.name,
+                "title": profile.title,
                 "avatarUrl": f"https://i.pravatar.cc/150?u={random.randint(1, 1000)}",
-                "bio": profile_data["bio"],
+                "bio": profile.bio,
                 "createdAt": datetime.now(),
                 "updatedAt": datetime.now()
             }
             
-            result = users.insert_one(user)
-            user_id = result.inserted_id
-            logger.info(f"Created bot account: {profile_data['name']} (ID: {user_id})")
+            user_id = storage.insert_user(user)
+            logger.info(f"Created bot account: {profile.name} (ID: {user_id})")
             
             # Return the user ID immediately without waiting for profile details
             return str(user_id)
             
-        except json.JSONDecodeError:
-            logger.warning(f"Failed to parse LLM response as JSON (attempt {attempt + 1}/{max_retries})")
         except ValueError as e:
             logger.warning(f"Invalid profile data: {e} (attempt {attempt + 1}/{max_retries})")
         except Exception as e:
@@ -115,13 +120,13 @@ Make it different from ALL the examples above but keep the same JSON structure.
     logger.error("Failed to create bot account after all retries")
     return None
 
-async def create_bot_experience(user_id: ObjectId) -> None:
+async def create_bot_experience(user_id: ObjectId) -> bool:
     """Create experience entries for a bot"""
     # Get user info for context
-    user = users.find_one({"_id": user_id})
+    user = storage.get_user(user_id)
     if not user:
         logger.error(f"User not found: {user_id}")
-        return
+        return False
     
     name = user.get("name", "Unknown")
     title = user.get("title", "")
@@ -170,67 +175,39 @@ Make sure the experience is realistic, diverse, and aligns with the person's pro
 
 IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or after the JSON array."""
     
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            # Generate experience data
-            experience_text = await llm_client.generate(prompt)
-            
-            # Clean up the response to ensure it's valid JSON
-            experience_text = experience_text.strip()
-            if experience_text.startswith("```json"):
-                experience_text = experience_text[7:]
-            if experience_text.endswith("```"):
-                experience_text = experience_text[:-3]
-            experience_text = experience_text.strip()
-            
-            # Try to parse the JSON
-            experience_data = json.loads(experience_text)
-            
-            # Validate that we have the expected number of experiences
-            if not isinstance(experience_data, list) or len(experience_data) < 1:
-                raise ValueError(f"Expected at least 1 experience, got {len(experience_data) if isinstance(experience_data, list) else 'non-list'}")
-            
-            # Insert each experience
+    try:
+        # Generate schema-validated experience data
+        experience_data = await llm_client.generate_structured(prompt, Experience, many=True, min_items=num_experiences, template="experience")
+        
+        if experience_data:
+            # Insert all experiences in one round trip
+            experience_entries = []
             for exp in experience_data:
-                # Convert string dates to datetime objects
-                start_date = datetime.fromisoformat(exp["startDate"])
-                end_date = datetime.fromisoformat(exp["endDate"]) if exp["endDate"] else None
-                
-                experience = {
+                experience_entries.append({
                     "user": user_id,
-                    "title": exp["title"],
-                    "company": exp["company"],
-                    "location": exp["location"],
-                    "startDate": start_date,
-                    "endDate": end_date,
-                    "current": exp["current"],
-                    "description": exp["description"],
-                    "employmentType": exp["employmentType"],
-                    "industry": exp["industry"],
+                    "title": exp.title,
+                    "company": exp.company,
+                    "location": exp.location,
+                    "startDate": exp.start_date,
+                    "endDate": exp.end_date,
+                    "current": exp.current,
+                    "description": exp.description,
+                    "employmentType": exp.employmentType,
+                    "industry": exp.industry,
                     "createdAt": datetime.now(),
                     "updatedAt": datetime.now()
-                }
-                
-                experiences.insert_one(experience)
+                })
             
-            logger.info(f"Created {len(experience_data)} experience entries for {name}")
-            return
+            storage.insert_profile_entries("experiences", experience_entries)
             
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse experience JSON (attempt {attempt + 1}/{max_retries}): {e}")
-            logger.debug(f"Raw response: {experience_text}")
-        except ValueError as e:
-            logger.warning(f"Invalid experience data (attempt {attempt + 1}/{max_retries}): {e}")
-        except Exception as e:
-            logger.error(f"Failed to create experience for {name}: {e}")
-        
-        if attempt < max_retries - 1:
-            await asyncio.sleep(1)  # Wait before retry
+            logger.info(f"Created {len(experience_data)} experience entries for {name}")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create experience for {name}: {e}")
     
-    # If all retries failed, create a fallback experience
+    # If generation failed, create a fallback experience
     try:
-        logger.warning(f"Creating fallback experience for {name} after all retries failed")
+        logger.warning(f"Creating fallback experience for {name} after generation failed")
         
         # Create a fallback experience based on the user's title
         current_time = datetime.now()
@@ -251,18 +228,20 @@ IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or
             "updatedAt": datetime.now()
         }
         
-        experiences.insert_one(experience)
+        storage.insert_profile_entries("experiences", [experience])
         logger.info(f"Created fallback experience for {name}")
+        return True
     except Exception as e:
         logger.error(f"Failed to create fallback experience for {name}: {e}")
+        return False
 
-async def create_bot_skills(user_id: ObjectId, title: str) -> None:
+async def create_bot_skills(user_id: ObjectId, title: str) -> bool:
     """Create skills entries for a bot"""
     # Get user info for context
-    user = users.find_one({"_id": user_id})
+    user = storage.get_user(user_id)
     if not user:
         logger.error(f"User not found: {user_id}")
-        return
+        return False
     
     name = user.get("name", "Unknown")
     bio = user.get("bio", "")
@@ -304,58 +283,34 @@ Make sure the skills are realistic, diverse, and align with the person's profess
 
 IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or after the JSON array."""
     
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            # Generate skills data
-            skills_text = await llm_client.generate(prompt)
-            
-            # Clean up the response to ensure it's valid JSON
-            skills_text = skills_text.strip()
-            if skills_text.startswith("```json"):
-                skills_text = skills_text[7:]
-            if skills_text.endswith("```"):
-                skills_text = skills_text[:-3]
-            skills_text = skills_text.strip()
-            
-            # Try to parse the JSON
-            skills_data = json.loads(skills_text)
-            
-            # Validate that we have the expected number of skills
-            if not isinstance(skills_data, list) or len(skills_data) < 3:
-                raise ValueError(f"Expected at least 3 skills, got {len(skills_data) if isinstance(skills_data, list) else 'non-list'}")
-            
-            # Insert each skill
+    try:
+        # Generate schema-validated skills data
+        skills_data = await llm_client.generate_structured(prompt, Skill, many=True, min_items=3, template="skills")
+        
+        if skills_data:
+            # Insert all skills in one round trip
+            skill_entries = []
             for skill in skills_data:
-                skill_entry = {
+                skill_entries.append({
                     "user": user_id,
-                    "name": skill["name"],
-                    "category": skill["category"],
+                    "name": skill.name,
+                    "category": skill.category,
                     "endorsements": random.randint(0, 20),  # Random number of endorsements
                     "endorsedBy": [],  # Empty array for endorsedBy
                     "createdAt": datetime.now(),
                     "updatedAt": datetime.now()
-                }
-                
-                skills.insert_one(skill_entry)
+                })
             
-            logger.info(f"Created {len(skills_data)} skills for {name}")
-            return
+            storage.insert_profile_entries("skills", skill_entries)
             
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse skills JSON (attempt {attempt + 1}/{max_retries}): {e}")
-            logger.debug(f"Raw response: {skills_text}")
-        except ValueError as e:
-            logger.warning(f"Invalid skills data (attempt {attempt + 1}/{max_retries}): {e}")
-        except Exception as e:
-            logger.error(f"Failed to create skills for {name}: {e}")
-        
-        if attempt < max_retries - 1:
-            await asyncio.sleep(1)  # Wait before retry
+            logger.info(f"Created {len(skills_data)} skills for {name}")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create skills for {name}: {e}")
     
-    # If all retries failed, create fallback skills
+    # If generation failed, create fallback skills
     try:
-        logger.warning(f"Creating fallback skills for {name} after all retries failed")
+        logger.warning(f"Creating fallback skills for {name} after generation failed")
         
         # Create fallback skills based on the user's title
         fallback_skills = [
@@ -369,8 +324,8 @@ IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or
         # Select 3-5 random skills
         selected_skills = random.sample(fallback_skills, min(5, max(3, len(fallback_skills))))
         
-        for skill in selected_skills:
-            skill_entry = {
+        storage.insert_profile_entries("skills", [
+            {
                 "user": user_id,
                 "name": skill["name"],
                 "category": skill["category"],
@@ -379,20 +334,22 @@ IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or
                 "createdAt": datetime.now(),
                 "updatedAt": datetime.now()
             }
-            
-            skills.insert_one(skill_entry)
+            for skill in selected_skills
+        ])
         
         logger.info(f"Created {len(selected_skills)} fallback skills for {name}")
+        return True
     except Exception as e:
         logger.error(f"Failed to create fallback skills for {name}: {e}")
+        return False
 
-async def create_bot_education(user_id: ObjectId, title: str) -> None:
+async def create_bot_education(user_id: ObjectId, title: str) -> bool:
     """Create education entries for a bot"""
     # Get user info for context
-    user = users.find_one({"_id": user_id})
+    user = storage.get_user(user_id)
     if not user:
         logger.error(f"User not found: {user_id}")
-        return
+        return False
     
     name = user.get("name", "Unknown")
     bio = user.get("bio", "")
@@ -440,67 +397,39 @@ Make sure the education is realistic, diverse, and aligns with the person's prof
 
 IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or after the JSON array."""
     
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            # Generate education data
-            education_text = await llm_client.generate(prompt)
-            
-            # Clean up the response to ensure it's valid JSON
-            education_text = education_text.strip()
-            if education_text.startswith("```json"):
-                education_text = education_text[7:]
-            if education_text.endswith("```"):
-                education_text = education_text[:-3]
-            education_text = education_text.strip()
-            
-            # Try to parse the JSON
-            education_data = json.loads(education_text)
-            
-            # Validate that we have the expected number of education entries
-            if not isinstance(education_data, list) or len(education_data) < 1:
-                raise ValueError(f"Expected at least 1 education entry, got {len(education_data) if isinstance(education_data, list) else 'non-list'}")
-            
-            # Insert each education entry
+    try:
+        # Generate schema-validated education data
+        education_data = await llm_client.generate_structured(prompt, Education, many=True, min_items=num_education, template="education")
+        
+        if education_data:
+            # Insert all education entries in one round trip
+            education_entries = []
             for edu in education_data:
-                # Convert string dates to datetime objects
-                start_date = datetime.fromisoformat(edu["startDate"])
-                end_date = datetime.fromisoformat(edu["endDate"]) if edu["endDate"] else None
-                
-                education_entry = {
+                education_entries.append({
                     "user": user_id,
-                    "school": edu["school"],
-                    "degree": edu["degree"],
-                    "fieldOfStudy": edu["fieldOfStudy"],
-                    "startDate": start_date,
-                    "endDate": end_date,
-                    "current": edu["current"],
-                    "grade": edu.get("grade"),
-                    "activities": edu.get("activities"),
-                    "description": edu.get("description"),
+                    "school": edu.school,
+                    "degree": edu.degree,
+                    "fieldOfStudy": edu.fieldOfStudy,
+                    "startDate": edu.start_date,
+                    "endDate": edu.end_date,
+                    "current": edu.current,
+                    "grade": edu.grade,
+                    "activities": edu.activities,
+                    "description": edu.description,
                     "createdAt": datetime.now(),
                     "updatedAt": datetime.now()
-                }
-                
-                education.insert_one(education_entry)
+                })
             
-            logger.info(f"Created {len(education_data)} education entries for {name}")
-            return
+            storage.insert_profile_entries("educations", education_entries)
             
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse education JSON (attempt {attempt + 1}/{max_retries}): {e}")
-            logger.debug(f"Raw response: {education_text}")
-        except ValueError as e:
-            logger.warning(f"Invalid education data (attempt {attempt + 1}/{max_retries}): {e}")
-        except Exception as e:
-            logger.error(f"Failed to create education for {name}: {e}")
-        
-        if attempt < max_retries - 1:
-            await asyncio.sleep(1)  # Wait before retry
+            logger.info(f"Created {len(education_data)} education entries for {name}")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create education for {name}: {e}")
     
-    # If all retries failed, create a fallback education entry
+    # If generation failed, create a fallback education entry
     try:
-        logger.warning(f"Creating fallback education for {name} after all retries failed")
+        logger.warning(f"Creating fallback education for {name} after generation failed")
         
         # Create a fallback education entry
         current_time = datetime.now()
@@ -522,81 +451,129 @@ IMPORTANT: Return ONLY valid JSON. Do not include any explanatory text before or
             "updatedAt": datetime.now()
         }
         
-        education.insert_one(education_entry)
+        storage.insert_profile_entries("educations", [education_entry])
         logger.info(f"Created fallback education for {name}")
+        return True
     except Exception as e:
         logger.error(f"Failed to create fallback education for {name}: {e}")
+        return False
+
+def find_missing_profile_sections(bot_ids: List[str]) -> Dict[ObjectId, List[str]]:
+    """Find which profile sections each bot lacks.
+    
+    Bots recorded as complete in the backfill progress are skipped; the rest
+    are checked with one query over all section collections.
+    """
+    object_ids = [ObjectId(bot_id) for bot_id in bot_ids]
+    completed = storage.backfill_progress(object_ids)
+    unchecked = [bot_id for bot_id in object_ids if not completed.get(bot_id, set()).issuperset(PROFILE_SECTIONS)]
+    if not unchecked:
+        return {}
+    
+    existing = storage.profile_sections(unchecked)
+    
+    missing = {}
+    for bot_id in unchecked:
+        present = existing.get(bot_id, set()) | completed.get(bot_id, set())
+        sections = [section for section in PROFILE_SECTIONS if section not in present]
+        if sections:
+            missing[bot_id] = sections
+        else:
+            # Everything is there, so later starts can skip the aggregation for this bot
+            storage.record_backfill(bot_id, list(PROFILE_SECTIONS))
+    return missing
 
-async def add_bot_profile_details(user_id: str, title: str) -> None:
-    """Add profile details (experience, skills, education) to a bot account asynchronously"""
-    user_id_obj = ObjectId(user_id)
+async def backfill_profile_sections(bot_ids: List[str]) -> None:
+    """Generate only the missing profile sections of the bots, a few at a time"""
+    missing = find_missing_profile_sections(bot_ids)
+    total = sum(len(sections) for sections in missing.values())
+    if not total:
+        logger.info("All bot profiles are complete")
+        return
     
-    # Create tasks for each profile detail type
-    tasks = [
-        create_bot_experience(user_id_obj),
-        create_bot_skills(user_id_obj, title),
-        create_bot_education(user_id_obj, title)
-    ]
+    logger.info(f"Backfilling {total} missing profile sections for {len(missing)} bots")
+    semaphore = asyncio.Semaphore(PROFILE_BACKFILL_CONCURRENCY)
+    titles = {user["_id"]: user.get("title", "") for user in storage.get_users(list(missing), ["title"])}
     
-    # Run all tasks concurrently
-    await asyncio.gather(*tasks)
+    async def backfill(bot_id: ObjectId, section: str) -> None:
+        async with semaphore:
+            if section == "experiences":
+                created = await create_bot_experience(bot_id)
+            elif section == "skills":
+                created = await create_bot_skills(bot_id, titles.get(bot_id, ""))
+            else:
+                created = await create_bot_education(bot_id, titles.get(bot_id, ""))
+            if not created:
+                return
+            # Record the finished section so an interrupted backfill resumes with the rest
+            storage.record_backfill(bot_id, [section])
     
-    logger.info(f"Completed adding profile details for bot {user_id}")
-    return f"Profile details added for bot {user_id}"
+    await asyncio.gather(*(backfill(bot_id, section) for bot_id, sections in missing.items() for section in sections))
+    logger.info(f"Completed backfilling {total} profile sections")
+
+def _log_backfill_result(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        logger.error(f"Profile backfill failed: {task.exception()}")
 
 async def get_or_create_bot_accounts(count: int = 5) -> List[str]:
     """Get existing bot accounts or create new ones if needed"""
-    # Find existing bot accounts
-    bot_accounts = list(users.find({"sub": {"$regex": "^sim-"}}))
+    # Find existing bot accounts, fetching only the fields needed at startup
+    bot_accounts = storage.find_bot_users(count, ["name", "title"])
     
     # If we have enough bot accounts, return their IDs
     if len(bot_accounts) >= count:
         logger.info(f"Found {len(bot_accounts)} existing bot accounts")
-        bot_ids = [str(account["_id"]) for account in bot_accounts[:count]]
     else:
         # Otherwise, create new bot accounts
-        bot_ids = [str(account["_id"]) for account in bot_accounts]
-        
-        # Create additional bot accounts
+        created_ids = []
         for i in range(count - len(bot_accounts)):
             logger.info(f"Creating bot account {i + 1}/{count - len(bot_accounts)}")
             bot_id = await create_bot_account()
             if bot_id:
-                bot_ids.append(bot_id)
+                created_ids.append(ObjectId(bot_id))
             else:
                 logger.error(f"Failed to create bot account {i + 1}")
+        
+        # Fetch the new accounts in one query
+        if created_ids:
+            bot_accounts.extend(storage.get_users(created_ids, ["name", "title"]))
+    
+    bot_ids = [str(account["_id"]) for account in bot_accounts]
     
     # Print names of all bot accounts
     logger.info("=== Bot Accounts ===")
-    for bot_id in bot_ids:
-        try:
-            bot_account = users.find_one({"_id": ObjectId(bot_id)})
-            if bot_account:
-                logger.info(f"Bot: {bot_account['name']} (ID: {bot_id})")
-            else:
-                logger.error(f"Could not find bot account with ID: {bot_id}")
-        except Exception as e:
-            logger.error(f"Error retrieving bot account {bot_id}: {e}")
+    for account in bot_accounts:
+        logger.info(f"Bot: {account.get('name', 'Unknown')} (ID: {account['_id']})")
     logger.info("==================")
     
-    # Add profile details asynchronously for all bots
-    profile_detail_tasks = []
-    for bot_id in bot_ids:
-        try:
-            bot_account = users.find_one({"_id": ObjectId(bot_id)})
-            if bot_account:
-                title = bot_account.get("title", "")
-                # Create a task for adding profile details
-                task = asyncio.create_task(add_bot_profile_details(bot_id, title))
-                profile_detail_tasks.append(task)
-        except Exception as e:
-            logger.error(f"Error creating profile detail task for bot {bot_id}: {e}")
+    # Generate missing experience, skills and education in the background
+    global _backfill_task
+    _backfill_task = asyncio.create_task(backfill_profile_sections(bot_ids))
+    _backfill_task.add_done_callback(_log_backfill_result)
+    
+    return bot_ids
+
+def load_bot_personas(bot_ids: List[str], recent_posts_limit: int = 3) -> Dict[str, Dict]:
+    """Load the user documents and last N posts of many bots in two queries.
+    
+    Returns a mapping of bot ID to {"user": ..., "recent_posts": [...]}, ready to
+    be passed to Bot so that creating a bot instance needs no further queries.
+    """
+    if not bot_ids:
+        return {}
+    
+    object_ids = [ObjectId(bot_id) for bot_id in bot_ids]
+    personas = {
+        str(user["_id"]): {"user": user, "recent_posts": []}
+        for user in storage.get_users(object_ids)
+    }
     
-    # Start all profile detail tasks in the background
-    if profile_detail_tasks:
-        logger.info(f"Starting {len(profile_detail_tasks)} profile detail tasks in the background")
-        # Don't await the tasks, let them run in the background
-        for task in profile_detail_tasks:
-            task.add_done_callback(lambda t: logger.info(f"Profile detail task completed: {t.result() if not t.exception() else t.exception()}"))
+    for author, recent_posts in storage.recent_posts_by_authors(object_ids, recent_posts_limit).items():
+        persona = personas.get(str(author))
+        if persona:
+            persona["recent_posts"] = recent_posts
     
-    return bot_ids 
\ No newline at end of file
+    missing = len(bot_ids) - len(personas)
+    if missing:
+        logger.warning(f"Could not find {missing} bot accounts while loading personas")
+    return personas
@@ -0,0 +1,134 @@
+import os
+import math
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, List, Optional, Set
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+TARGET_ACTIONS_PER_SECOND = float(os.getenv("TARGET_ACTIONS_PER_SECOND", "0"))  # open-loop rate, 0 for tick mode
+ARRIVAL_CURVE = os.getenv("ARRIVAL_CURVE", "poisson")  # "poisson", "diurnal" or "constant"
+DIURNAL_AMPLITUDE = float(os.getenv("DIURNAL_AMPLITUDE", "0.5"))  # relative swing of the diurnal rate
+DIURNAL_PEAK_HOUR = float(os.getenv("DIURNAL_PEAK_HOUR", "14"))  # local hour of the highest rate
+MAX_OUTSTANDING_ACTIONS = int(os.getenv("MAX_OUTSTANDING_ACTIONS", "100"))  # started actions not yet finished
+LATENESS_SAMPLES = 10000
+
+class ArrivalController:
+    """Open-loop action arrivals at a target rate.
+
+    Arrival times are drawn up front from the configured curve and do not
+    depend on how long earlier actions took, so a slow LLM or database shows
+    up as late starts and a lower achieved rate instead of silently reducing
+    the offered load. Actions are started as tasks; arrivals that find
+    MAX_OUTSTANDING_ACTIONS still running are counted as dropped, and those
+    for which no bot was eligible as unserved.
+    """
+
+    def __init__(self, rate: float = TARGET_ACTIONS_PER_SECOND, curve: str = ARRIVAL_CURVE,
+                 amplitude: float = DIURNAL_AMPLITUDE, peak_hour: float = DIURNAL_PEAK_HOUR):
+        if curve not in ("poisson", "diurnal", "constant"):
+            raise ValueError(f"Unknown arrival curve: {curve}")
+        self.rate = rate
+        self.curve = curve
+        self.amplitude = min(max(amplitude, 0.0), 1.0)
+        self.peak_hour = peak_hour
+        self.started = time.monotonic()
+        self.next_due = self.started
+        self.target_arrivals = 0.0
+        self.last_target_update = self.started
+        self.arrivals = 0
+        self.dropped = 0
+        self.unserved = 0
+        self.lateness: List[float] = []
+        self.max_lateness = 0.0
+        self.outstanding: Set[asyncio.Task] = set()
+
+    def rate_at(self, monotonic_time: float) -> float:
+        """Target arrivals per second at a point in time"""
+        if self.curve != "diurnal":
+            return self.rate
+        wall = datetime.fromtimestamp(time.time() + monotonic_time - time.monotonic())
+        hour = wall.hour + wall.minute / 60 + wall.second / 3600
+        return self.rate * (1 + self.amplitude * math.cos(2 * math.pi * (hour - self.peak_hour) / 24))
+
+    def _next_gap(self, now: float) -> float:
+        """Time from one scheduled arrival to the next"""
+        if self.curve == "constant":
+            return 1 / self.rate
+        if self.curve == "poisson":
+            return random.expovariate(self.rate)
+        # Non-homogeneous Poisson process by thinning candidates drawn at the peak rate
+        peak = self.rate * (1 + self.amplitude)
+        t = now
+        while True:
+            t += random.expovariate(peak)
+            if random.random() * peak <= self.rate_at(t):
+                return t - now
+
+    async def wait(self) -> float:
+        """Sleep until the next scheduled arrival and return how late it starts"""
+        # Yield even when behind schedule, so the actions already started get to run
+        await asyncio.sleep(max(0.0, self.next_due - time.monotonic()))
+        now = time.monotonic()
+        lateness = max(now - self.next_due, 0.0)
+        self._track_target(now)
+        self.next_due += self._next_gap(self.next_due)
+
+        self.arrivals += 1
+        self.max_lateness = max(self.max_lateness, lateness)
+        if len(self.lateness) < LATENESS_SAMPLES:
+            self.lateness.append(lateness)
+        else:
+            # Reservoir sampling keeps the percentiles representative of the whole run
+            i = random.randrange(self.arrivals)
+            if i < LATENESS_SAMPLES:
+                self.lateness[i] = lateness
+        return lateness
+
+    def _track_target(self, now: float) -> None:
+        """Integrate the target rate, to compare the achieved rate against it"""
+        self.target_arrivals += self.rate_at(now) * (now - self.last_target_update)
+        self.last_target_update = now
+
+    def start(self, action: Awaitable) -> Optional[asyncio.Task]:
+        """Run an arrived action in the background, unless too many are outstanding"""
+        if len(self.outstanding) >= MAX_OUTSTANDING_ACTIONS:
+            self.dropped += 1
+            action.close()
+            return None
+        task = asyncio.ensure_future(action)
+        self.outstanding.add(task)
+        task.add_done_callback(self.outstanding.discard)
+        return task
+
+    def skip(self) -> None:
+        """Record an arrival that found no bot eligible to act"""
+        self.unserved += 1
+
+    async def shutdown(self) -> None:
+        """Wait for the actions still running"""
+        if self.outstanding:
+            await asyncio.gather(*self.outstanding, return_exceptions=True)
+
+    def report(self) -> str:
+        """Summarize achieved versus target rate and start lateness"""
+        now = time.monotonic()
+        self._track_target(now)
+        elapsed = max(now - self.started, 1e-6)
+        samples = sorted(self.lateness)
+        p50 = samples[len(samples) // 2] if samples else 0.0
+        p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)] if samples else 0.0
+        return (
+            f"Arrivals ({self.curve}): achieved {(self.arrivals - self.dropped - self.unserved) / elapsed:.2f}/s, target {self.target_arrivals / elapsed:.2f}/s "
+            f"| late start p50 {p50 * 1000:.0f}ms, p99 {p99 * 1000:.0f}ms, max {self.max_lateness * 1000:.0f}ms "
+            f"| outstanding {len(self.outstanding)}, dropped {self.dropped}, unserved {self.unserved}"
+        )
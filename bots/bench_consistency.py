@@ -0,0 +1,74 @@
+"""Benchmark the write and read latency of each consistency profile.
+
+Runs the same inserts, counter increments and reads with every profile in
+db.CONSISTENCY_PROFILES against a scratch collection, which is dropped
+afterwards:
+
+    python bench_consistency.py --ops 2000 --concurrency 8
+"""
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from bson import ObjectId
+
+from db import LazyCollection, CONSISTENCY_PROFILES
+
+BENCH_COLLECTION = "bench_consistency"
+
+def percentile(samples: List[float], fraction: float) -> float:
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)] if samples else 0.0
+
+def run_profile(profile: str, ops: int, concurrency: int) -> Dict[str, List[float]]:
+    """Time inserts, increments of a few hot documents and point reads"""
+    collection = LazyCollection(BENCH_COLLECTION, profile)
+    hot_ids = [ObjectId() for _ in range(10)]
+    # Seed the counters durably so the increments always find their documents
+    LazyCollection(BENCH_COLLECTION, "safe").insert_many([{"_id": _id, "likes": 0} for _id in hot_ids])
+    latencies: Dict[str, List[float]] = {"insert": [], "increment": [], "read": []}
+    lock = threading.Lock()
+
+    def operation(i: int) -> None:
+        timings = []
+        start = time.perf_counter()
+        collection.insert_one({"profile": profile, "n": i, "content": "x" * 200})
+        timings.append(("insert", time.perf_counter() - start))
+        start = time.perf_counter()
+        collection.update_one({"_id": hot_ids[i % len(hot_ids)]}, {"$inc": {"likes": 1}})
+        timings.append(("increment", time.perf_counter() - start))
+        start = time.perf_counter()
+        collection.find_one({"_id": hot_ids[i % len(hot_ids)]})
+        timings.append(("read", time.perf_counter() - start))
+        with lock:
+            for kind, seconds in timings:
+                latencies[kind].append(seconds)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(operation, range(ops)))
+    return latencies
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the latency of the database consistency profiles")
+    parser.add_argument("--ops", type=int, default=1000, help="operations of each kind per profile")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent client threads")
+    parser.add_argument("--profiles", default=",".join(CONSISTENCY_PROFILES), help="comma-separated profiles to run")
+    args = parser.parse_args()
+
+    scratch = LazyCollection(BENCH_COLLECTION)
+    scratch.drop()
+    try:
+        print(f"{'profile':<8}{'operation':<11}{'p50 ms':>9}{'p99 ms':>9}{'ops/s':>9}")
+        for profile in args.profiles.split(","):
+            started = time.perf_counter()
+            latencies = run_profile(profile.strip(), args.ops, args.concurrency)
+            elapsed = time.perf_counter() - started
+            for kind, samples in latencies.items():
+                samples.sort()
+                print(f"{profile:<8}{kind:<11}{percentile(samples, 0.5) * 1000:>9.2f}{percentile(samples, 0.99) * 1000:>9.2f}"
+                      f"{len(samples) / elapsed:>9.0f}")
+    finally:
+        scratch.drop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark like increments on a few hot posts, with and without sharded counters.
+
+Many threads increment the likes of a handful of posts, first directly on
+the post documents and then through counter shards for each shard count
+given. Reports latency percentiles, throughput and the write conflicts the
+server retried, then rolls the shards up and checks the totals. Scratch
+collections are dropped afterwards:
+
+    python bench_counters.py --ops 20000 --concurrency 64 --shards 4,16
+"""
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from bson import ObjectId
+
+from db import db, LazyCollection
+from counters import ShardedCounters
+
+BENCH_POSTS = "bench_counter_posts"
+BENCH_SHARDS = "bench_counter_shards"
+
+def percentile(samples: List[float], fraction: float) -> float:
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)] if samples else 0.0
+
+def write_conflicts() -> int:
+    """Write conflicts reported by the storage engine so far"""
+    status = db.command("serverStatus")
+    return status.get("metrics", {}).get("operation", {}).get("writeConflicts", 0)
+
+def run_mode(shards: int, hot_posts: int, ops: int, concurrency: int) -> Dict[str, float]:
+    """Increment the likes of hot posts from many threads, directly or through shards"""
+    target = LazyCollection(BENCH_POSTS)
+    shard_collection = LazyCollection(BENCH_SHARDS)
+    target.drop()
+    shard_collection.drop()
+    post_ids = [ObjectId() for _ in range(hot_posts)]
+    target.insert_many([{"_id": post_id, "likes": 0} for post_id in post_ids])
+    counters: Optional[ShardedCounters] = ShardedCounters(target, shard_collection, shards) if shards else None
+
+    def increment(i: int) -> float:
+        post_id = post_ids[i % hot_posts]
+        start = time.perf_counter()
+        if counters:
+            counters.increment(post_id, "likes")
+        else:
+            target.update_one({"_id": post_id}, {"$inc": {"likes": 1}})
+        return time.perf_counter() - start
+
+    conflicts = write_conflicts()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(increment, range(ops)))
+    elapsed = time.perf_counter() - started
+    conflicts = write_conflicts() - conflicts
+
+    rollup = 0.0
+    if counters:
+        start = time.perf_counter()
+        counters.rollup()
+        rollup = time.perf_counter() - start
+    total = sum(post["likes"] for post in target.find({}, {"likes": 1}))
+    return {
+        "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99), "ops": ops / elapsed,
+        "conflicts": conflicts, "rollup": rollup, "correct": total == ops
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare direct and sharded post counters under contention")
+    parser.add_argument("--ops", type=int, default=10000, help="increments per mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client threads")
+    parser.add_argument("--hot-posts", type=int, default=3, help="posts receiving all the increments")
+    parser.add_argument("--shards", default="4,16", help="comma-separated shard counts to compare with direct increments")
+    args = parser.parse_args()
+
+    try:
+        print(f"{'mode':<10}{'p50 ms':>9}{'p99 ms':>9}{'ops/s':>9}{'conflicts':>11}{'rollup ms':>11}{'total':>8}")
+        for shards in [0] + [int(n) for n in args.shards.split(",") if n.strip()]:
+            result = run_mode(shards, args.hot_posts, args.ops, args.concurrency)
+            mode = f"{shards} shards" if shards else "direct"
+            print(f"{mode:<10}{result['p50'] * 1000:>9.2f}{result['p99'] * 1000:>9.2f}{result['ops']:>9.0f}"
+                  f"{result['conflicts']:>11}{result['rollup'] * 1000:>11.1f}{'ok' if result['correct'] else 'WRONG':>8}")
+    finally:
+        LazyCollection(BENCH_POSTS).drop()
+        LazyCollection(BENCH_SHARDS).drop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import math
+import hashlib
+from typing import Dict, Optional, Any
+
+class BloomFilter:
+    """Fixed-size Bloom filter over ObjectIds (or any str()-able key).
+
+    Sized for `capacity` keys at the given false positive rate; a false
+    positive only means a bot skips a post it has not actually liked.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: Any):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: Any) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: Any) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"size": self.size, "hashes": self.hashes, "count": self.count, "bits": bytes(self.bits)}
+
+    @classmethod
+    def from_state(cls, capacity: int, state: Dict[str, Any]) -> "BloomFilter":
+        bloom = cls(capacity)
+        bloom.size, bloom.hashes, bloom.count = state["size"], state["hashes"], state["count"]
+        bloom.bits = bytearray(state["bits"])
+        return bloom
+
+class RotatingBloomFilter:
+    """Two-generation Bloom filter with a bounded memory footprint.
+
+    When the current generation reaches its capacity it becomes the previous
+    one and a fresh filter takes over, so the oldest keys are eventually
+    forgotten instead of the false positive rate growing without bound.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01, state: Optional[Dict[str, Any]] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous: Optional[BloomFilter] = None
+        if state:
+            self.current = BloomFilter.from_state(capacity, state["current"])
+            if state.get("previous"):
+                self.previous = BloomFilter.from_state(capacity, state["previous"])
+
+    def add(self, key: Any) -> None:
+        if self.current.full:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+        self.current.add(key)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.current or (self.previous is not None and key in self.previous)
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "current": self.current.get_state(),
+            "previous": self.previous.get_state() if self.previous else None
+        }
@@ -1,21 +1,33 @@
 import random
 import logging
-import json
 import os
-from typing import List, Dict, Optional, Any
+from typing import Dict, Optional, Any
 from bson import ObjectId
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 import time
+from collections import deque
 from dotenv import load_dotenv
 
-from db import users, posts, comments, connections
-from llm import llm_client
+from storage import storage
+from llm import llm_client, persona_session
+from schemas import Content
+from context import build_comment_context
+from feed import feed_index
+from graph import social_graph
+from tracing import action_trace
+from bloom import RotatingBloomFilter
+from pregen import post_buffer
+from singleflight import shared_reads
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
 TICK_INTERVAL = int(os.getenv("TICK_INTERVAL", "30"))  # seconds between ticks
+INBOX_SIZE = int(os.getenv("INBOX_SIZE", "20"))  # max unprocessed events kept per bot
+LIKED_FILTER_CAPACITY = int(os.getenv("LIKED_FILTER_CAPACITY", "5000"))  # liked posts remembered per bot generation
+RECENT_POSTS_LIMIT = 3  # own posts given to the LLM as context
+LIKE_SAMPLE_ATTEMPTS = 5  # feed samples tried to find a post the bot has not liked yet
 
 # Configure logging
 logger = logging.getLogger("network-nexus-simulator")
@@ -28,99 +40,141 @@ def get_current_time():
 # Store the simulator start time
 simulator_start_time = time.time()
 
+def current_tick() -> int:
+    """Current tick number, the unit of the bots' cooldowns"""
+    return int(time.time() / TICK_INTERVAL)
+
 class Bot:
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, state: Optional[Dict[str, Any]] = None,
+                 persona: Optional[Dict[str, Any]] = None):
         self.user_id = user_id
-        self.user = users.find_one({"_id": ObjectId(user_id)})
-        self.name = self.user.get("name", "Unknown")
-        self.recent_posts = []
-        self.load_recent_posts()
+        
+        # Events routed to this bot by the change stream router
+        self.inbox = deque(maxlen=INBOX_SIZE)
         
         # Cooldown tracking
         self.last_post_time = 0
         self.last_comment_time = 0
         self.post_cooldown = random.randint(5, 15)  # Random cooldown between 5-15 ticks
         self.comment_cooldown = random.randint(3, 10)  # Random cooldown between 3-10 ticks
+        
+        # Posts this bot already liked, checked in memory instead of the database
+        self.liked_posts = RotatingBloomFilter(LIKED_FILTER_CAPACITY)
+        
+        if state:
+            # Resume from a checkpoint without touching the database
+            self.restore_state(state)
+        elif persona:
+            # Use the user and recent posts loaded in bulk at startup
+            self.user = persona["user"]
+            self.recent_posts = persona["recent_posts"]
+        else:
+            self.user = storage.get_user(ObjectId(user_id))
+            self.recent_posts = []
+            self.load_recent_posts()
+        self.name = self.user.get("name", "Unknown")
+        
+        # Stable persona prefix reused by all of this bot's generations
+        self.session = persona_session(self.user)
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Get the bot state to checkpoint"""
+        return {
+            "user": self.user,
+            "recent_posts": self.recent_posts,
+            "inbox": list(self.inbox),
+            "last_post_time": self.last_post_time,
+            "last_comment_time": self.last_comment_time,
+            "post_cooldown": self.post_cooldown,
+            "comment_cooldown": self.comment_cooldown,
+            "liked_posts": self.liked_posts.get_state()
+        }
+    
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """Restore the bot state from a checkpoint"""
+        self.user = state["user"]
+        self.recent_posts = state.get("recent_posts", [])
+        self.inbox.extend(state.get("inbox", []))
+        self.last_post_time = state.get("last_post_time", self.last_post_time)
+        self.last_comment_time = state.get("last_comment_time", self.last_comment_time)
+        self.post_cooldown = state.get("post_cooldown", self.post_cooldown)
+        self.comment_cooldown = state.get("comment_cooldown", self.comment_cooldown)
+        if state.get("liked_posts"):
+            self.liked_posts = RotatingBloomFilter(LIKED_FILTER_CAPACITY, state=state["liked_posts"])
     
-    def load_recent_posts(self, limit: int = 3):
+    def next_eligible_tick(self, action: str) -> int:
+        """First tick at which an action is off cooldown for this bot"""
+        if action == "create_post":
+            return self.last_post_time + self.post_cooldown
+        if action == "comment_on_post":
+            return self.last_comment_time + self.comment_cooldown
+        return 0
+    
+    def is_on_cooldown(self, action: str) -> bool:
+        """Check whether an action is still on cooldown for this bot"""
+        return current_tick() < self.next_eligible_tick(action)
+    
+    def load_recent_posts(self, limit: int = RECENT_POSTS_LIMIT):
         """Load the bot's recent posts"""
-        self.recent_posts = list(posts.find({"author": ObjectId(self.user_id)}).sort("timestamp", -1).limit(limit))
+        self.recent_posts = storage.posts_by_author(ObjectId(self.user_id), limit)
     
     async def send_connection_request(self) -> bool:
-        """Send a connection request to a random user"""
-        # Get a random user that the bot is not already connected to
-        existing_connections = list(connections.find({
-            "$or": [
-                {"from": ObjectId(self.user_id)},
-                {"to": ObjectId(self.user_id)}
-            ]
-        }))
-        
-        connected_user_ids = [conn["to"] for conn in existing_connections if conn["from"] == ObjectId(self.user_id)]
-        connected_user_ids.extend([conn["from"] for conn in existing_connections if conn["to"] == ObjectId(self.user_id)])
-        
-        # Add the bot's own ID to exclude it
+        """Send a connection request to a user recommended by the social graph"""
         bot_id = ObjectId(self.user_id)
-        connected_user_ids.append(bot_id)
-        
-        logger.info(f"{self.name} (ID: {self.user_id}) - Current connections: {[str(id) for id in connected_user_ids]}")
         
-        # Find a random user that is not in the connected list
-        potential_connections = list(users.find({
-            "_id": {"$nin": connected_user_ids}
-        }))
-        
-        if not potential_connections:
+        # Pick a friend-of-friend or a well-connected user the bot is not linked to yet
+        target_id = social_graph.recommend(bot_id)
+        if target_id is None:
             logger.info(f"{self.name} has no more users to connect with")
             return False
         
-        target_user = random.choice(potential_connections)
-        target_id = str(target_user["_id"])
-        
-        logger.info(f"{self.name} (ID: {self.user_id}) - Selected target: {target_user.get('name', 'Unknown')} (ID: {target_id})")
+        logger.debug("%s (ID: %s) - Selected target: %s", self.name, self.user_id, target_id,
+                     extra={"category": "connections"})
         
         # Create a connection request
         current_time = get_current_time()
         connection = {
             "from": bot_id,
-            "to": target_user["_id"],
+            "to": target_id,
             "status": "pending",
             "createdAt": current_time,
             "updatedAt": current_time
         }
         
         try:
-            connections.insert_one(connection)
-            logger.info(f"{self.name} sent a connection request to {target_user.get('name', 'Unknown')}")
+            connection_id = storage.insert_connection(connection)
+            social_graph.add_link(bot_id, target_id)
+            action_trace.record("send_connection_request", self.user_id, _id=connection_id, to=target_id)
+            logger.info(f"{self.name} sent a connection request to user {target_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to send connection request: {e}")
             return False
     
-    async def accept_connection_request(self) -> bool:
-        """Accept a pending connection request"""
-        # Get pending connection requests for this bot
-        pending_requests = list(connections.find({
-            "to": ObjectId(self.user_id),
-            "status": "pending"
-        }))
-        
-        if not pending_requests:
-            logger.info(f"{self.name} has no pending connection requests")
-            return False
+    async def accept_connection_request(self, request: Optional[Dict] = None) -> bool:
+        """Accept a pending connection request, either the given one or a random one"""
+        if request is None:
+            # Get pending connection requests for this bot
+            pending_requests = storage.pending_requests(ObjectId(self.user_id))
+            
+            if not pending_requests:
+                logger.info(f"{self.name} has no pending connection requests")
+                return False
+            
+            # Accept a random request
+            request = random.choice(pending_requests)
         
-        # Accept a random request
-        request = random.choice(pending_requests)
-        from_user = users.find_one({"_id": request["from"]})
+        from_user = await shared_reads.read("users", ("name", request["from"]), lambda: storage.get_user(request["from"], ["name"]))
         from_user_name = from_user.get("name", "Unknown") if from_user else "Unknown"
         
         try:
-            # Update the connection status
-            connections.update_one(
-                {"_id": request["_id"]},
-                {"$set": {"status": "accepted", "updatedAt": get_current_time()}}
-            )
+            # Update the connection status, unless it was handled in the meantime
+            if not storage.accept_request(request["_id"], get_current_time()):
+                logger.info(f"{self.name} found the connection request from {from_user_name} already handled")
+                return False
             
+            social_graph.add_link(request["from"], ObjectId(self.user_id), accepted=True)
+            action_trace.record("accept_connection_request", self.user_id, _id=request["_id"])
             logger.info(f"{self.name} accepted a connection request from {from_user_name}")
             return True
         except Exception as e:
@@ -130,40 +184,15 @@ class Bot:
     async def create_post(self) -> Optional[str]:
         """Create a new post"""
         # Check cooldown
-        current_tick = int(time.time() / TICK_INTERVAL)
-        if current_tick - self.last_post_time < self.post_cooldown:
-            logger.info(f"{self.name} is still on post cooldown ({self.post_cooldown - (current_tick - self.last_post_time)} ticks remaining)")
+        tick = current_tick()
+        if tick < self.next_eligible_tick("create_post"):
+            logger.info(f"{self.name} is still on post cooldown ({self.next_eligible_tick('create_post') - tick} ticks remaining)")
             return None
             
-        # Generate post content using LLM
-        context = ""
-        if self.recent_posts:
-            context = "Here are my recent posts for context:\n"
-            for post in self.recent_posts:
-                context += f"- {post.get('content', '')}\n"
-            context += "\nNow, write a new post that is different from these but maintains a similar style and interests."
-        
-        # Include the bot's bio and title in the context
-        bot_bio = self.user.get("bio", "")
-        bot_title = self.user.get("title", "")
-        
-        prompt = f"""You are {self.name}, {bot_title}.
-Your bio: {bot_bio}
-
-{context}
-Write a short, engaging social media post about a topic related to your professional background.
-It can be something you learned today or something that happened at work.
-You can also write about the project you are working on or something you are passionate about.
-Avoid using hashtags or @ mentions.
-Keep your response concise and professional yet casual but you may use humour and emojis when applicable.
-
-Return ONLY a valid JSON object with this exact format:
-{{"content": "your post text here"}}"""
-        
-        content_json = await llm_client.generate(prompt, max_tokens=100)
-        
-        # Clean up and extract the text content from the JSON response
-        content = self._extract_content_from_json(content_json)
+        # Use a post generated ahead of time with idle LLM capacity, or generate one now
+        content = post_buffer.take(self.user_id)
+        if content is None:
+            content = await self.generate_post_content() or self._fallback_content()
         
         # Create the post
         current_time = get_current_time()
@@ -178,126 +207,89 @@ Return ONLY a valid JSON object with this exact format:
         }
         
         try:
-            result = posts.insert_one(post)
+            post_id = storage.insert_post(post)
+            action_trace.record("create_post", self.user_id, _id=post_id, content=content)
             logger.info(f"{self.name} created a post: {content[:30]}...")
             
             # Update recent posts
             self.load_recent_posts()
             
             # Update cooldown
-            self.last_post_time = current_tick
+            self.last_post_time = tick
             self.post_cooldown = random.randint(5, 15)  # Reset cooldown
             
-            return str(result.inserted_id)
+            return str(post_id)
         except Exception as e:
             logger.error(f"Failed to create post: {e}")
             return None
             
-    def _extract_content_from_json(self, json_str: str) -> str:
-        """Extract content from JSON response with robust error handling"""
-        # First try to parse as JSON
-        try:
-            content_data = json.loads(json_str)
-            # Check if the content is in the expected format
-            if isinstance(content_data, dict) and "content" in content_data:
-                if isinstance(content_data["content"], dict) and "text" in content_data["content"]:
-                    return content_data["content"]["text"]
-                else:
-                    return content_data["content"]
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}, Response: {json_str}")
-        
-        # If JSON parsing failed, try to extract content using regex
-        import re
-        
-        # Try to extract content between quotes after "content":
-        content_match = re.search(r'"content"\s*:\s*"([^"]*)"', json_str)
-        if content_match and len(content_match.group(1)) > 5:  # Only use if content is meaningful
-            return content_match.group(1)
-        
-        # Try to extract content between quotes at the beginning
-        content_match = re.search(r'^"([^"]*)"', json_str)
-        if content_match and len(content_match.group(1)) > 5:  # Only use if content is meaningful
-            return content_match.group(1)
-        
-        # If all else fails, clean up the response and use it as is
-        # Remove any JSON-like structure
-        cleaned = re.sub(r'^\s*{\s*"content"\s*:\s*"', '', json_str)
-        cleaned = re.sub(r'"\s*}\s*$', '', cleaned)
-        cleaned = re.sub(r'\\"', '"', cleaned)
-        
-        # If the cleaned string is too short or empty, generate a fallback message
-        if len(cleaned.strip()) < 10 or cleaned.strip() in ["Couldn", "I couldn", "I can't"]:
-            # Generate a more specific fallback based on the bot's profile
-            bot_title = self.user.get("title", "their field")
-            bot_name = self.user.get("name", "Unknown")
-            
-            fallbacks = [
-                f"{bot_name} shared an update about their work in {bot_title}.",
-                f"{bot_name} is working on an interesting project in {bot_title}.",
-                f"{bot_name} learned something new about {bot_title} today.",
-                f"{bot_name} is excited about recent developments in {bot_title}."
-            ]
-            
-            return random.choice(fallbacks)
+    async def generate_post_content(self) -> Optional[str]:
+        """Generate the text of a new post, or None if generation failed"""
+        # Generate post content using LLM
+        context = ""
+        if self.recent_posts:
+            context = "Here are my recent posts for context:\n"
+            for post in self.recent_posts:
+                context += f"- {post.get('content', '')}\n"
+            context += "\nNow, write a new post that is different from these but maintains a similar style and interests."
+        
+        # The bot's name, title and bio are part of its persona session
+        prompt = f"""{context}
+Write a short, engaging social media post about a topic related to your professional background.
+It can be something you learned today or something that happened at work.
+You can also write about the project you are working on or something you are passionate about.
+Avoid using hashtags or @ mentions.
+Keep your response concise and professional yet casual but you may use humour and emojis when applicable.
+
+Return ONLY a valid JSON object with this exact format:
+{{"content": "your post text here"}}"""
         
-        return cleaned
+        generated = await llm_client.generate_structured(prompt, Content, max_tokens=100, session=self.session, template="post")
+        return generated.content if generated else None
     
-    async def comment_on_post(self) -> Optional[str]:
-        """Comment on a random post, with preference for fresher posts"""
-        # Check cooldown
-        current_tick = int(time.time() / TICK_INTERVAL)
-        if current_tick - self.last_comment_time < self.comment_cooldown:
-            logger.info(f"{self.name} is still on comment cooldown ({self.comment_cooldown - (current_tick - self.last_comment_time)} ticks remaining)")
-            return None
-            
-        # Get posts sorted by timestamp (newest first), excluding the bot's own posts
-        all_posts = list(posts.find({"author": {"$ne": ObjectId(self.user_id)}}).sort("timestamp", -1))
+    def _fallback_content(self) -> str:
+        """Generic content based on the bot's profile, used when generation fails"""
+        bot_title = self.user.get("title", "their field")
+        bot_name = self.user.get("name", "Unknown")
+        
+        fallbacks = [
+            f"{bot_name} shared an update about their work in {bot_title}.",
+            f"{bot_name} is working on an interesting project in {bot_title}.",
+            f"{bot_name} learned something new about {bot_title} today.",
+            f"{bot_name} is excited about recent developments in {bot_title}."
+        ]
         
-        if not all_posts:
+        return random.choice(fallbacks)
+    
+    def _choose_post_to_comment_on(self) -> Optional[Dict]:
+        """Choose a random post by someone else, with preference for fresher posts"""
+        # Sample from the shared in-memory feed index instead of querying all posts
+        post = feed_index.sample_recent(exclude_author=ObjectId(self.user_id))
+        if post is None:
             logger.info(f"{self.name} found no posts to comment on")
+        return post
+    
+    async def comment_on_post(self, post: Optional[Dict] = None, reply: bool = False) -> Optional[str]:
+        """Comment on the given post, or a random post with preference for fresher posts.
+
+        With reply set the bot answers the comments on its own post instead.
+        """
+        # Check cooldown
+        tick = current_tick()
+        if tick < self.next_eligible_tick("comment_on_post"):
+            logger.info(f"{self.name} is still on comment cooldown ({self.next_eligible_tick('comment_on_post') - tick} ticks remaining)")
             return None
         
-        # Implement weighted selection to favor newer posts
-        # Posts are already sorted by timestamp (newest first)
-        # We'll use a weighted random selection where newer posts have higher weights
-        
-        # Calculate weights based on post age
-        current_time = get_current_time()
-        weights = []
-        for post in all_posts:
-            # Calculate age in hours
-            post_time = post.get("timestamp", current_time)
-            
-            # Ensure post_time is timezone-aware
-            if post_time.tzinfo is None:
-                # If post_time is naive, make it timezone-aware by assuming UTC
-                post_time = post_time.replace(tzinfo=timezone.utc)
-                
-            age_hours = (current_time - post_time).total_seconds() / 3600
-            
-            # Weight formula: 1 / (1 + age_hours)
-            # This gives higher weights to newer posts
-            # We add 1 to avoid division by zero and to ensure all posts have a chance
-            weight = 1 / (1 + age_hours)
-            weights.append(weight)
-        
-        # Normalize weights to sum to 1
-        total_weight = sum(weights)
-        if total_weight > 0:
-            normalized_weights = [w / total_weight for w in weights]
-        else:
-            # Fallback to uniform weights if all weights are zero
-            normalized_weights = [1.0 / len(weights)] * len(weights)
-        
-        # Select a post using weighted random choice
-        post = random.choices(all_posts, weights=normalized_weights, k=1)[0]
+        if post is None:
+            post = self._choose_post_to_comment_on()
+            if post is None:
+                return None
         
         # Get existing comments on this post
-        post_comments = list(comments.find({"post": post["_id"]}).sort("createdAt", 1))
+        post_comments = await shared_reads.read("comments", ("thread", post["_id"]), lambda: storage.post_comments(post["_id"]))
         
-        # Skip if this is the bot's own post
-        if post.get("author") == ObjectId(self.user_id):
+        # Skip if this is the bot's own post, unless replying to its commenters
+        if post.get("author") == ObjectId(self.user_id) and not reply:
             logger.info(f"{self.name} skipped commenting on their own post")
             return None
         
@@ -307,35 +299,32 @@ Return ONLY a valid JSON object with this exact format:
             return None
         
         # Get the post author's info for context
-        post_author = users.find_one({"_id": post.get("author")})
+        post_author = await shared_reads.read("users", ("user", post.get("author")), lambda: storage.get_user(post.get("author")))
         post_author_name = post_author.get("name", "Unknown") if post_author else "Unknown"
         post_author_title = post_author.get("title", "") if post_author else ""
         post_author_bio = post_author.get("bio", "") if post_author else ""
         
-        # Include the bot's bio in the context
-        bot_bio = self.user.get("bio", "")
-        bot_title = self.user.get("title", "")
-        
-        # Generate comment content using LLM
+        # Generate comment content using LLM; the bot's own profile is part of its persona session
         context = f"""Original post by {post_author_name} ({post_author_title}): {post.get('content', '')}
 
 Post author's background:
 Title: {post_author_title}
 Bio: {post_author_bio}
 
-Your profile: {self.name} - {bot_title}
-Your bio: {bot_bio}
-
 """
         if post_comments:
-            context += "Existing comments:\n"
-            for comment in post_comments:
-                comment_author = users.find_one({"_id": comment["author"]})
-                author_name = comment_author.get("name", "Unknown") if comment_author else "Unknown"
-                context += f"- {author_name}: {comment.get('content', '')}\n"
-        
-        prompt = f"""You are {self.name}, {bot_title}. {context}
-Write a relevant, professional comment on this post. Focus on the topic and avoid using hashtags or @ mentions.
+            # Look up all commenter names at once
+            author_ids = sorted({comment["author"] for comment in post_comments})
+            commenters = await shared_reads.read("users", ("names", *author_ids), lambda: storage.get_users(author_ids, ["name"]))
+            author_names = {author["_id"]: author.get("name", "Unknown") for author in commenters}
+            lines = [f"- {author_names.get(comment['author'], 'Unknown')}: {comment.get('content', '')}" for comment in post_comments]
+            
+            # Keep the prompt within budget, summarizing older comments on long threads
+            context += await build_comment_context(post["_id"], post.get("content", ""), lines)
+        
+        task = "Write a reply to the latest comments on your post." if reply else "Write a relevant, professional comment on this post."
+        prompt = f"""{context}
+{task} Focus on the topic and avoid using hashtags or @ mentions.
 
 IMPORTANT GUIDELINES:
 - You can engage with the post author's background or expertise if relevant, but do it naturally
@@ -349,10 +338,8 @@ IMPORTANT GUIDELINES:
 Return ONLY a valid JSON object with this exact format:
 {{"content": "your comment text here"}}"""
         
-        content_json = await llm_client.generate(prompt, max_tokens=50)
-        
-        # Clean up and extract the text content from the JSON response
-        content = self._extract_content_from_json(content_json)
+        generated = await llm_client.generate_structured(prompt, Content, max_tokens=50, session=self.session, template="comment")
+        content = generated.content if generated else self._fallback_content()
         
         # Create the comment
         current_time = get_current_time()
@@ -365,42 +352,47 @@ Return ONLY a valid JSON object with this exact format:
         }
         
         try:
-            result = comments.insert_one(comment)
+            comment_id = storage.insert_comment(comment)
+            shared_reads.invalidate("comments")
             
             # Update post comment count
-            posts.update_one(
-                {"_id": post["_id"]},
-                {"$inc": {"comments": 1}}
-            )
+            storage.increment_post_counter(post["_id"], "comments")
+            action_trace.record("comment_on_post", self.user_id, _id=comment_id, post=post["_id"], content=content)
             
             logger.info(f"{self.name} commented on a post: {content[:20]}...")
             
             # Update cooldown
-            self.last_comment_time = current_tick
+            self.last_comment_time = tick
             self.comment_cooldown = random.randint(3, 10)  # Reset cooldown
             
-            return str(result.inserted_id)
+            return str(comment_id)
         except Exception as e:
             logger.error(f"Failed to comment on post: {e}")
             return None
     
-    async def like_post(self) -> bool:
-        """Like a random post"""
-        # Get a random post (excluding the bot's own posts)
-        all_posts = list(posts.find({"author": {"$ne": ObjectId(self.user_id)}}))
-        
-        if not all_posts:
-            logger.info(f"{self.name} found no posts to like")
+    async def like_post(self, post: Optional[Dict] = None) -> bool:
+        """Like the given post, or a random one, unless the bot already liked it"""
+        if post is None:
+            # Get a random post (excluding the bot's own and already liked posts) from the shared feed index
+            for _ in range(LIKE_SAMPLE_ATTEMPTS):
+                post = feed_index.sample(exclude_author=ObjectId(self.user_id))
+                if post is None or post["_id"] not in self.liked_posts:
+                    break
+            else:
+                post = None
+            
+            if post is None:
+                logger.info(f"{self.name} found no posts to like")
+                return False
+        elif post["_id"] in self.liked_posts:
+            logger.info(f"{self.name} already liked this post")
             return False
         
-        post = random.choice(all_posts)
-        
         try:
             # Increment likes count
-            posts.update_one(
-                {"_id": post["_id"]},
-                {"$inc": {"likes": 1}}
-            )
+            storage.increment_post_counter(post["_id"], "likes")
+            self.liked_posts.add(post["_id"])
+            action_trace.record("like_post", self.user_id, post=post["_id"])
             
             logger.info(f"{self.name} liked a post")
             return True
@@ -408,8 +400,32 @@ Return ONLY a valid JSON object with this exact format:
             logger.error(f"Failed to like post: {e}")
             return False
     
+    async def react_to_event(self) -> bool:
+        """React to the events in the bot's inbox, oldest first"""
+        while self.inbox:
+            event = self.inbox.popleft()
+            try:
+                if event["type"] == "connection_request":
+                    if await self.accept_connection_request(event["connection"]):
+                        return True
+                elif event["type"] == "post":
+                    # Comment when off cooldown, otherwise at least like it
+                    if await self.comment_on_post(event["post"]) or await self.like_post(event["post"]):
+                        return True
+                elif event["type"] == "comment":
+                    post = await shared_reads.read("posts", ("post", event["post_id"]), lambda: storage.get_post(event["post_id"]))
+                    if post and await self.comment_on_post(post, reply=True):
+                        return True
+            except Exception as e:
+                logger.error(f"Error reacting to {event['type']} event: {e}")
+        return False
+    
     async def perform_random_action(self) -> bool:
         """Perform a random action"""
+        # React to routed events first
+        if self.inbox and await self.react_to_event():
+            return True
+        
         # Define all possible actions
         actions = [
             self.send_connection_request,
@@ -0,0 +1,130 @@
+import os
+import time
+import struct
+import logging
+from typing import Dict, List, Optional, Any
+from bson import json_util
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", "simulator_state.json")
+CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", "10"))  # ticks between checkpoints
+CHECKPOINT_VERSION = 1
+
+# Liked-post Bloom bitmaps are kept in a binary file next to the checkpoint
+BITMAP_SUFFIX = ".bloom"
+BITMAP_MAGIC = b"NNBLOOM1"
+
+def build_state(tick: int, bots: List[Any], router: Any = None) -> Dict[str, Any]:
+    """Collect the scheduler and bot state that should survive a restart"""
+    return {
+        "version": CHECKPOINT_VERSION,
+        "savedAt": time.time(),
+        "tick": tick,
+        "resumeToken": router.resume_token if router else None,
+        "bots": {bot.user_id: bot.get_state() for bot in bots}
+    }
+
+def _split_bitmaps(state: Dict[str, Any]) -> List[bytes]:
+    """Move the bots' Bloom bitmaps out of the state, leaving their index in the returned list"""
+    bitmaps = []
+    for bot_state in state["bots"].values():
+        liked = bot_state.get("liked_posts") or {}
+        for generation in ("current", "previous"):
+            if liked.get(generation) and "bits" in liked[generation]:
+                liked[generation] = dict(liked[generation])
+                liked[generation]["bitmap"] = len(bitmaps)
+                bitmaps.append(liked[generation].pop("bits"))
+    return bitmaps
+
+def _join_bitmaps(state: Dict[str, Any], bitmaps: Optional[List[bytes]]) -> None:
+    """Put the bitmaps back into the bots' state; without them the bots start with empty filters"""
+    for bot_state in state["bots"].values():
+        liked = bot_state.get("liked_posts") or {}
+        for generation in ("current", "previous"):
+            if liked.get(generation) and "bitmap" in liked[generation]:
+                if bitmaps is None:
+                    bot_state["liked_posts"] = None
+                    break
+                liked[generation]["bits"] = bitmaps[liked[generation].pop("bitmap")]
+
+def _write_atomically(path: str, chunks: List[bytes]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.writelines(chunks)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _read_bitmaps(path: str, saved_at: float) -> Optional[List[bytes]]:
+    """Read the bitmaps written with the checkpoint saved at the given time"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    header = struct.calcsize("<8sdI")
+    if len(data) < header:
+        return None
+    magic, stamp, count = struct.unpack_from("<8sdI", data)
+    if magic != BITMAP_MAGIC or stamp != saved_at:
+        return None
+    bitmaps, offset = [], header
+    for _ in range(count):
+        (length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        bitmaps.append(data[offset:offset + length])
+        offset += length
+    return bitmaps
+
+def save_checkpoint(state: Dict[str, Any], path: str = CHECKPOINT_FILE) -> bool:
+    """Write the state atomically, so a crash mid-write never leaves a corrupt checkpoint.
+
+    Blocking; the simulator runs it on a worker thread. The Bloom bitmaps go
+    to a binary file stamped with the checkpoint's save time, instead of
+    being base64-encoded into the JSON.
+    """
+    try:
+        bitmaps = _split_bitmaps(state)
+        chunks = [struct.pack("<8sdI", BITMAP_MAGIC, state["savedAt"], len(bitmaps))]
+        for bitmap in bitmaps:
+            chunks += [struct.pack("<I", len(bitmap)), bitmap]
+        _write_atomically(path + BITMAP_SUFFIX, chunks)
+        _write_atomically(path, [json_util.dumps(state).encode()])
+        logger.debug(f"Saved checkpoint at tick {state['tick']} to {path}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save checkpoint to {path}: {e}")
+        return False
+
+def load_checkpoint(path: str = CHECKPOINT_FILE) -> Optional[Dict[str, Any]]:
+    """Load the last checkpoint, or None if there is no usable one"""
+    if not os.path.exists(path):
+        logger.info(f"No checkpoint found at {path}, starting fresh")
+        return None
+    try:
+        with open(path) as f:
+            state = json_util.loads(f.read())
+    except Exception as e:
+        logger.error(f"Failed to load checkpoint from {path}: {e}")
+        return None
+
+    if state.get("version") != CHECKPOINT_VERSION:
+        logger.warning(f"Ignoring checkpoint with unsupported version {state.get('version')}")
+        return None
+
+    bitmaps = _read_bitmaps(path + BITMAP_SUFFIX, state.get("savedAt"))
+    if bitmaps is None and any("bitmap" in ((bot.get("liked_posts") or {}).get("current") or {})
+                               for bot in state["bots"].values()):
+        logger.warning(f"Bloom bitmaps in {path}{BITMAP_SUFFIX} are missing or from another checkpoint, liked posts are forgotten")
+    _join_bitmaps(state, bitmaps)
+
+    age = time.time() - state.get("savedAt", 0)
+    logger.info(f"Loaded checkpoint from {path}: tick {state['tick']}, {len(state['bots'])} bots, saved {age:.0f} seconds ago")
+    return state
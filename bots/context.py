@@ -0,0 +1,127 @@
+import os
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Any
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from llm import llm_client
+from schemas import Summary
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+COMMENT_CONTEXT_TOKENS = int(os.getenv("COMMENT_CONTEXT_TOKENS", "600"))  # budget for a thread's comments in a prompt
+SUMMARY_TOKENS = 150  # part of the budget reserved for the summary of older comments
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1000"))  # posts whose thread summary is kept
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return len(text) // 4 + 1
+
+class ThreadSummaryCache:
+    """Rolling summaries of the older comments of each post.
+
+    Each entry records how many of the thread's oldest comments are folded
+    into the summary, so when new comments push more of the thread out of
+    the prompt budget only those are summarized, on top of the old summary.
+    """
+
+    def __init__(self, max_size: int = SUMMARY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[ObjectId, Dict[str, Any]]" = OrderedDict()
+        # Per-thread locks live only while some caller holds or waits for them
+        self.locks: Dict[ObjectId, asyncio.Lock] = {}
+        self.waiters: "Counter[ObjectId]" = Counter()
+        self.hits = 0
+        self.updates = 0
+
+    async def summarize(self, post_id: ObjectId, post_content: str, lines: List[str]) -> Optional[str]:
+        """Get a summary covering the given oldest comment lines of a thread"""
+        lock = self.locks.setdefault(post_id, asyncio.Lock())
+        self.waiters[post_id] += 1
+        try:
+            async with lock:
+                return await self._summarize(post_id, post_content, lines)
+        finally:
+            self.waiters[post_id] -= 1
+            if not self.waiters[post_id]:
+                del self.waiters[post_id]
+                del self.locks[post_id]
+
+    async def _summarize(self, post_id: ObjectId, post_content: str, lines: List[str]) -> Optional[str]:
+        """Get or extend a thread summary, called with the thread's lock held"""
+        entry = self.entries.get(post_id)
+        covered = entry["count"] if entry else 0
+        if entry and covered >= len(lines):
+            self.hits += 1
+            self.entries.move_to_end(post_id)
+            return entry["summary"]
+
+        # Fold only the comments not yet in the summary into it
+        previous = entry["summary"] if entry else ""
+        summary = await self._extend_summary(post_content, previous, lines[covered:])
+        if summary is None:
+            return previous or None
+
+        self.updates += 1
+        self.entries[post_id] = {"summary": summary, "count": len(lines)}
+        self.entries.move_to_end(post_id)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return summary
+
+    async def _extend_summary(self, post_content: str, previous: str, new_lines: List[str]) -> Optional[str]:
+        """Ask the LLM to extend a thread summary with new comments"""
+        previous_text = f"Summary of the discussion so far:\n{previous}\n\n" if previous else ""
+        new_comments = "\n".join(new_lines)
+        prompt = f"""Post: {post_content}
+
+{previous_text}New comments:
+{new_comments}
+
+Write a brief summary (at most three sentences) of the whole discussion on this post, including the new comments. Mention who made the key points.
+
+Return ONLY a valid JSON object with this exact format:
+{{"summary": "your summary here"}}"""
+        result = await llm_client.generate_structured(prompt, Summary, template="thread_summary")
+        return result.summary if result else None
+
+# Thread summaries shared by all bots
+thread_summaries = ThreadSummaryCache()
+
+async def build_comment_context(post_id: ObjectId, post_content: str, lines: List[str],
+                                budget: int = COMMENT_CONTEXT_TOKENS) -> str:
+    """Fit a thread's comment lines into a token budget.
+
+    The most recent comments are kept verbatim; older ones are replaced by
+    the cached rolling summary of the thread.
+    """
+    if not lines:
+        return ""
+
+    total = sum(estimate_tokens(line) for line in lines)
+    if total <= budget:
+        return "Existing comments:\n" + "\n".join(lines) + "\n"
+
+    # Keep as many of the newest comments as fit next to the summary
+    remaining = budget - SUMMARY_TOKENS
+    cutoff = len(lines)
+    while cutoff > 0 and estimate_tokens(lines[cutoff - 1]) <= remaining:
+        remaining -= estimate_tokens(lines[cutoff - 1])
+        cutoff -= 1
+
+    context = ""
+    summary = await thread_summaries.summarize(post_id, post_content, lines[:cutoff])
+    if summary:
+        context += f"Summary of {cutoff} earlier comments: {summary}\n\n"
+    else:
+        context += f"({cutoff} earlier comments omitted)\n\n"
+    if cutoff < len(lines):
+        context += "Most recent comments:\n" + "\n".join(lines[cutoff:]) + "\n"
+    return context
@@ -0,0 +1,97 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Optional, Any
+from bson import ObjectId
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from db import posts, post_counter_shards
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+COUNTER_SHARDS = int(os.getenv("COUNTER_SHARDS", "0"))  # counter shards per post, 0 to increment posts directly
+COUNTER_ROLLUP_INTERVAL = float(os.getenv("COUNTER_ROLLUP_INTERVAL", "10"))  # seconds between roll-ups into posts
+
+# Post counters that can be sharded
+COUNTED_FIELDS = ("likes", "comments")
+
+class ShardedCounters:
+    """Post counters spread over shard documents in a side collection.
+
+    Each increment goes to one of `shards` documents of the post, picked at
+    random, so concurrent likes on a viral post no longer contend for the
+    post document. A periodic roll-up adds the pending shard totals to the
+    post counters and subtracts them from the shards, which keeps increments
+    arriving meanwhile; shards that reach zero are deleted. Post counters
+    trail the real totals by up to one roll-up interval.
+    """
+
+    def __init__(self, target: Any = posts, shards_collection: Any = post_counter_shards, shards: int = COUNTER_SHARDS):
+        self.target = target
+        self.shards_collection = shards_collection
+        self.shards = shards
+        self.increments = 0
+        self.rollups = 0
+        self.rolled_up = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.shards > 0
+
+    def increment(self, post_id: ObjectId, field: str, amount: int = 1, action: Optional[str] = None) -> None:
+        """Add to a counter of a post through a random shard"""
+        collection = self.shards_collection.for_action(action) if action else self.shards_collection
+        shard_id = {"post": post_id, "shard": random.randrange(self.shards)}
+        collection.update_one({"_id": shard_id}, {"$inc": {field: amount}}, upsert=True)
+        self.increments += 1
+
+    def rollup(self) -> int:
+        """Move the pending shard totals into the post counters; returns the number of posts updated"""
+        totals: Dict[ObjectId, Counter] = defaultdict(Counter)
+        drained = []
+        for shard in self.shards_collection.find({}):
+            counts = {field: shard[field] for field in COUNTED_FIELDS if shard.get(field)}
+            if not counts:
+                continue
+            totals[shard["_id"]["post"]].update(counts)
+            drained.append(UpdateOne({"_id": shard["_id"]}, {"$inc": {field: -count for field, count in counts.items()}}))
+        if not drained:
+            return 0
+
+        # Posts first: a crash in between counts an increment twice rather than losing it
+        self.target.bulk_write([UpdateOne({"_id": post_id}, {"$inc": dict(counts)}) for post_id, counts in totals.items()], ordered=False)
+        self.shards_collection.bulk_write(drained, ordered=False)
+        self.shards_collection.delete_many({field: {"$in": [0, None]} for field in COUNTED_FIELDS})
+        self.rollups += 1
+        self.rolled_up += sum(sum(counts.values()) for counts in totals.values())
+        return len(totals)
+
+    async def run(self) -> None:
+        """Roll up the shards forever, on a worker thread"""
+        while True:
+            await asyncio.sleep(COUNTER_ROLLUP_INTERVAL)
+            try:
+                started = time.perf_counter()
+                updated = await asyncio.to_thread(self.rollup)
+                if updated:
+                    logger.debug(f"Rolled up counters of {updated} posts in {time.perf_counter() - started:.3f}s")
+            except Exception as e:
+                logger.error(f"Counter roll-up failed: {e}")
+
+    def report(self) -> str:
+        return (
+            f"Sharded counters: {self.increments} increments over {self.shards} shards per post, "
+            f"{self.rolled_up} rolled up in {self.rollups} roll-ups"
+        )
+
+# Post counters used by the simulator
+sharded_counters = ShardedCounters()
@@ -1,6 +1,9 @@
 import os
 import logging
-from pymongo import MongoClient
+import threading
+from typing import Dict, Optional, Any
+from pymongo import MongoClient, ReadPreference
+from pymongo.write_concern import WriteConcern
 from dotenv import load_dotenv
 
 # Configure logging
@@ -12,25 +15,104 @@ load_dotenv()
 # MongoDB connection
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/network-nexus")
 
+def parse_action_profiles(spec: str) -> Dict[str, str]:
+    """Parse profiles given as "action=profile,action=profile" """
+    profiles = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        action, _, profile = item.partition("=")
+        profiles[action.strip()] = profile.strip()
+    return profiles
+
+# Named write concern and read preference combinations
+CONSISTENCY_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Unacknowledged writes; for counters where a lost increment does not matter
+    "fire": {"write_concern": WriteConcern(w=0), "read_preference": ReadPreference.SECONDARY_PREFERRED},
+    # Acknowledged by the primary only, reads offloaded to secondaries when there are any
+    "fast": {"write_concern": WriteConcern(w=1), "read_preference": ReadPreference.SECONDARY_PREFERRED},
+    # Durable on a majority of the replica set, reads from the primary
+    "safe": {"write_concern": WriteConcern(w="majority"), "read_preference": ReadPreference.PRIMARY}
+}
+
+# Profile used by each bot action and account operation, overridable with DB_ACTION_PROFILES
+ACTION_PROFILES = {
+    "like_post": "fire",
+    "create_post": "fast",
+    "comment_on_post": "fast",
+    "send_connection_request": "fast",
+    "accept_connection_request": "safe",
+    "create_account": "safe",
+    "read_post": "safe",
+    **parse_action_profiles(os.getenv("DB_ACTION_PROFILES", ""))
+}
+
+_db = None
+_db_lock = threading.Lock()
+
 def get_db():
-    """Get MongoDB database connection"""
-    try:
-        client = MongoClient(MONGODB_URI)
-        db = client.get_default_database()
-        logger.info(f"Connected to MongoDB: {db.name}")
-        return db
-    except Exception as e:
-        logger.error(f"Failed to connect to MongoDB: {e}")
-        raise
-
-# Initialize database connection
-db = get_db()
+    """Get MongoDB database connection, connecting on first use"""
+    global _db
+    if _db is not None:
+        return _db
+    with _db_lock:
+        if _db is None:
+            try:
+                client = MongoClient(MONGODB_URI)
+                _db = client.get_default_database()
+                logger.info(f"Connected to MongoDB: {_db.name}")
+            except Exception as e:
+                logger.error(f"Failed to connect to MongoDB: {e}")
+                raise
+    return _db
+
+class LazyDatabase:
+    """Database proxy that defers connecting until it is first used"""
+
+    def __getattr__(self, attr):
+        return getattr(get_db(), attr)
+
+    def __getitem__(self, name):
+        return get_db()[name]
+
+class LazyCollection:
+    """Collection proxy that defers connecting until it is first used"""
+
+    def __init__(self, collection_name: str, profile: Optional[str] = None):
+        self._collection_name = collection_name
+        self._profile = profile
+        self._collection = None
+        self._profiled: Dict[str, "LazyCollection"] = {}
+
+    def __getattr__(self, attr):
+        if self._collection is None:
+            collection = get_db()[self._collection_name]
+            if self._profile:
+                collection = collection.with_options(**CONSISTENCY_PROFILES[self._profile])
+            self._collection = collection
+        return getattr(self._collection, attr)
+
+    def for_action(self, action: str) -> "LazyCollection":
+        """The collection with the consistency profile mapped to an action"""
+        profile = ACTION_PROFILES.get(action)
+        if profile is None:
+            return self
+        profiled = self._profiled.get(profile)
+        if profiled is None:
+            if profile not in CONSISTENCY_PROFILES:
+                raise ValueError(f"Unknown consistency profile '{profile}' for {action}")
+            profiled = self._profiled[profile] = LazyCollection(self._collection_name, profile)
+        return profiled
+
+# Database connection, established lazily so importing this module is free
+db = LazyDatabase()
 
 # Collections
-users = db.users
-posts = db.posts
-comments = db.comments
-connections = db.connections
-experiences = db.experiences
-skills = db.skills
-education = db.educations 
\ No newline at end of file
+users = LazyCollection("users")
+posts = LazyCollection("posts")
+comments = LazyCollection("comments")
+connections = LazyCollection("connections")
+experiences = LazyCollection("experiences")
+skills = LazyCollection("skills")
+education = LazyCollection("educations")
+post_counter_shards = LazyCollection("post_counter_shards")
@@ -0,0 +1,192 @@
+import os
+import random
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Any
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure, PyMongoError
+
+from db import db, posts
+from feed import feed_index
+from graph import social_graph, ACCEPTED_STATUSES
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+ENABLE_CHANGE_STREAMS = os.getenv("ENABLE_CHANGE_STREAMS", "true").lower() == "true"
+POST_FANOUT = int(os.getenv("POST_FANOUT", "3"))  # random extra bots notified of each new post
+POST_AUTHOR_CACHE_SIZE = 10000
+
+# Error code returned by MongoDB when change streams are used on a standalone server
+NOT_A_REPLICA_SET = 40573
+
+class EventRouter:
+    """Tail MongoDB change streams and route new posts, comments and
+    connection requests to the inboxes of the bots they concern.
+
+    The change stream is a blocking pymongo cursor, so it runs in a daemon
+    thread; events are handed back to the event loop with
+    call_soon_threadsafe so inboxes are only ever touched from the loop.
+    """
+
+    def __init__(self, bots: List[Any], resume_token: Optional[Dict[str, Any]] = None):
+        self.bots = {ObjectId(bot.user_id): bot for bot in bots}
+        self.post_authors: "OrderedDict[ObjectId, ObjectId]" = OrderedDict()
+        # Resuming from a checkpointed token replays the events missed while stopped
+        self.resume_token = resume_token
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup = asyncio.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.events_routed = 0
+        # Called on the event loop with each bot that received an event
+        self.delivery_listeners: List[Callable[[Any], None]] = []
+
+    def start(self) -> bool:
+        """Start tailing the change streams in a background thread"""
+        if not ENABLE_CHANGE_STREAMS:
+            logger.info("Change streams disabled, bots will poll for activity")
+            return False
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        self.thread = threading.Thread(target=self._watch, name="change-stream", daemon=True)
+        self.thread.start()
+        logger.info(f"Started change stream router for {len(self.bots)} bots")
+        return True
+
+    def stop(self) -> None:
+        """Stop tailing the change streams"""
+        self.running = False
+
+    async def wait_for_events(self, timeout: float) -> bool:
+        """Wait until an event is routed or the timeout expires"""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.wakeup.clear()
+
+    def bots_with_events(self) -> List[Any]:
+        """Get the bots that have unprocessed events in their inbox"""
+        return [bot for bot in self.bots.values() if bot.inbox]
+
+    def _watch(self) -> None:
+        """Blocking change stream loop, run in the router thread"""
+        pipeline = [
+            {"$match": {
+                "$or": [
+                    {"operationType": "insert", "ns.coll": {"$in": ["posts", "comments", "connections"]}},
+                    {"operationType": "update", "ns.coll": "connections"}
+                ]
+            }}
+        ]
+        retry_delay = 1
+        while self.running:
+            try:
+                with db.watch(pipeline, full_document="updateLookup", resume_after=self.resume_token) as stream:
+                    retry_delay = 1
+                    while self.running and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        self.resume_token = stream.resume_token
+                        self._handle_change(change)
+            except OperationFailure as e:
+                if e.code == NOT_A_REPLICA_SET:
+                    logger.warning("MongoDB is not running as a replica set, change streams unavailable; bots will poll for activity")
+                    self.running = False
+                    return
+                logger.error(f"Change stream failed: {e}")
+                if self.resume_token is not None:
+                    # The token may have fallen off the oplog, start from now instead
+                    logger.warning("Discarding change stream resume token")
+                    self.resume_token = None
+            except PyMongoError as e:
+                logger.error(f"Change stream interrupted: {e}")
+            except Exception as e:
+                logger.error(f"Unexpected change stream error: {e}")
+
+            if self.running:
+                logger.info(f"Reconnecting change stream in {retry_delay} seconds")
+                threading.Event().wait(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+
+    def _handle_change(self, change: Dict[str, Any]) -> None:
+        """Turn a change document into an inbox event and pick its recipients"""
+        collection = change["ns"]["coll"]
+        doc = change.get("fullDocument")
+        if not doc:
+            return
+
+        targets: List[ObjectId] = []
+        event: Dict[str, Any] = {}
+
+        if collection == "posts":
+            author = doc.get("author")
+            self._remember_post_author(doc["_id"], author)
+            if self.loop:
+                self.loop.call_soon_threadsafe(feed_index.add, doc)
+            targets = self._post_audience(author)
+            event = {"type": "post", "post": doc}
+        elif collection == "comments":
+            post_author = self._lookup_post_author(doc.get("post"))
+            if post_author and post_author != doc.get("author"):
+                targets = [post_author]
+            event = {"type": "comment", "post_id": doc.get("post"), "comment": doc}
+        elif collection == "connections":
+            status = doc.get("status")
+            if status == "pending" and change["operationType"] == "insert":
+                targets = [doc.get("to")]
+                event = {"type": "connection_request", "connection": doc}
+            # Keep the social graph in step with connections made outside this process
+            if self.loop and doc.get("from") and doc.get("to"):
+                self.loop.call_soon_threadsafe(social_graph.add_link, doc["from"], doc["to"], status in ACCEPTED_STATUSES)
+
+        targets = [target for target in targets if target in self.bots]
+        if targets and self.loop:
+            self.loop.call_soon_threadsafe(self._deliver, targets, event)
+
+    def _deliver(self, targets: List[ObjectId], event: Dict[str, Any]) -> None:
+        """Append an event to the recipients' inboxes, run on the event loop"""
+        for target in targets:
+            self.bots[target].inbox.append(event)
+            for listener in self.delivery_listeners:
+                listener(self.bots[target])
+        self.events_routed += len(targets)
+        self.wakeup.set()
+
+    def _post_audience(self, author: ObjectId) -> List[ObjectId]:
+        """Bots that should hear about a new post: the author's connections plus a few random bots"""
+        audience = {friend for friend in social_graph.friends(author) if friend in self.bots}
+        others = [bot_id for bot_id in self.bots if bot_id != author and bot_id not in audience]
+        audience.update(random.sample(others, min(POST_FANOUT, len(others))))
+        audience.discard(author)
+        return list(audience)
+
+    def _remember_post_author(self, post_id: ObjectId, author: ObjectId) -> None:
+        """Cache a post's author so comment events need no lookup"""
+        self.post_authors[post_id] = author
+        self.post_authors.move_to_end(post_id)
+        if len(self.post_authors) > POST_AUTHOR_CACHE_SIZE:
+            self.post_authors.popitem(last=False)
+
+    def _lookup_post_author(self, post_id: Optional[ObjectId]) -> Optional[ObjectId]:
+        """Get the author of a post, from the cache or the database"""
+        if post_id is None:
+            return None
+        if post_id in self.post_authors:
+            return self.post_authors[post_id]
+        post = posts.find_one({"_id": post_id}, {"author": 1})
+        if not post:
+            return None
+        self._remember_post_author(post_id, post["author"])
+        return post["author"]
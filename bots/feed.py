@@ -0,0 +1,124 @@
+import os
+import time
+import random
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from storage import storage
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+FEED_INDEX_SIZE = int(os.getenv("FEED_INDEX_SIZE", "5000"))  # most recent posts kept in memory
+FEED_REFRESH_INTERVAL = float(os.getenv("FEED_REFRESH_INTERVAL", "10"))  # seconds between polls for new posts
+SAMPLE_ATTEMPTS = 20
+
+# Fields of a post that bots need to pick and comment on it
+FEED_FIELDS = ["author", "content", "timestamp"]
+
+class FeedIndex:
+    """Process-wide, time-ordered ring buffer of recent posts shared by all bots.
+
+    Loaded once at startup and kept current by new posts pushed from the
+    change stream router, plus a cheap poll for posts with a newer _id at
+    most every FEED_REFRESH_INTERVAL seconds. Bots sample from memory
+    instead of each querying and sorting the posts collection.
+    """
+
+    def __init__(self, max_size: int = FEED_INDEX_SIZE):
+        self.entries: deque = deque(maxlen=max_size)
+        self.ids = set()
+        self.last_id: Optional[ObjectId] = None
+        self.last_refresh = 0.0
+        self.samples = 0
+        self.queries = 0
+
+    def load(self) -> None:
+        """Fill the index with the most recent posts"""
+        recent = storage.newest_posts(self.entries.maxlen, FEED_FIELDS)
+        self.queries += 1
+        for post in reversed(recent):
+            self.add(post)
+        self.last_refresh = time.monotonic()
+        logger.info(f"Loaded {len(self.entries)} posts into the feed index")
+
+    def add(self, post: Dict[str, Any]) -> None:
+        """Append a new post to the index"""
+        if post["_id"] in self.ids:
+            return
+        if len(self.entries) == self.entries.maxlen:
+            self.ids.discard(self.entries[0]["_id"])
+        self.entries.append({key: post.get(key) for key in ("_id", "author", "content", "timestamp")})
+        self.ids.add(post["_id"])
+        if self.last_id is None or post["_id"] > self.last_id:
+            self.last_id = post["_id"]
+
+    def remove(self, post_ids: List[ObjectId]) -> None:
+        """Drop deleted posts from the index"""
+        removed = self.ids.intersection(post_ids)
+        if not removed:
+            return
+        kept = [post for post in self.entries if post["_id"] not in removed]
+        self.entries.clear()
+        self.entries.extend(kept)
+        self.ids -= removed
+
+    def refresh(self, force: bool = False) -> None:
+        """Tail posts inserted since the last refresh, at most once per interval"""
+        now = time.monotonic()
+        if not force and now - self.last_refresh < FEED_REFRESH_INTERVAL:
+            return
+        self.last_refresh = now
+        new_posts = storage.posts_after(self.last_id, self.entries.maxlen, FEED_FIELDS)
+        self.queries += 1
+        for post in new_posts:
+            self.add(post)
+
+    def sample(self, exclude_author: Optional[ObjectId] = None) -> Optional[Dict[str, Any]]:
+        """Pick a uniformly random post, skipping the given author's posts"""
+        self.refresh()
+        self.samples += 1
+        if not self.entries:
+            return None
+        for _ in range(SAMPLE_ATTEMPTS):
+            post = random.choice(self.entries)
+            if post["author"] != exclude_author:
+                return post
+        # Mostly the author's own posts, fall back to a full scan of the index
+        candidates = [post for post in self.entries if post["author"] != exclude_author]
+        return random.choice(candidates) if candidates else None
+
+    def sample_recent(self, exclude_author: Optional[ObjectId] = None) -> Optional[Dict[str, Any]]:
+        """Pick a random post, weighting newer posts higher by 1 / (1 + age in hours)"""
+        self.refresh()
+        self.samples += 1
+        current_time = datetime.now(timezone.utc)
+        candidates = []
+        weights = []
+        for post in self.entries:
+            if post["author"] == exclude_author:
+                continue
+            post_time = post.get("timestamp") or current_time
+            # Treat naive timestamps as UTC
+            if post_time.tzinfo is None:
+                post_time = post_time.replace(tzinfo=timezone.utc)
+            age_hours = max((current_time - post_time).total_seconds() / 3600, 0)
+            candidates.append(post)
+            weights.append(1 / (1 + age_hours))
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=weights, k=1)[0]
+
+    def report(self) -> str:
+        return f"Feed index: {len(self.entries)} posts, {self.samples} samples served by {self.queries} queries"
+
+# Feed index shared by all bots
+feed_index = FeedIndex()
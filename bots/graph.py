@@ -0,0 +1,239 @@
+import os
+import random
+import logging
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from storage import storage
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+FOF_PROBABILITY = float(os.getenv("FOF_PROBABILITY", "0.7"))  # share of recommendations from friends-of-friends
+COMPACT_THRESHOLD = 10000  # incremental links merged into the CSR arrays beyond this
+RECOMMEND_ATTEMPTS = 20
+
+# Connection statuses meaning two users are connected (the API uses "connected", bots "accepted")
+ACCEPTED_STATUSES = ("accepted", "connected")
+
+class SocialGraph:
+    """Compact in-memory connection graph keyed by dense integer ids.
+
+    Links loaded at startup live in CSR form: the links of node n are
+    targets[offsets[n]:offsets[n + 1]], with a parallel byte array marking
+    accepted (1) versus pending (0) links. Links added later go to a small
+    per-node delta map that is folded into the arrays once it grows past
+    COMPACT_THRESHOLD. Links are stored in both directions, so every lookup
+    is an O(degree) scan of memory.
+    """
+
+    def __init__(self):
+        self.ids: List[ObjectId] = []
+        self.index: Dict[ObjectId, int] = {}
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        self.accepted = array('b')
+        self.delta: Dict[int, Dict[int, int]] = {}
+        self.delta_links = 0
+        # Both endpoints of every accepted link; sampling it picks nodes proportionally to degree
+        self.endpoints = array('q')
+
+    def node(self, user_id: ObjectId) -> int:
+        """Get the dense id of a user, adding it to the graph if needed"""
+        idx = self.index.get(user_id)
+        if idx is None:
+            idx = len(self.ids)
+            self.index[user_id] = idx
+            self.ids.append(user_id)
+        return idx
+
+    def load(self) -> None:
+        """Load all users and connections into CSR arrays"""
+        for user_id in storage.user_ids():
+            self.node(user_id)
+        links = []
+        for conn in storage.all_connections():
+            if conn.get("from") is None or conn.get("to") is None:
+                continue
+            u, v = self.node(conn["from"]), self.node(conn["to"])
+            if u != v:
+                links.append((u, v, 1 if conn.get("status") in ACCEPTED_STATUSES else 0))
+        self._build(links)
+        logger.info(f"Loaded social graph: {len(self.ids)} users, {len(self.targets) // 2} connections")
+
+    def _build(self, links: List[Tuple[int, int, int]]) -> None:
+        """Build the CSR arrays from undirected links, keeping the strongest status of duplicates"""
+        merged: Dict[Tuple[int, int], int] = {}
+        for u, v, status in links:
+            key = (u, v) if u < v else (v, u)
+            merged[key] = max(merged.get(key, 0), status)
+
+        node_count = len(self.ids)
+        degrees = [0] * node_count
+        for u, v in merged:
+            degrees[u] += 1
+            degrees[v] += 1
+
+        offsets = array('q', [0]) * (node_count + 1)
+        for n in range(node_count):
+            offsets[n + 1] = offsets[n] + degrees[n]
+        targets = array('q', [0]) * offsets[node_count]
+        accepted = array('b', [0]) * offsets[node_count]
+        fill = array('q', offsets[:node_count])
+        endpoints = array('q')
+        for (u, v), status in merged.items():
+            targets[fill[u]], accepted[fill[u]] = v, status
+            fill[u] += 1
+            targets[fill[v]], accepted[fill[v]] = u, status
+            fill[v] += 1
+            if status:
+                endpoints.extend((u, v))
+
+        self.offsets, self.targets, self.accepted, self.endpoints = offsets, targets, accepted, endpoints
+        self.delta = {}
+        self.delta_links = 0
+
+    def _links(self, node: int) -> Iterator[Tuple[int, int]]:
+        """Iterate over (neighbor, accepted) pairs of a node"""
+        if node + 1 < len(self.offsets):
+            for i in range(self.offsets[node], self.offsets[node + 1]):
+                yield self.targets[i], self.accepted[i]
+        yield from self.delta.get(node, {}).items()
+
+    def _status(self, u: int, v: int) -> Optional[int]:
+        """Status of the link between two nodes, or None if they are not linked"""
+        for neighbor, status in self._links(u):
+            if neighbor == v:
+                return status
+        return None
+
+    def is_linked(self, a: ObjectId, b: ObjectId) -> bool:
+        """Check whether two users are connected or have a pending request"""
+        if a not in self.index or b not in self.index:
+            return False
+        return self._status(self.index[a], self.index[b]) is not None
+
+    def friends(self, user_id: ObjectId) -> List[ObjectId]:
+        """Users with an accepted connection to the given user"""
+        if user_id not in self.index:
+            return []
+        return [self.ids[neighbor] for neighbor, status in self._links(self.index[user_id]) if status]
+
+    def add_link(self, a: ObjectId, b: ObjectId, accepted: bool = False) -> None:
+        """Record a new connection request, or upgrade a link to accepted"""
+        u, v = self.node(a), self.node(b)
+        if u == v:
+            return
+        status = 1 if accepted else 0
+        current = self._status(u, v)
+        if current is None:
+            self.delta.setdefault(u, {})[v] = status
+            self.delta.setdefault(v, {})[u] = status
+            self.delta_links += 1
+        elif status > current:
+            self._set_status(u, v, status)
+            self._set_status(v, u, status)
+        else:
+            return
+        if accepted:
+            self.endpoints.extend((u, v))
+        if self.delta_links > COMPACT_THRESHOLD:
+            self._compact()
+
+    def remove_pending_links(self, pairs: Iterable[Tuple[ObjectId, ObjectId]]) -> int:
+        """Forget connection requests deleted from the database; accepted links are kept"""
+        removed = 0
+        stale = set()
+        for a, b in pairs:
+            if a not in self.index or b not in self.index:
+                continue
+            u, v = self.index[a], self.index[b]
+            if self._status(u, v) != 0:
+                continue
+            removed += 1
+            if v in self.delta.get(u, {}):
+                del self.delta[u][v]
+                del self.delta[v][u]
+                self.delta_links -= 1
+            else:
+                stale.add((u, v) if u < v else (v, u))
+        if stale:
+            # Links in the CSR arrays can only be dropped by rebuilding them
+            links = []
+            for u in range(len(self.ids)):
+                for v, status in self._links(u):
+                    if u < v and (u, v) not in stale:
+                        links.append((u, v, status))
+            self._build(links)
+        return removed
+
+    def _set_status(self, u: int, v: int, status: int) -> None:
+        """Update the status of the link u -> v wherever it is stored"""
+        if v in self.delta.get(u, {}):
+            self.delta[u][v] = status
+            return
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[i] == v:
+                self.accepted[i] = status
+                return
+
+    def _compact(self) -> None:
+        """Fold the incremental links into the CSR arrays"""
+        links = []
+        for u in range(len(self.ids)):
+            for v, status in self._links(u):
+                if u < v:
+                    links.append((u, v, status))
+        self._build(links)
+
+    def friends_of_friends(self, user_id: ObjectId, limit: int = 50) -> List[Tuple[ObjectId, int]]:
+        """Unlinked users sharing accepted connections with the user, most mutual friends first"""
+        u = self.node(user_id)
+        linked = {neighbor for neighbor, _ in self._links(u)}
+        mutual: Counter = Counter()
+        for friend, status in self._links(u):
+            if not status:
+                continue
+            for candidate, friend_status in self._links(friend):
+                if friend_status and candidate != u and candidate not in linked:
+                    mutual[candidate] += 1
+        return [(self.ids[candidate], count) for candidate, count in mutual.most_common(limit)]
+
+    def _preferential_candidate(self) -> int:
+        """Pick a node with probability proportional to its degree plus one"""
+        node_count = len(self.ids)
+        if self.endpoints and random.random() < len(self.endpoints) / (len(self.endpoints) + node_count):
+            return random.choice(self.endpoints)
+        return random.randrange(node_count)
+
+    def recommend(self, user_id: ObjectId) -> Optional[ObjectId]:
+        """Recommend a user to connect with by triadic closure or preferential attachment"""
+        u = self.node(user_id)
+        if random.random() < FOF_PROBABILITY:
+            candidates = self.friends_of_friends(user_id)
+            if candidates:
+                return random.choices([c for c, _ in candidates], weights=[n for _, n in candidates], k=1)[0]
+
+        for _ in range(RECOMMEND_ATTEMPTS):
+            candidate = self._preferential_candidate()
+            if candidate != u and self._status(u, candidate) is None:
+                return self.ids[candidate]
+
+        # Densely connected user, fall back to a scan for anyone not yet linked
+        linked = {neighbor for neighbor, _ in self._links(u)}
+        linked.add(u)
+        remaining = [n for n in range(len(self.ids)) if n not in linked]
+        return self.ids[random.choice(remaining)] if remaining else None
+
+    def report(self) -> str:
+        return f"Social graph: {len(self.ids)} users, {len(self.targets) // 2 + self.delta_links} links, {len(self.endpoints) // 2} accepted"
+
+# Social graph shared by all bots
+social_graph = SocialGraph()
@@ -3,23 +3,38 @@ import logging
 import httpx
 import json
 import re
+import time
 from dotenv import load_dotenv
 import asyncio
 
+from schemas import response_schema, parse_response
+from llm_pool import EndpointPool
+from logging_setup import LazyJson
+from llm_profile import llm_profiler
+
 # Configure logging
 logger = logging.getLogger("network-nexus-simulator")
-# Set the logging level to DEBUG to ensure debug messages are displayed
-logger.setLevel(logging.DEBUG)
 
 # Load environment variables
 load_dotenv()
 
 # LLM configuration
 LLM_API_URL = os.getenv("LLM_API_URL", "http://localhost:11434")
+# Comma-separated list of model servers; defaults to the single LLM_API_URL
+LLM_API_URLS = [url.strip() for url in os.getenv("LLM_API_URLS", LLM_API_URL).split(",") if url.strip()]
 LLM_API_KEY = os.getenv("LLM_API_KEY", "")
 MODEL_NAME = os.getenv("MODEL_NAME", "llama2")  # Default to llama2 if not specified
 # Increase timeout to 30 seconds to prevent timeouts on longer generations
 REQUEST_TIMEOUT = 30.0
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")  # how long the server keeps the model loaded
+LLM_REUSE_CONTEXT = os.getenv("LLM_REUSE_CONTEXT", "false").lower() == "true"
+LLM_MAX_CONTEXT_TOKENS = int(os.getenv("LLM_MAX_CONTEXT_TOKENS", "2048"))  # reset reused context beyond this
+LLM_OUTPUT_FORMAT = os.getenv("LLM_OUTPUT_FORMAT", "schema")  # "schema", "json" or "none"
+LLM_PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "1"))  # extra attempts after an invalid response
+
+# Fixed system message shared by every generation, so the server can reuse its prefill
+SYSTEM_PROMPT = """You are a participant in a social media network that is LinkedIn. You always respond in valid JSON format when asked.
+You must respond with valid JSON that can be parsed by json.loads()."""
 
 def clean_json_response(text):
     """Clean markdown code blocks from JSON responses"""
@@ -28,9 +43,33 @@ def clean_json_response(text):
     cleaned = re.sub(r'\s*```$', '', cleaned)
     return cleaned.strip()
 
+class PersonaSession:
+    """Stable per-persona prompt prefix.
+
+    The system message never changes for a persona, so consecutive
+    generations for the same bot share their prefix and the model server
+    only has to prefill the new user message. With LLM_REUSE_CONTEXT the
+    context tokens returned by the server are sent back on the next call.
+    """
+
+    def __init__(self, persona: str = ""):
+        self.system = f"{SYSTEM_PROMPT}\n\n{persona}" if persona else SYSTEM_PROMPT
+        self.context = None
+        # Endpoint that served the last generation, preferred so its prefix cache is reused
+        self.endpoint = None
+
+def persona_session(user: dict) -> PersonaSession:
+    """Create the prompt session for a user's persona"""
+    return PersonaSession(f"""You are {user.get("name", "Unknown")}, {user.get("title", "")}.
+Your bio: {user.get("bio", "")}""")
+
+# Session used by generations that are not tied to a persona
+default_session = PersonaSession()
+
 class LLMClient:
-    def __init__(self, base_url=LLM_API_URL, api_key=LLM_API_KEY):
-        self.base_url = base_url.rstrip('/')
+    def __init__(self, base_urls=LLM_API_URLS, api_key=LLM_API_KEY):
+        self.base_urls = [url.rstrip('/') for url in base_urls]
+        self.base_url = self.base_urls[0]
         self.api_key = api_key
         self.headers = {
             "Content-Type": "application/json"
@@ -38,10 +77,21 @@ class LLMClient:
         # Only add Authorization header if API key is provided
         if api_key:
             self.headers["Authorization"] = f"Bearer {api_key}"
-        logger.info(f"Initialized LLM client with base URL: {self.base_url}, model: {MODEL_NAME}")
+        # Callbacks notified with the number of tokens used by each generation
+        self.usage_listeners = []
+        # Structured requests and parse failures per response type
+        self.parse_stats = {}
+        # Generations are routed across all configured model servers
+        self.pool = EndpointPool(self.base_urls, self.headers, REQUEST_TIMEOUT)
+        logger.info(f"Initialized LLM client with base URLs: {', '.join(self.base_urls)}, model: {MODEL_NAME}")
     
     async def ensure_model_available(self):
-        """Ensure the model is pulled and available"""
+        """Ensure the model is pulled and available on every model server"""
+        results = [await self._ensure_model_on(base_url) for base_url in self.base_urls]
+        return all(results)
+    
+    async def _ensure_model_on(self, base_url):
+        """Ensure the model is pulled and available on one model server"""
         try:
             async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
                 # First check if LLM server is running
@@ -51,9 +101,9 @@ class LLMClient:
                 for attempt in range(max_retries):
                     try:
                         logger.debug(f"Checking LLM server health (attempt {attempt + 1}/{max_retries})")
-                        health_check = await client.get(f"{self.base_url}/api/tags")
+                        health_check = await client.get(f"{base_url}/api/tags")
                         if health_check.status_code == 200:
-                            logger.info("LLM server is running")
+                            logger.info(f"LLM server {base_url} is running")
                             break
                         else:
                             logger.warning(f"LLM server returned status {health_check.status_code}")
@@ -68,7 +118,7 @@ class LLMClient:
                 
                 # Now check if the model exists
                 logger.debug(f"Checking if model {MODEL_NAME} exists")
-                response = await client.get(f"{self.base_url}/api/tags")
+                response = await client.get(f"{base_url}/api/tags")
                 response.raise_for_status()
                 models = response.json().get("models", [])
                 
@@ -84,7 +134,7 @@ class LLMClient:
                     logger.info(f"Model {MODEL_NAME} not found, pulling it...")
                     # Pull the model
                     pull_response = await client.post(
-                        f"{self.base_url}/api/pull",
+                        f"{base_url}/api/pull",
                         headers=self.headers,
                         json={"name": MODEL_NAME}
                     )
@@ -95,66 +145,129 @@ class LLMClient:
             logger.error(f"Failed to ensure model availability: {e}")
             return False
 
-    async def generate(self, prompt: str, max_tokens: int = 100) -> str:
-        """Generate text using the LLM"""
+    async def generate(self, prompt: str, max_tokens: int = 100, session: PersonaSession = None,
+                       response_format=None, template: str = "untagged") -> str:
+        """Generate text using the LLM, within the given persona session.
+        
+        response_format is passed as the server's "format" option: "json" for
+        JSON mode, or a JSON schema that constrains the output. template names
+        the prompt in the cost profile.
+        """
+        session = session or default_session
+        started = time.perf_counter()
         try:
-            # First check if LLM is running
-            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-                try:
-                    logger.debug(f"Checking LLM health at {self.base_url}/api/tags")
-                    health_check = await client.get(f"{self.base_url}/api/tags")
-                    logger.debug(f"LLM health check response: {health_check.status_code}")
-                    if health_check.status_code != 200:
-                        logger.error(f"LLM health check failed: {health_check.text}")
-                except Exception as e:
-                    logger.error(f"Failed to connect to LLM: {e}")
-                    return "{}"
-
-                # Prepare the request payload
+            # Prepare the request payload
+            if LLM_REUSE_CONTEXT:
+                # Continue from the session's previous context tokens
+                path = "/api/generate"
                 payload = {
                     "model": MODEL_NAME,  # Use the configured model name
-                    "prompt": f"""You are a participant in a social media network that is LinkedIn. You always respond in valid JSON format when asked.
-System: You must respond with valid JSON that can be parsed by json.loads().
-User: {prompt}""",
-                    "stream": False
+                    "system": session.system,
+                    "prompt": prompt,
+                    "stream": False,
+                    "keep_alive": LLM_KEEP_ALIVE
                 }
-                
-                logger.debug(f"Sending request to {self.base_url}/api/generate with model {MODEL_NAME}")
-                logger.debug(f"Request payload: {json.dumps(payload, indent=2)}")
-                
-                # Try the generate endpoint instead of chat/completions
-                response = await client.post(
-                    f"{self.base_url}/api/generate",
-                    headers=self.headers,
-                    json=payload
-                )
-                
-                logger.debug(f"Response status code: {response.status_code}")
-                response.raise_for_status()
-                
-                result = response.json()
-                logger.debug(f"Raw LLM response: {json.dumps(result, indent=2)}")
-                
+                if session.context:
+                    payload["context"] = session.context
+            else:
+                # Chat with a fixed system message, so the prefix is shared across calls
+                path = "/api/chat"
+                payload = {
+                    "model": MODEL_NAME,  # Use the configured model name
+                    "messages": [
+                        {"role": "system", "content": session.system},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "stream": False,
+                    "keep_alive": LLM_KEEP_ALIVE
+                }
+            if response_format is not None:
+                payload["format"] = response_format
+            
+            logger.debug("Sending request to %s with model %s", path, MODEL_NAME, extra={"category": "llm"})
+            logger.debug("Request payload: %s", LazyJson(payload, indent=2), extra={"category": "llm.payload"})
+            
+            # Route to the least loaded healthy endpoint, preferring the session's last one
+            result, endpoint = await self.pool.post(path, payload, preferred=session.endpoint)
+            session.endpoint = endpoint
+            logger.debug("Response served by %s", endpoint.url, extra={"category": "llm"})
+            
+            logger.debug("Raw LLM response: %s", LazyJson(result, indent=2), extra={"category": "llm.payload"})
+            llm_profiler.record_call(template, result, time.perf_counter() - started)
+            
+            # Report prompt and completion token usage, e.g. to the action scheduler
+            tokens_used = result.get("prompt_eval_count", 0) + result.get("eval_count", 0)
+            for listener in self.usage_listeners:
+                listener(tokens_used)
+            
+            if LLM_REUSE_CONTEXT:
+                # Keep the returned context for the next call, starting over once it grows too long
+                context = result.get("context")
+                session.context = context if context and len(context) <= LLM_MAX_CONTEXT_TOKENS else None
                 response_text = result.get("response", "{}").strip()
-                logger.debug(f"Extracted response text: {response_text}")
-                
-                # Clean the response text to remove markdown code blocks
-                cleaned_text = clean_json_response(response_text)
-                logger.debug(f"Cleaned response text: {cleaned_text}")
-                
-                # Check if the response is valid JSON
-                try:
-                    json.loads(cleaned_text)
-                    logger.debug("Response is valid JSON")
-                    return cleaned_text
-                except json.JSONDecodeError:
-                    logger.warning(f"Response is not valid JSON after cleaning: {cleaned_text}")
-                    return "{}"
+            else:
+                response_text = result.get("message", {}).get("content", "{}").strip()
+            logger.debug("Extracted response text: %s", response_text, extra={"category": "llm.payload"})
+            
+            # Clean the response text to remove markdown code blocks
+            cleaned_text = clean_json_response(response_text)
+            logger.debug("Cleaned response text: %s", cleaned_text, extra={"category": "llm.payload"})
+            
+            # Check if the response is valid JSON
+            try:
+                json.loads(cleaned_text)
+                logger.debug("Response is valid JSON", extra={"category": "llm"})
+                return cleaned_text
+            except json.JSONDecodeError:
+                logger.warning(f"Response is not valid JSON after cleaning: {cleaned_text}")
+                return "{}"
         except Exception as e:
+            llm_profiler.record_error(template)
             logger.error(f"Failed to generate text: {e}")
             if isinstance(e, httpx.HTTPError):
                 logger.error(f"Response content: {e.response.text if hasattr(e, 'response') else 'No response content'}")
             return "{}"  # Return empty JSON object as fallback
 
+    async def generate_structured(self, prompt: str, model, many: bool = False, min_items: int = 1,
+                                  max_tokens: int = 100, session: PersonaSession = None, template: str = None):
+        """Generate a response validated against a typed model (or a list of them).
+        
+        Returns the parsed model, or None if no attempt produced a valid response.
+        """
+        name = f"{model.__name__}[]" if many else model.__name__
+        template = template or name
+        stats = self.parse_stats.setdefault(name, {"requests": 0, "failures": 0})
+        
+        if LLM_OUTPUT_FORMAT == "schema":
+            response_format = response_schema(model, many, min_items)
+        elif LLM_OUTPUT_FORMAT == "json":
+            response_format = "json"
+        else:
+            response_format = None
+        
+        attempts = LLM_PARSE_RETRIES + 1
+        for attempt in range(attempts):
+            stats["requests"] += 1
+            if attempt:
+                llm_profiler.record_retry(template)
+            text = await self.generate(prompt, max_tokens, session, response_format, template)
+            try:
+                return parse_response(model, json.loads(text), many, min_items)
+            except (json.JSONDecodeError, ValueError, TypeError) as e:
+                stats["failures"] += 1
+                llm_profiler.record_parse_failure(template)
+                logger.warning(f"Invalid {name} response (attempt {attempt + 1}/{attempts}): {e}")
+        return None
+    
+    def parse_failure_report(self) -> str:
+        """Summarize the parse failure rate per response type"""
+        if not self.parse_stats:
+            return "Parse failures: no structured requests yet"
+        rates = ", ".join(
+            f"{name}={stats['failures']}/{stats['requests']} ({stats['failures'] / stats['requests']:.0%})"
+            for name, stats in self.parse_stats.items()
+        )
+        return f"Parse failures: {rates}"
+
 # Initialize LLM client
 llm_client = LLMClient() 
\ No newline at end of file
@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any, Set, Tuple
+import httpx
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+LLM_ENDPOINT_CONCURRENCY = int(os.getenv("LLM_ENDPOINT_CONCURRENCY", "4"))  # concurrent requests per endpoint
+LLM_EJECT_AFTER = int(os.getenv("LLM_EJECT_AFTER", "3"))  # consecutive failures before ejecting an endpoint
+LLM_EJECT_SECONDS = float(os.getenv("LLM_EJECT_SECONDS", "30"))  # how long an ejected endpoint is skipped
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # seconds before hedging to another endpoint, 0 disables
+LATENCY_SMOOTHING = 0.2
+
+class Endpoint:
+    """A single model server and its load, latency and health"""
+
+    def __init__(self, url: str, max_concurrency: int = LLM_ENDPOINT_CONCURRENCY):
+        self.url = url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.outstanding = 0
+        self.latency: Optional[float] = None  # smoothed seconds per request
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def load(self) -> float:
+        """Outstanding requests relative to the endpoint's concurrency limit"""
+        return self.outstanding / self.max_concurrency
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.latency = latency if self.latency is None else self.latency + LATENCY_SMOOTHING * (latency - self.latency)
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= LLM_EJECT_AFTER:
+            self.ejected_until = time.monotonic() + LLM_EJECT_SECONDS
+            self.consecutive_failures = 0
+            logger.warning(f"Ejected LLM endpoint {self.url} for {LLM_EJECT_SECONDS:.0f} seconds after repeated failures")
+
+class EndpointPool:
+    """Route LLM requests across several model servers.
+
+    Requests go to the healthy endpoint with the fewest outstanding requests
+    (relative to its concurrency limit), ties broken by smoothed latency.
+    Endpoints that fail repeatedly are ejected for a while, failed requests
+    are retried once on another endpoint, and with LLM_HEDGE_AFTER a slow
+    request is duplicated to a second endpoint and the first answer wins.
+    """
+
+    def __init__(self, urls: List[str], headers: Dict[str, str], timeout: float):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.headers = headers
+        self.timeout = timeout
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def choose(self, exclude: Optional[Set[Endpoint]] = None, preferred: Optional[Endpoint] = None) -> Optional[Endpoint]:
+        """Pick the endpoint for the next request"""
+        exclude = exclude or set()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        if not candidates:
+            return None
+
+        healthy = [endpoint for endpoint in candidates if endpoint.is_healthy()]
+        if not healthy:
+            # Fail open: try the endpoint whose ejection ends first
+            return min(candidates, key=lambda endpoint: endpoint.ejected_until)
+
+        # Keep a session on its endpoint while that endpoint has spare capacity
+        if preferred in healthy and preferred.outstanding < preferred.max_concurrency:
+            return preferred
+        return min(healthy, key=lambda endpoint: (endpoint.load(), endpoint.latency or 0.0))
+
+    async def post(self, path: str, payload: Dict[str, Any], preferred: Optional[Endpoint] = None) -> Tuple[Dict[str, Any], Endpoint]:
+        """POST a request to the best endpoint, returning the response JSON and the endpoint that served it"""
+        tried: Set[Endpoint] = set()
+        first = self.choose(preferred=preferred)
+        tried.add(first)
+        tasks = {asyncio.create_task(self._post_to(first, path, payload)): first}
+
+        try:
+            hedged = False
+            last_error: Optional[Exception] = None
+            while tasks:
+                timeout = LLM_HEDGE_AFTER if LLM_HEDGE_AFTER > 0 and not hedged else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # The request is slow, hedge it on another endpoint
+                    hedged = True
+                    second = self.choose(exclude=tried)
+                    if second:
+                        tried.add(second)
+                        self.hedges += 1
+                        tasks[asyncio.create_task(self._post_to(second, path, payload))] = second
+                    continue
+
+                for task in done:
+                    endpoint = tasks.pop(task)
+                    if task.exception() is None:
+                        if endpoint is not first:
+                            self.hedge_wins += 1
+                        return task.result(), endpoint
+                    last_error = task.exception()
+
+                # Fail over once to an endpoint that has not been tried
+                if not tasks and len(tried) < 2:
+                    fallback = self.choose(exclude=tried)
+                    if fallback:
+                        tried.add(fallback)
+                        logger.warning(f"LLM request failed on {first.url}, retrying on {fallback.url}: {last_error}")
+                        tasks[asyncio.create_task(self._post_to(fallback, path, payload))] = fallback
+
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _post_to(self, endpoint: Endpoint, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a request to one endpoint within its concurrency limit"""
+        endpoint.outstanding += 1
+        try:
+            async with endpoint.semaphore:
+                if endpoint.client is None:
+                    endpoint.client = httpx.AsyncClient(timeout=self.timeout)
+                started = time.monotonic()
+                try:
+                    response = await endpoint.client.post(f"{endpoint.url}{path}", headers=self.headers, json=payload)
+                    response.raise_for_status()
+                    result = response.json()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    endpoint.record_failure()
+                    raise
+                endpoint.record_success(time.monotonic() - started)
+                return result
+        finally:
+            endpoint.outstanding -= 1
+
+    async def close(self) -> None:
+        """Close the HTTP connections to all endpoints"""
+        for endpoint in self.endpoints:
+            if endpoint.client is not None:
+                await endpoint.client.aclose()
+                endpoint.client = None
+
+    def report(self) -> str:
+        """Summarize load, latency and health per endpoint"""
+        parts = []
+        for endpoint in self.endpoints:
+            latency = f"{endpoint.latency:.2f}s" if endpoint.latency is not None else "n/a"
+            state = "up" if endpoint.is_healthy() else "ejected"
+            parts.append(f"{endpoint.url} [{state}] outstanding={endpoint.outstanding} latency={latency} errors={endpoint.errors}/{endpoint.requests}")
+        return f"LLM endpoints: {'; '.join(parts)} | hedges: {self.hedge_wins}/{self.hedges} won"
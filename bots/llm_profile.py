@@ -0,0 +1,167 @@
+"""Per-template LLM cost profile.
+
+Every generation is tagged with the prompt template it came from, and the
+token counts and durations the model server returns are aggregated per
+template. The simulator logs the profile with its periodic reports and
+saves it to LLM_PROFILE_FILE; print a saved profile with:
+
+    python llm_profile.py [llm_profile.json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional, Any
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+LLM_PROFILE_FILE = os.getenv("LLM_PROFILE_FILE", "llm_profile.json")
+LLM_PROFILE_WINDOW = int(os.getenv("LLM_PROFILE_WINDOW", "200"))  # recent calls per template for rolling rates
+
+# Duration fields of a model server response are in nanoseconds
+NANOSECONDS = 1e9
+
+class TemplateStats:
+    """Totals and a rolling window of calls for one prompt template"""
+
+    def __init__(self, window: int = LLM_PROFILE_WINDOW):
+        self.calls = 0
+        self.retries = 0
+        self.parse_failures = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.prefill_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.load_seconds = 0.0
+        self.wall_seconds = 0.0
+        # (prompt tokens, output tokens, prefill s, decode s, wall s) of the most recent calls
+        self.recent: deque = deque(maxlen=window)
+
+    def record(self, result: Dict[str, Any], wall_seconds: float) -> None:
+        prompt_tokens = result.get("prompt_eval_count", 0)
+        output_tokens = result.get("eval_count", 0)
+        prefill = result.get("prompt_eval_duration", 0) / NANOSECONDS
+        decode = result.get("eval_duration", 0) / NANOSECONDS
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        self.prefill_seconds += prefill
+        self.decode_seconds += decode
+        self.load_seconds += result.get("load_duration", 0) / NANOSECONDS
+        self.wall_seconds += wall_seconds
+        self.recent.append((prompt_tokens, output_tokens, prefill, decode, wall_seconds))
+
+    @property
+    def model_seconds(self) -> float:
+        return self.prefill_seconds + self.decode_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals plus rates and latency over the rolling window"""
+        recent = list(self.recent)
+        recent_prefill = sum(r[2] for r in recent)
+        recent_decode = sum(r[3] for r in recent)
+        walls = sorted(r[4] for r in recent)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "parseFailures": self.parse_failures,
+            "errors": self.errors,
+            "promptTokens": self.prompt_tokens,
+            "outputTokens": self.output_tokens,
+            "prefillSeconds": round(self.prefill_seconds, 3),
+            "decodeSeconds": round(self.decode_seconds, 3),
+            "loadSeconds": round(self.load_seconds, 3),
+            "wallSeconds": round(self.wall_seconds, 3),
+            "prefillTokensPerSecond": round(sum(r[0] for r in recent) / recent_prefill, 1) if recent_prefill else None,
+            "decodeTokensPerSecond": round(sum(r[1] for r in recent) / recent_decode, 1) if recent_decode else None,
+            "p50WallSeconds": round(walls[len(walls) // 2], 3) if walls else None,
+            "p95WallSeconds": round(walls[min(int(len(walls) * 0.95), len(walls) - 1)], 3) if walls else None
+        }
+
+class LLMProfiler:
+    """Aggregate LLM cost per prompt template"""
+
+    def __init__(self):
+        self.templates: Dict[str, TemplateStats] = {}
+        self.started = time.time()
+
+    def _stats(self, template: str) -> TemplateStats:
+        stats = self.templates.get(template)
+        if stats is None:
+            stats = self.templates[template] = TemplateStats()
+        return stats
+
+    def record_call(self, template: str, result: Dict[str, Any], wall_seconds: float) -> None:
+        self._stats(template).record(result, wall_seconds)
+
+    def record_retry(self, template: str) -> None:
+        self._stats(template).retries += 1
+
+    def record_parse_failure(self, template: str) -> None:
+        self._stats(template).parse_failures += 1
+
+    def record_error(self, template: str) -> None:
+        self._stats(template).errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "startedAt": self.started,
+            "savedAt": time.time(),
+            "templates": {template: stats.summary() for template, stats in self.templates.items()}
+        }
+
+    def save(self, path: str = LLM_PROFILE_FILE) -> None:
+        """Write the current profile, replacing the previous one atomically"""
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Failed to save LLM profile to {path}: {e}")
+
+    def report(self) -> str:
+        return format_report(self.snapshot())
+
+def format_report(snapshot: Dict[str, Any]) -> str:
+    """Table of templates ordered by the model time they used"""
+    templates = snapshot.get("templates", {})
+    if not templates:
+        return "LLM profile: no generations yet"
+    total_model = sum(t["prefillSeconds"] + t["decodeSeconds"] for t in templates.values()) or 1e-9
+    lines = [
+        "LLM profile by template:",
+        f"{'template':<16}{'calls':>7}{'model%':>8}{'prompt':>8}{'output':>8}{'prefill/s':>11}{'decode/s':>10}"
+        f"{'prefill':>9}{'decode':>9}{'p95':>8}{'retry':>7}{'parse':>7}{'error':>7}"
+    ]
+    ordered = sorted(templates.items(), key=lambda item: item[1]["prefillSeconds"] + item[1]["decodeSeconds"], reverse=True)
+    for template, t in ordered:
+        calls = max(t["calls"], 1)
+        model_share = (t["prefillSeconds"] + t["decodeSeconds"]) / total_model
+        lines.append(
+            f"{template:<16}{t['calls']:>7}{model_share:>8.0%}{t['promptTokens'] / calls:>8.0f}{t['outputTokens'] / calls:>8.0f}"
+            f"{t['prefillTokensPerSecond'] or 0:>11.0f}{t['decodeTokensPerSecond'] or 0:>10.0f}"
+            f"{t['prefillSeconds'] / calls * 1000:>7.0f}ms{t['decodeSeconds'] / calls * 1000:>7.0f}ms"
+            f"{(t['p95WallSeconds'] or 0):>7.1f}s{t['retries']:>7}{t['parseFailures']:>7}{t['errors']:>7}"
+        )
+    return "\n".join(lines)
+
+# Profiler shared by all LLM calls
+llm_profiler = LLMProfiler()
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else LLM_PROFILE_FILE
+    try:
+        with open(path) as f:
+            print(format_report(json.load(f)))
+    except FileNotFoundError:
+        sys.exit(f"No LLM profile found at {path}")
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+from typing import Dict, Optional, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def parse_category_values(spec: str) -> Dict[str, float]:
+    """Parse per-category settings given as "category=value,category=value" """
+    values = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        category, _, value = item.partition("=")
+        values[category.strip()] = float(value)
+    return values
+
+# Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json" (JSON lines)
+LOG_FILE = os.getenv("LOG_FILE", "")  # optional file written in addition to stderr
+# Fraction of records kept per category, e.g. "llm.payload=0.01,connections=0.1"
+LOG_SAMPLE_RATES = parse_category_values(os.getenv("LOG_SAMPLE_RATES", ""))
+# Maximum records per second per category, e.g. "llm=20"
+LOG_RATE_LIMITS = parse_category_values(os.getenv("LOG_RATE_LIMITS", ""))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class LazyJson:
+    """Defer json.dumps of a log argument until the record is actually formatted"""
+
+    def __init__(self, value: Any, indent: Optional[int] = None):
+        self.value = value
+        self.indent = indent
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, indent=self.indent, default=str)
+
+class CategoryFilter(logging.Filter):
+    """Sample and rate-limit records per category.
+
+    The category comes from extra={"category": ...}; a setting for "llm"
+    also applies to "llm.payload" unless that has its own. Records without
+    a category pass through untouched.
+    """
+
+    def __init__(self, sample_rates: Dict[str, float], rate_limits: Dict[str, float]):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self.buckets: Dict[str, list] = {}  # category -> [tokens, last refill]
+        self.dropped: Dict[str, int] = {}
+
+    def _setting(self, settings: Dict[str, float], category: str) -> Optional[float]:
+        while category:
+            if category in settings:
+                return settings[category]
+            category = category.rpartition(".")[0]
+        return None
+
+    def _within_rate(self, category: str, limit: float) -> bool:
+        now = time.monotonic()
+        bucket = self.buckets.setdefault(category, [limit, now])
+        bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        category = getattr(record, "category", None)
+        if not category:
+            return True
+
+        sample_rate = self._setting(self.sample_rates, category)
+        keep = sample_rate is None or random.random() < sample_rate
+        if keep:
+            limit = self._setting(self.rate_limits, category)
+            keep = limit is None or self._within_rate(category, limit)
+        if not keep:
+            self.dropped[category] = self.dropped.get(category, 0) + 1
+        return keep
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        category = getattr(record, "category", None)
+        if category:
+            entry["category"] = category
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records without formatting them on the calling thread.
+
+    The queue stays in-process, so records need not be made picklable; the
+    listener thread merges the message and arguments when it writes them.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route all log records through a queue to a background writer thread"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = JsonLinesFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(CategoryFilter(LOG_SAMPLE_RATES, LOG_RATE_LIMITS))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -4,18 +4,28 @@ import random
 import asyncio
 import logging
 from dotenv import load_dotenv
-from typing import Dict, List, Optional, Any
 
-from db import db
-from bot import Bot
-from accounts import get_or_create_bot_accounts
+from logging_setup import setup_logging, stop_logging
+from storage import storage, MongoStorage
+from bot import Bot, RECENT_POSTS_LIMIT
+from accounts import get_or_create_bot_accounts, load_bot_personas
 from llm import llm_client
+from llm_profile import llm_profiler
+from events import EventRouter
+from feed import feed_index
+from graph import social_graph
+from scheduler import ActionScheduler
+from tracing import action_trace
+from retention import run_retention, retention_enabled
+from pregen import post_buffer, PREGEN_BUFFER_SIZE
+from singleflight import shared_reads
+from counters import sharded_counters
+from profiling import loop_profiler, LOOP_LAG_THRESHOLD
+from arrivals import ArrivalController, TARGET_ACTIONS_PER_SECOND
+from checkpoint import CHECKPOINT_INTERVAL, build_state, save_checkpoint, load_checkpoint
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging through the background queue listener
+setup_logging()
 logger = logging.getLogger("network-nexus-simulator")
 
 # Load environment variables
@@ -25,18 +35,31 @@ load_dotenv()
 NUM_BOTS = int(os.getenv("NUM_BOTS", "5"))
 TICK_INTERVAL = int(os.getenv("TICK_INTERVAL", "30"))  # seconds between ticks
 MODEL_NAME = os.getenv("MODEL_NAME", "default")
+EVENT_MIN_INTERVAL = float(os.getenv("EVENT_MIN_INTERVAL", "2"))  # min seconds between event-driven ticks
+REPORT_INTERVAL = int(os.getenv("REPORT_INTERVAL", "10"))  # ticks between scheduler reports
+SIMULATOR_SEED = os.getenv("SIMULATOR_SEED")  # seed for the simulator's random choices, for repeatable runs
 
 # Main simulation function
 async def run_simulation():
     """Run the continuous social network simulation"""
     logger.info("Starting Network Nexus Simulator")
+    loop_profiler.install()
+    seed = int(SIMULATOR_SEED) if SIMULATOR_SEED else None
+    if seed is not None:
+        random.seed(seed)
+    startup_times = {}
+    startup_start = time.perf_counter()
     
     # Ensure LLM model is available
     logger.info(f"Ensuring LLM model {MODEL_NAME} is available...")
+    phase_start = time.perf_counter()
     await llm_client.ensure_model_available()
+    startup_times["llm"] = time.perf_counter() - phase_start
     
     # Get or create bot accounts
+    phase_start = time.perf_counter()
     bot_ids = await get_or_create_bot_accounts(NUM_BOTS)
+    startup_times["accounts"] = time.perf_counter() - phase_start
     
     if not bot_ids:
         logger.error("Failed to create any bot accounts. Exiting.")
@@ -44,30 +67,157 @@ async def run_simulation():
     
     logger.info(f"Using {len(bot_ids)} bot accounts for simulation")
     
+    # Resume scheduler and bot state from the last checkpoint, if any
+    phase_start = time.perf_counter()
+    checkpoint = load_checkpoint()
+    bot_states = checkpoint["bots"] if checkpoint else {}
+    startup_times["checkpoint"] = time.perf_counter() - phase_start
+    
+    # Load the personas of bots not in the checkpoint in bulk
+    phase_start = time.perf_counter()
+    personas = load_bot_personas([bot_id for bot_id in bot_ids if bot_id not in bot_states], RECENT_POSTS_LIMIT)
+    startup_times["personas"] = time.perf_counter() - phase_start
+    
     # Create bot instances
-    bots = [Bot(bot_id) for bot_id in bot_ids]
+    phase_start = time.perf_counter()
+    bots = [
+        Bot(bot_id, bot_states.get(bot_id), personas.get(bot_id))
+        for bot_id in bot_ids
+        if bot_id in bot_states or bot_id in personas
+    ]
+    startup_times["bots"] = time.perf_counter() - phase_start
+    startup_times["total"] = time.perf_counter() - startup_start
+    
+    # Report where startup time went
+    logger.info("=== Startup Report ===")
+    logger.info(f"Bots: {len(bots)} ({len(bots) - len(personas)} from checkpoint, {len(personas)} loaded in bulk)")
+    for phase, seconds in startup_times.items():
+        logger.info(f"{phase}: {seconds:.3f}s")
+    logger.info("======================")
+    
+    # Record executed actions when TRACE_FILE is set
+    action_trace.start(bots, seed)
+    
+    # Load the recent posts that all bots sample from, and the connection graph
+    feed_index.load()
+    social_graph.load()
+    
+    # Mix actions from configured weights within the LLM token budget, among bots off cooldown
+    scheduler = ActionScheduler()
+    scheduler.track(bots)
+    
+    # Route new posts, comments and connection requests to the bots' inboxes, where they
+    # make the bots eligible for react_to_event
+    router = EventRouter(bots, checkpoint.get("resumeToken") if checkpoint else None)
+    router.delivery_listeners.append(scheduler.notify)
+    if storage.change_streams:
+        router.start()
+    
+    # Periodically remove old simulated content from MongoDB, if a retention limit is configured
+    retention_task = asyncio.create_task(run_retention(feed_index, social_graph)) if retention_enabled() and isinstance(storage, MongoStorage) else None
+    
+    # Roll sharded like and comment counters up into the posts, if enabled
+    counter_task = asyncio.create_task(sharded_counters.run()) if sharded_counters.enabled and isinstance(storage, MongoStorage) else None
+    
+    # Fill the bots' post buffers whenever the LLM is idle
+    pregen_task = asyncio.create_task(post_buffer.fill(bots, scheduler)) if PREGEN_BUFFER_SIZE > 0 else None
+    
+    # Start actions at a target rate regardless of how long earlier ones take, if configured
+    arrivals = ArrivalController() if TARGET_ACTIONS_PER_SECOND > 0 else None
+    
+    # In open-loop mode a tick is one arrival, so reports and checkpoints follow wall-clock
+    # time instead, as often as tick mode would make them at one tick per TICK_INTERVAL
+    next_report = time.monotonic() + REPORT_INTERVAL * TICK_INTERVAL
+    next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL * TICK_INTERVAL
+    checkpoint_task = None
     
     # Run the simulation continuously
-    tick = 0
-    while True:
-        tick += 1
-        logger.info(f"Starting tick {tick}")
-        
-        # Choose a random bot to perform an action
-        bot = random.choice(bots)
-        logger.info(f"Selected bot: {bot.name}")
-        
-        # Perform a random action
-        success = await bot.perform_random_action()
-        
-        if success:
-            logger.info(f"Bot {bot.name} successfully performed an action")
-        else:
-            logger.warning(f"Bot {bot.name} failed to perform an action")
-        
-        # Wait for the next tick
-        logger.info(f"Waiting {TICK_INTERVAL} seconds until next tick")
-        await asyncio.sleep(TICK_INTERVAL)
+    tick = checkpoint["tick"] if checkpoint else 0
+    try:
+        while True:
+            if arrivals:
+                lateness = await arrivals.wait()
+                if lateness > 1:
+                    logger.debug(f"Arrival started {lateness:.2f}s late")
+            tick += 1
+            logger.info(f"Starting tick {tick}")
+            
+            # Choose an action by weight and a bot eligible for it; reacting to routed events is one of them
+            bot, action = scheduler.next_dispatch()
+            
+            # Perform or dispatch an action; in open-loop mode without waiting for it
+            if bot is None:
+                logger.info("No bot is eligible for any action")
+                if arrivals:
+                    arrivals.skip()
+            elif arrivals:
+                logger.info(f"Selected bot: {bot.name}")
+                if arrivals.start(scheduler.dispatch(bot, action)) is None:
+                    # Dropped because too many actions are outstanding; free the claimed bot
+                    scheduler.unclaim(bot)
+            else:
+                logger.info(f"Selected bot: {bot.name}")
+                await scheduler.dispatch(bot, action)
+            loop_profiler.on_tick()
+            
+            if arrivals:
+                report_due = time.monotonic() >= next_report
+                if report_due:
+                    next_report = time.monotonic() + REPORT_INTERVAL * TICK_INTERVAL
+            else:
+                report_due = tick % REPORT_INTERVAL == 0
+            if report_due:
+                logger.info(scheduler.report())
+                if arrivals:
+                    logger.info(arrivals.report())
+                if LOOP_LAG_THRESHOLD > 0:
+                    logger.info(loop_profiler.report())
+                logger.info(llm_client.parse_failure_report())
+                logger.info(llm_profiler.report())
+                llm_profiler.save()
+                logger.info(llm_client.pool.report())
+                logger.info(feed_index.report())
+                logger.info(shared_reads.report())
+                if counter_task:
+                    logger.info(sharded_counters.report())
+                if pregen_task:
+                    logger.info(post_buffer.report())
+                logger.info(social_graph.report())
+            
+            # Periodically checkpoint state so a restart resumes where we left off
+            if arrivals:
+                # Save in the background so the checkpoint does not delay the next arrivals
+                if time.monotonic() >= next_checkpoint and (checkpoint_task is None or checkpoint_task.done()):
+                    next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL * TICK_INTERVAL
+                    checkpoint_task = asyncio.create_task(asyncio.to_thread(save_checkpoint, build_state(tick, bots, router)))
+            elif tick % CHECKPOINT_INTERVAL == 0:
+                await asyncio.to_thread(save_checkpoint, build_state(tick, bots, router))
+            
+            # Wait for the next tick, waking up early when new events arrive
+            if arrivals:
+                continue
+            logger.info(f"Waiting up to {TICK_INTERVAL} seconds until next tick")
+            if await router.wait_for_events(TICK_INTERVAL):
+                await asyncio.sleep(EVENT_MIN_INTERVAL)
+    finally:
+        router.stop()
+        loop_profiler.stop()
+        if pregen_task:
+            pregen_task.cancel()
+        if retention_task:
+            retention_task.cancel()
+        if counter_task:
+            counter_task.cancel()
+        if arrivals:
+            await arrivals.shutdown()
+        if checkpoint_task:
+            await asyncio.gather(checkpoint_task, return_exceptions=True)
+        await scheduler.shutdown()
+        await llm_client.pool.close()
+        await asyncio.to_thread(save_checkpoint, build_state(tick, bots, router))
+        action_trace.close()
+        llm_profiler.save()
+        storage.close()
 
 if __name__ == "__main__":
     try:
@@ -78,3 +228,4 @@ if __name__ == "__main__":
         logger.error(f"Simulation stopped due to error: {e}")
     finally:
         logger.info("Simulation ended")
+        stop_logging()
@@ -0,0 +1,316 @@
+"""Bulk population of the Network Nexus database with synthetic data.
+
+Generates users, profile sections, connections, posts, comments and likes
+in the same document shapes the simulator and API use, without any LLM
+calls, to reach dataset sizes the bots alone never would:
+
+    python populate.py --users 1000000 --posts 10000000 --workers 8
+
+Documents get deterministic ObjectIds derived from the run seed and their
+index, so an interrupted run can be resumed: finished chunks are recorded
+in the populate_progress collection and skipped, and re-inserting a
+partially written chunk only hits (ignored) duplicate key errors.
+"""
+import time
+import random
+import struct
+import bisect
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Callable
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from logging_setup import setup_logging, stop_logging
+from db import db
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Duplicate key error, expected when a resumed chunk was partially inserted before
+DUPLICATE_KEY = 11000
+
+# Prefix of the sub of generated users; unlike "sim-" it is never taken for a bot
+# or cleaned up by retention
+BULK_SUB_PREFIX = "bulk-"
+
+# Children (comments of a post, connections of a user) per parent that get distinct ids
+MAX_CHILDREN = 4096
+
+# Document kinds, part of every generated ObjectId
+KIND_USER, KIND_POST, KIND_COMMENT, KIND_CONNECTION, KIND_SECTION = range(1, 6)
+
+FIRST_NAMES = ["Amara", "Chen", "Priya", "Alejandro", "Fatima", "Sven", "Mei-Ling", "Kwame", "Ivan", "Olga",
+               "Isabella", "Dmitry", "Aiko", "Tomasz", "Leila", "Mateo", "Nia", "Arjun", "Freya", "Omar",
+               "Sofia", "Kenji", "Zanele", "Lucas", "Yasmin", "Anders", "Ngozi", "Rafael", "Hana", "Emil"]
+LAST_NAMES = ["Okafor", "Wei", "Sharma", "Rodriguez", "Hassan", "Johansson", "Chang", "Mensah", "Petrov",
+              "Kovalenko", "Santos", "Volkov", "Tanaka", "Nowak", "Haddad", "Garcia", "Adeyemi", "Iyer",
+              "Larsen", "Farouk", "Rossi", "Sato", "Dlamini", "Silva", "Karimi", "Berg", "Eze", "Costa",
+              "Kim", "Novak"]
+TITLES = ["Software Engineer", "Product Manager", "Data Scientist", "UX Designer", "DevOps Engineer",
+          "Marketing Lead", "Financial Analyst", "Research Scientist", "Sales Director", "HR Business Partner",
+          "Cloud Architect", "Security Engineer", "Operations Manager", "Content Strategist", "CTO"]
+TOPICS = ["cloud costs", "team rituals", "hiring", "remote work", "AI tooling", "observability", "design systems",
+          "customer interviews", "quarterly planning", "mentoring", "open source", "incident reviews",
+          "data quality", "accessibility", "pricing experiments"]
+COMPANIES = ["Nordlys Labs", "Kite & Keel", "Quantum Harbor", "Savanna Systems", "Andes Analytics",
+             "Lotus Fintech", "Baltic Forge", "Sahara Cloud", "Maple Circuit", "Coral Robotics"]
+SCHOOLS = ["University of Nairobi", "TU Delft", "Universidad de Chile", "IIT Madras", "University of Toronto",
+           "Seoul National University", "University of Cape Town", "ETH Zurich", "Monash University"]
+SKILLS = [("Python", "Programming Languages"), ("Go", "Programming Languages"), ("Kubernetes", "Tools"),
+          ("React", "Frameworks"), ("SQL", "Programming Languages"), ("Agile", "Methodologies"),
+          ("Leadership", "Soft Skills"), ("Communication", "Soft Skills"), ("Terraform", "Tools"),
+          ("Figma", "Tools"), ("Machine Learning", "Data"), ("Negotiation", "Soft Skills")]
+POST_TEMPLATES = ["Spent the day thinking about {topic}. Turns out the hard part is never the tooling.",
+                  "Hot take: most problems with {topic} are communication problems in disguise.",
+                  "Three things I learned this quarter about {topic} - thread in the comments!",
+                  "Shipped a small improvement to how we handle {topic} today. Tiny change, big relief.",
+                  "Anyone else find {topic} harder at scale than the blog posts suggest?"]
+COMMENT_TEMPLATES = ["Great point, we saw the same thing with {topic}.", "Totally agree!",
+                     "Interesting - how did your team measure the impact?", "This resonates a lot.",
+                     "We tried something similar and it backfired, curious what you did differently.",
+                     "Saving this for our next retro."]
+
+# Relative posting activity per hour of day (UTC), for a realistic diurnal pattern
+HOURLY_ACTIVITY = [1, 1, 1, 1, 1, 2, 3, 5, 8, 9, 9, 8, 7, 8, 9, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+def make_id(seed: int, kind: int, index: int, created: datetime) -> ObjectId:
+    """Deterministic ObjectId: creation timestamp, 2-byte run tag, document kind and 5-byte index"""
+    run_tag = hashlib.sha1(str(seed).encode()).digest()[:2]
+    return ObjectId(struct.pack(">I", int(created.timestamp())) + run_tag + bytes([kind]) + index.to_bytes(5, "big"))
+
+class Population:
+    """Generator for one populate run, deterministic for a given seed"""
+
+    def __init__(self, args: argparse.Namespace, base_time: datetime):
+        self.args = args
+        self.seed = args.seed
+        self.base_time = base_time
+        self.start_time = base_time - timedelta(days=args.days)
+
+        # Heavy-tailed popularity and activity, shared read-only by all writer threads
+        rng = random.Random(self.seed)
+        self.popularity = self._cumulative([rng.paretovariate(args.alpha) for _ in range(args.users)])
+        self.activity = self._cumulative([rng.paretovariate(args.alpha) for _ in range(args.users)])
+        self.hour_weights = self._cumulative(HOURLY_ACTIVITY)
+
+    @staticmethod
+    def _cumulative(weights: List[float]) -> List[float]:
+        total = 0.0
+        cumulative = []
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        return cumulative
+
+    @staticmethod
+    def _pick(rng: random.Random, cumulative: List[float]) -> int:
+        """Pick an index with probability proportional to its weight"""
+        return bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+
+    def user_created(self, index: int) -> datetime:
+        """Users join spread evenly over the year before the simulated window"""
+        return self.start_time - timedelta(days=365) * (1 - index / max(self.args.users, 1))
+
+    def user_id(self, index: int) -> ObjectId:
+        return make_id(self.seed, KIND_USER, index, self.user_created(index))
+
+    def random_time(self, rng: random.Random) -> datetime:
+        """Timestamp within the window, skewed towards recent days and busy hours"""
+        day = min(int(rng.expovariate(3 / self.args.days)), self.args.days - 1)
+        hour = self._pick(rng, self.hour_weights)
+        moment = self.base_time - timedelta(days=day + 1)
+        return moment.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+    def users_chunk(self, start: int, end: int) -> Dict[str, List[Dict[str, Any]]]:
+        rng = random.Random(f"{self.seed}-users-{start}")
+        docs = {"users": [], "experiences": [], "skills": [], "educations": []}
+        for i in range(start, end):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            title = rng.choice(TITLES)
+            created = self.user_created(i)
+            user_id = self.user_id(i)
+            docs["users"].append({
+                "_id": user_id,
+                "sub": f"{BULK_SUB_PREFIX}{self.seed}-{i}",
+                "username": f"{first}{last}{i}".lower().replace("-", ""),
+                "name": f"{first} {last}",
+                "title": title,
+                "avatarUrl": f"https://i.pravatar.cc/150?u={i}",
+                "bio": f"{title} interested in {rng.choice(TOPICS)} and {rng.choice(TOPICS)}.",
+                "createdAt": created,
+                "updatedAt": created
+            })
+            if not self.args.sections:
+                continue
+            start_date = created - timedelta(days=rng.randint(365, 3650))
+            docs["experiences"].append({
+                "_id": make_id(self.seed, KIND_SECTION, i * 3, created),
+                "user": user_id, "title": title, "company": rng.choice(COMPANIES),
+                "location": "Remote", "startDate": start_date, "endDate": None, "current": True,
+                "description": f"Working on {rng.choice(TOPICS)}.", "employmentType": "Full-time",
+                "industry": "Technology", "createdAt": created, "updatedAt": created
+            })
+            for n, (name, category) in enumerate(rng.sample(SKILLS, 3)):
+                docs["skills"].append({
+                    "_id": make_id(self.seed, KIND_SECTION, i * 3 + 1, created + timedelta(seconds=n)),
+                    "user": user_id, "name": name, "category": category,
+                    "endorsements": int(rng.paretovariate(1.5)) - 1, "endorsedBy": [],
+                    "createdAt": created, "updatedAt": created
+                })
+            docs["educations"].append({
+                "_id": make_id(self.seed, KIND_SECTION, i * 3 + 2, created),
+                "user": user_id, "school": rng.choice(SCHOOLS), "degree": "Bachelor of Science",
+                "fieldOfStudy": "Computer Science", "startDate": start_date - timedelta(days=1460),
+                "endDate": start_date - timedelta(days=30), "current": False, "grade": None,
+                "activities": None, "description": None, "createdAt": created, "updatedAt": created
+            })
+        return docs
+
+    def connections_chunk(self, start: int, end: int) -> Dict[str, List[Dict[str, Any]]]:
+        rng = random.Random(f"{self.seed}-connections-{start}")
+        docs = []
+        for i in range(start, end):
+            # Out-degree is heavy tailed around the configured mean; targets follow popularity
+            degree = min(int(rng.paretovariate(2) * self.args.degree / 2), self.args.users - 1, MAX_CHILDREN)
+            targets = set()
+            for _ in range(degree * 2):
+                if len(targets) >= degree:
+                    break
+                target = self._pick(rng, self.popularity)
+                if target != i:
+                    targets.add(target)
+            for n, target in enumerate(sorted(targets)):
+                created = self.random_time(rng)
+                docs.append({
+                    "_id": make_id(self.seed, KIND_CONNECTION, i * MAX_CHILDREN + n, created),
+                    "from": self.user_id(i), "to": self.user_id(target),
+                    "status": "pending" if rng.random() < self.args.pending else "connected",
+                    "createdAt": created, "updatedAt": created
+                })
+        return {"connections": docs}
+
+    def posts_chunk(self, start: int, end: int) -> Dict[str, List[Dict[str, Any]]]:
+        rng = random.Random(f"{self.seed}-posts-{start}")
+        docs = {"posts": [], "comments": []}
+        mean_comments = self.args.comments / max(self.args.posts, 1)
+        for i in range(start, end):
+            created = self.random_time(rng)
+            post_id = make_id(self.seed, KIND_POST, i, created)
+            topic = rng.choice(TOPICS)
+            # Engagement is heavy tailed: most posts get little, a few go viral
+            comment_count = min(int(rng.paretovariate(2) * mean_comments / 2), MAX_CHILDREN)
+            for n in range(comment_count):
+                comment_time = created + timedelta(minutes=rng.expovariate(1 / 120))
+                docs["comments"].append({
+                    "_id": make_id(self.seed, KIND_COMMENT, i * MAX_CHILDREN + n, comment_time),
+                    "post": post_id, "author": self.user_id(self._pick(rng, self.activity)),
+                    "content": rng.choice(COMMENT_TEMPLATES).format(topic=topic),
+                    "createdAt": comment_time, "updatedAt": comment_time
+                })
+            docs["posts"].append({
+                "_id": post_id,
+                "author": self.user_id(self._pick(rng, self.activity)),
+                "content": rng.choice(POST_TEMPLATES).format(topic=topic),
+                "timestamp": created,
+                "likes": int(rng.paretovariate(1.5) * self.args.likes / 3),
+                "comments": comment_count,
+                "createdAt": created, "updatedAt": created
+            })
+        return docs
+
+def insert_batch(collection_name: str, docs: List[Dict[str, Any]]) -> int:
+    """Insert a batch unordered, ignoring duplicates left by an interrupted run"""
+    if not docs:
+        return 0
+    try:
+        return len(db[collection_name].insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+def run_stage(name: str, total: int, chunk_size: int, generate: Callable, progress: Dict[str, Any], workers: int) -> None:
+    """Generate and insert one stage in parallel chunks, skipping chunks already done"""
+    done = set(progress.get(name, []))
+    chunks = [start for start in range(0, total, chunk_size) if start not in done]
+    if not chunks:
+        logger.info(f"Stage {name}: already complete")
+        return
+
+    logger.info(f"Stage {name}: {len(chunks)} chunks to write ({len(done)} already done)")
+    lock = threading.Lock()
+    counts: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    def write_chunk(start: int) -> None:
+        for collection_name, docs in generate(start, min(start + chunk_size, total)).items():
+            inserted = insert_batch(collection_name, docs)
+            with lock:
+                counts[collection_name] = counts.get(collection_name, 0) + inserted
+        # Record the finished chunk so a resumed run skips it
+        db.populate_progress.update_one({"_id": progress["_id"]}, {"$addToSet": {name: start}})
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_chunk, start) for start in chunks]
+        for n, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if n % max(len(futures) // 20, 1) == 0 or n == len(futures):
+                elapsed = time.perf_counter() - started
+                written = sum(counts.values())
+                logger.info(f"Stage {name}: {n}/{len(futures)} chunks, {written} documents, {written / elapsed:.0f} docs/s")
+
+    logger.info(f"Stage {name} finished in {time.perf_counter() - started:.1f}s: " + ", ".join(f"{c}={n}" for c, n in counts.items()))
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-populate the Network Nexus database with synthetic data")
+    parser.add_argument("--users", type=int, default=10000, help="number of users")
+    parser.add_argument("--posts", type=int, default=100000, help="number of posts")
+    parser.add_argument("--comments", type=int, default=300000, help="approximate number of comments")
+    parser.add_argument("--degree", type=float, default=20, help="mean connection requests sent per user")
+    parser.add_argument("--likes", type=float, default=10, help="approximate mean likes per post")
+    parser.add_argument("--pending", type=float, default=0.1, help="share of connections still pending")
+    parser.add_argument("--days", type=int, default=90, help="days of history to spread activity over")
+    parser.add_argument("--alpha", type=float, default=1.5, help="Pareto shape of popularity and activity")
+    parser.add_argument("--no-sections", dest="sections", action="store_false", help="skip experience/skills/education")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="documents generated per insert_many chunk")
+    parser.add_argument("--workers", type=int, default=4, help="parallel writer threads")
+    parser.add_argument("--seed", type=int, default=1, help="run seed; rerun with the same seed to resume")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    run_id = f"populate-{args.seed}"
+
+    # Reuse the base time of an interrupted run so regenerated documents are identical
+    progress = db.populate_progress.find_one({"_id": run_id})
+    if progress is None:
+        progress = {"_id": run_id, "baseTime": datetime.now(timezone.utc).replace(microsecond=0), "args": vars(args)}
+        db.populate_progress.insert_one(progress)
+    elif progress.get("args") != vars(args):
+        logger.warning(f"Resuming {run_id} with different arguments than it was started with; use a new --seed for a new dataset")
+    base_time = progress["baseTime"]
+    if base_time.tzinfo is None:
+        base_time = base_time.replace(tzinfo=timezone.utc)
+
+    logger.info(f"Populating run {run_id}: {args.users} users, {args.posts} posts, ~{args.comments} comments")
+    started = time.perf_counter()
+    population = Population(args, base_time)
+    run_stage("users", args.users, args.chunk_size, population.users_chunk, progress, args.workers)
+    run_stage("connections", args.users, max(args.chunk_size // max(int(args.degree), 1), 1), population.connections_chunk, progress, args.workers)
+    run_stage("posts", args.posts, args.chunk_size, population.posts_chunk, progress, args.workers)
+    logger.info(f"Population finished in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    setup_logging()
+    try:
+        main()
+    except KeyboardInterrupt:
+        logger.info("Population interrupted, rerun with the same --seed to resume")
+    finally:
+        stop_logging()
@@ -0,0 +1,93 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Any
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+PREGEN_BUFFER_SIZE = int(os.getenv("PREGEN_BUFFER_SIZE", "2"))  # ready posts kept per bot, 0 to disable
+PREGEN_TTL = float(os.getenv("PREGEN_TTL", "1800"))  # seconds a pre-generated post stays fresh
+PREGEN_INTERVAL = float(os.getenv("PREGEN_INTERVAL", "5"))  # seconds between checks for idle LLM capacity
+
+class PostBuffer:
+    """Per-bot buffers of posts generated ahead of time with idle LLM capacity.
+
+    create_post takes a buffered post when one is fresh and only generates
+    live on a miss. Posts older than PREGEN_TTL are discarded unused, so
+    bots never publish content written long before.
+    """
+
+    def __init__(self, size: int = PREGEN_BUFFER_SIZE, ttl: float = PREGEN_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.buffers: Dict[str, deque] = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.generated = 0
+
+    def _fresh(self, user_id: str) -> deque:
+        """The bot's buffer of (generated at, content), with expired posts dropped"""
+        buffer = self.buffers.setdefault(user_id, deque())
+        cutoff = time.monotonic() - self.ttl
+        while buffer and buffer[0][0] < cutoff:
+            buffer.popleft()
+            self.expired += 1
+        return buffer
+
+    def stock(self, user_id: str) -> int:
+        """Number of fresh posts ready for a bot"""
+        return len(self._fresh(user_id)) if self.size > 0 else 0
+
+    def put(self, user_id: str, content: str) -> None:
+        buffer = self._fresh(user_id)
+        if len(buffer) < self.size:
+            buffer.append((time.monotonic(), content))
+            self.generated += 1
+
+    def take(self, user_id: str) -> Optional[str]:
+        """Take the oldest fresh post of a bot, or None to generate one live"""
+        if self.size <= 0:
+            return None
+        buffer = self._fresh(user_id)
+        if not buffer:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return buffer.popleft()[1]
+
+    async def fill(self, bots: List[Any], scheduler: Any) -> None:
+        """Keep generating posts for the bots with the lowest stock while the LLM is idle"""
+        while True:
+            await asyncio.sleep(PREGEN_INTERVAL)
+            bot = min(bots, key=lambda b: self.stock(b.user_id), default=None)
+            if bot is None or self.stock(bot.user_id) >= self.size:
+                continue
+            try:
+                content = await scheduler.run_idle("create_post", bot.generate_post_content)
+            except Exception as e:
+                logger.error(f"Failed to pre-generate a post for {bot.name}: {e}")
+                continue
+            if content:
+                self.put(bot.user_id, content)
+                logger.debug(f"Pre-generated a post for {bot.name}")
+
+    def report(self) -> str:
+        served = self.hits + self.misses
+        hit_rate = self.hits / served if served else 0
+        stocked = sum(len(buffer) for buffer in self.buffers.values())
+        return (
+            f"Post buffer: hit rate {hit_rate:.0%} ({self.hits}/{served}), {stocked} ready, "
+            f"{self.generated} generated, {self.expired} expired"
+        )
+
+# Pre-generated posts shared by all bots
+post_buffer = PostBuffer()
@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import threading
+from collections import Counter, abc
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+PROFILE_TICKS = int(os.getenv("PROFILE_TICKS", "0"))  # profile the first N ticks; SIGUSR1 profiles the next N
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", "simulator_profile.folded")  # collapsed stacks for flamegraph.pl
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0"))  # flag loop stalls longer than this, 0 to disable
+DEFAULT_SIGNAL_TICKS = 100
+MAX_STACK_DEPTH = 64
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _collapse(frame) -> str:
+    """Folded stack of a frame, outermost first, as used by flamegraph.pl"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        # Leave out the profiler's own coroutine wrapper
+        if frame.f_code.co_filename != __file__:
+            names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class TimedCoroutine(abc.Coroutine):
+    """Coroutine wrapper that charges the wall and CPU time of every step to a name"""
+
+    def __init__(self, coro, name: str, stats: Dict[str, list]):
+        self.coro = coro
+        self.name = name
+        self.stats = stats
+
+    def _step(self, method, *args):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            return method(*args)
+        finally:
+            entry = self.stats.setdefault(self.name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - wall
+            entry[2] += time.thread_time() - cpu
+
+    def send(self, value):
+        return self._step(self.coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self.coro.throw, *args)
+
+    def close(self):
+        return self.coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+class LoopProfiler:
+    """Opt-in profiling of the simulator's event loop.
+
+    While a profile runs, a background thread samples the loop thread's
+    stack every PROFILE_SAMPLE_INTERVAL and a task factory charges the time
+    each coroutine spends running to it. After the configured number of
+    ticks the collapsed stacks are written to PROFILE_OUTPUT and the
+    per-coroutine wall and CPU times are logged. Separately, a watchdog
+    flags the stack of any callback blocking the loop for longer than
+    LOOP_LAG_THRESHOLD.
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.remaining_ticks = 0
+        self.samples: Counter = Counter()
+        self.coroutines: Dict[str, list] = {}
+        self.sampler: Optional[threading.Thread] = None
+        self.sampling = threading.Event()
+        self.heartbeat = time.monotonic()
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.stopped = threading.Event()
+
+    def install(self) -> None:
+        """Hook into the running loop: SIGUSR1 trigger, lag watchdog and PROFILE_TICKS"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                self.loop.add_signal_handler(signal.SIGUSR1, self.start, PROFILE_TICKS or DEFAULT_SIGNAL_TICKS)
+            except (NotImplementedError, RuntimeError):
+                pass
+        if LOOP_LAG_THRESHOLD > 0:
+            self.heartbeat = time.monotonic()
+            self.loop.call_soon(self._beat)
+            threading.Thread(target=self._watch_lag, name="loop-lag-watchdog", daemon=True).start()
+        if PROFILE_TICKS > 0:
+            self.start(PROFILE_TICKS)
+
+    def start(self, ticks: int) -> None:
+        """Profile the next number of ticks"""
+        if self.remaining_ticks:
+            return
+        logger.info(f"Profiling the next {ticks} ticks")
+        self.remaining_ticks = ticks
+        self.samples.clear()
+        self.coroutines.clear()
+        self.loop.set_task_factory(self._task_factory)
+        self.sampling.set()
+        self.sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self.sampler.start()
+
+    def on_tick(self) -> None:
+        """Count down the profiled ticks, finishing the profile after the last"""
+        if self.remaining_ticks:
+            self.remaining_ticks -= 1
+            if not self.remaining_ticks:
+                self.finish()
+
+    def _task_factory(self, loop, coro, **kwargs) -> asyncio.Task:
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        return asyncio.Task(TimedCoroutine(coro, name, self.coroutines), loop=loop, **kwargs)
+
+    def _sample(self) -> None:
+        """Sample the loop thread's stack until the profile finishes"""
+        while self.sampling.is_set():
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+            del frame
+            time.sleep(PROFILE_SAMPLE_INTERVAL)
+
+    def finish(self) -> None:
+        """Stop sampling, write the collapsed stacks and log the coroutine attribution"""
+        self.remaining_ticks = 0
+        self.sampling.clear()
+        self.loop.set_task_factory(None)
+        if self.sampler:
+            self.sampler.join()
+        try:
+            with open(PROFILE_OUTPUT, "w") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Wrote {sum(self.samples.values())} stack samples to {PROFILE_OUTPUT} (render with flamegraph.pl)")
+        except Exception as e:
+            logger.error(f"Failed to write profile to {PROFILE_OUTPUT}: {e}")
+        logger.info(self.coroutine_report())
+
+    def coroutine_report(self) -> str:
+        """Time spent running each coroutine; wall well above CPU means blocking I/O on the loop"""
+        if not self.coroutines:
+            return "Coroutine profile: no tasks ran"
+        lines = ["Coroutine profile (time on the event loop):"]
+        for name, (steps, wall, cpu) in sorted(self.coroutines.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"{name}: {steps} steps, wall {wall * 1000:.0f}ms, cpu {cpu * 1000:.0f}ms")
+        return "\n".join(lines)
+
+    def _beat(self) -> None:
+        """Loop heartbeat; a late beat is loop lag"""
+        now = time.monotonic()
+        interval = LOOP_LAG_THRESHOLD / 2
+        self.max_lag = max(self.max_lag, now - self.heartbeat - interval)
+        self.heartbeat = now
+        if not self.stopped.is_set():
+            self.loop.call_later(interval, self._beat)
+
+    def _watch_lag(self) -> None:
+        """Flag the stack of whatever blocks the loop past the threshold, once per stall"""
+        flagged = None
+        while not self.stopped.wait(LOOP_LAG_THRESHOLD / 2):
+            heartbeat = self.heartbeat
+            stalled = time.monotonic() - heartbeat - LOOP_LAG_THRESHOLD / 2
+            if stalled > LOOP_LAG_THRESHOLD and flagged != heartbeat:
+                flagged = heartbeat
+                self.stalls += 1
+                frame = sys._current_frames().get(self.loop_thread)
+                stack = _collapse(frame).split(";")[-5:] if frame is not None else []
+                del frame
+                logger.warning(f"Event loop blocked for {stalled:.2f}s in: {' <- '.join(reversed(stack))}")
+
+    def report(self) -> str:
+        return f"Loop lag: max {self.max_lag * 1000:.0f}ms, {self.stalls} stalls over {LOOP_LAG_THRESHOLD}s"
+
+    def stop(self) -> None:
+        if self.remaining_ticks:
+            self.finish()
+        self.stopped.set()
+
+# Profiler for the simulator loop
+loop_profiler = LoopProfiler()
@@ -0,0 +1,208 @@
+"""Retention of simulated content.
+
+Removes posts, comments and pending connection requests created by
+simulator accounts (sub starting with "sim-") once they are older than
+RETENTION_MAX_AGE_DAYS, or once sim posts beyond the newest
+RETENTION_MAX_POSTS would be kept. Expired documents are optionally
+exported to gzipped JSON lines in RETENTION_ARCHIVE_DIR before deletion.
+The synthetic dataset written by populate.py (sub starting with
+"bulk-") is never removed.
+
+The simulator runs a pass every RETENTION_INTERVAL seconds when a limit is
+configured; run a single pass by hand with:
+
+    python retention.py
+"""
+import os
+import gzip
+import time
+import heapq
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Set, Tuple
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from db import users, posts, comments, connections
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+RETENTION_MAX_AGE_DAYS = float(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))  # 0 keeps content of any age
+RETENTION_MAX_POSTS = int(os.getenv("RETENTION_MAX_POSTS", "0"))  # newest sim posts kept, 0 for no limit
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))  # documents scanned per batch
+RETENTION_PAUSE = float(os.getenv("RETENTION_PAUSE", "0.5"))  # seconds between batches, to throttle the load
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # seconds between retention passes
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "")  # export expired documents here before deleting
+AUTHOR_BATCH_SIZE = 10000  # sim users per query, keeping each $in well below the BSON size limit
+
+class Archive:
+    """Gzipped JSON lines files, one per collection and pass"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        self.files: Dict[str, Any] = {}
+
+    def write(self, collection: str, docs: List[Dict[str, Any]]) -> None:
+        if not self.directory or not docs:
+            return
+        f = self.files.get(collection)
+        if f is None:
+            os.makedirs(self.directory, exist_ok=True)
+            f = self.files[collection] = gzip.open(os.path.join(self.directory, f"{collection}-{self.stamp}.jsonl.gz"), "at")
+        for doc in docs:
+            f.write(json_util.dumps(doc) + "\n")
+        # Flush before the documents are deleted, so nothing is lost on a crash
+        f.flush()
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+class RetentionPass:
+    """One batched pass over the collections, deleting expired simulated content"""
+
+    def __init__(self, max_age_days: float = RETENTION_MAX_AGE_DAYS, max_posts: int = RETENTION_MAX_POSTS,
+                 batch_size: int = RETENTION_BATCH_SIZE, archive_dir: str = RETENTION_ARCHIVE_DIR):
+        self.max_age_days = max_age_days
+        self.max_posts = max_posts
+        self.batch_size = batch_size
+        self.archive = Archive(archive_dir)
+        self.sim_users: Set[ObjectId] = set()
+        self.deleted: Counter = Counter()
+        self.removed_posts: List[ObjectId] = []
+        self.removed_requests: List[Tuple[ObjectId, ObjectId]] = []
+
+    def cutoff(self) -> Optional[ObjectId]:
+        """ObjectId below which sim content has expired, from the age and count limits"""
+        cutoffs = []
+        if self.max_age_days > 0:
+            oldest = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+            cutoffs.append(ObjectId.from_datetime(oldest))
+        if self.max_posts > 0:
+            # _id of the oldest sim post still within the newest max_posts, merged over author batches
+            newest: List[ObjectId] = []
+            authors = list(self.sim_users)
+            for start in range(0, len(authors), AUTHOR_BATCH_SIZE):
+                batch = {"author": {"$in": authors[start:start + AUTHOR_BATCH_SIZE]}}
+                ids = [post["_id"] for post in posts.find(batch, {"_id": 1}).sort("_id", -1).limit(self.max_posts)]
+                newest = heapq.nlargest(self.max_posts, newest + ids)
+            if len(newest) >= self.max_posts:
+                cutoffs.append(newest[-1])
+        return max(cutoffs) if cutoffs else None
+
+    def load_sim_users(self) -> None:
+        self.sim_users = {user["_id"] for user in users.find({"sub": {"$regex": "^sim-"}}, {"_id": 1})}
+
+    def batches(self, collection: Any, cutoff: ObjectId, query: Dict[str, Any]):
+        """Yield batches of documents below the cutoff, walking the _id index in order"""
+        last_id = None
+        while True:
+            id_range = {"$lt": cutoff}
+            if last_id is not None:
+                id_range["$gt"] = last_id
+            batch = list(collection.find({**query, "_id": id_range}).sort("_id", 1).limit(self.batch_size))
+            if not batch:
+                return
+            last_id = batch[-1]["_id"]
+            yield batch
+
+    def expire_posts(self, batch: List[Dict[str, Any]]) -> None:
+        """Delete sim posts together with all of their comments"""
+        expired = [post for post in batch if post.get("author") in self.sim_users]
+        if not expired:
+            return
+        post_ids = [post["_id"] for post in expired]
+        post_comments = list(comments.find({"post": {"$in": post_ids}}))
+        self.archive.write("posts", expired)
+        self.archive.write("comments", post_comments)
+        self.deleted["comments"] += comments.delete_many({"post": {"$in": post_ids}}).deleted_count
+        self.deleted["posts"] += posts.delete_many({"_id": {"$in": post_ids}}).deleted_count
+        self.removed_posts.extend(post_ids)
+
+    def expire_comments(self, batch: List[Dict[str, Any]]) -> None:
+        """Delete sim comments on posts that are kept, decrementing their comment counters"""
+        expired = [comment for comment in batch if comment.get("author") in self.sim_users]
+        if not expired:
+            return
+        self.archive.write("comments", expired)
+        self.deleted["comments"] += comments.delete_many({"_id": {"$in": [c["_id"] for c in expired]}}).deleted_count
+        per_post = Counter(comment["post"] for comment in expired)
+        posts.bulk_write([UpdateOne({"_id": post_id}, {"$inc": {"comments": -count}}) for post_id, count in per_post.items()], ordered=False)
+
+    def expire_connections(self, batch: List[Dict[str, Any]]) -> None:
+        """Delete stale pending requests sent by sim users; accepted connections are kept"""
+        expired = [conn for conn in batch if conn.get("from") in self.sim_users]
+        if not expired:
+            return
+        self.archive.write("connections", expired)
+        self.deleted["connections"] += connections.delete_many({"_id": {"$in": [c["_id"] for c in expired]}}).deleted_count
+        self.removed_requests.extend((conn["from"], conn["to"]) for conn in expired if conn.get("to") is not None)
+
+    async def run(self) -> Counter:
+        """Run the pass, handing each batch to a worker thread and pausing between batches"""
+        started = time.perf_counter()
+        await asyncio.to_thread(self.load_sim_users)
+        cutoff = await asyncio.to_thread(self.cutoff) if self.sim_users else None
+        if cutoff is None:
+            return self.deleted
+        try:
+            # Posts first, so comments on deleted posts go with them instead of adjusting counters
+            for collection, query, expire in (
+                (posts, {}, self.expire_posts),
+                (comments, {}, self.expire_comments),
+                (connections, {"status": "pending"}, self.expire_connections)
+            ):
+                batches = self.batches(collection, cutoff, query)
+                while True:
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        break
+                    await asyncio.to_thread(expire, batch)
+                    await asyncio.sleep(RETENTION_PAUSE)
+        finally:
+            self.archive.close()
+        logger.info(
+            f"Retention pass removed {self.deleted['posts']} posts, {self.deleted['comments']} comments and "
+            f"{self.deleted['connections']} pending connections older than {cutoff.generation_time:%Y-%m-%d %H:%M} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return self.deleted
+
+def retention_enabled() -> bool:
+    return RETENTION_MAX_AGE_DAYS > 0 or RETENTION_MAX_POSTS > 0
+
+async def run_retention(feed_index: Any = None, social_graph: Any = None) -> None:
+    """Run retention passes forever, dropping removed posts and requests from the feed index and social graph"""
+    while True:
+        try:
+            retention = RetentionPass()
+            await retention.run()
+            if feed_index is not None and retention.removed_posts:
+                feed_index.remove(retention.removed_posts)
+            if social_graph is not None and retention.removed_requests:
+                social_graph.remove_pending_links(retention.removed_requests)
+        except Exception as e:
+            logger.error(f"Retention pass failed: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+if __name__ == "__main__":
+    from logging_setup import setup_logging, stop_logging
+
+    setup_logging()
+    try:
+        if not retention_enabled():
+            logger.error("Set RETENTION_MAX_AGE_DAYS or RETENTION_MAX_POSTS to choose what to remove")
+        else:
+            asyncio.run(RetentionPass().run())
+    finally:
+        stop_logging()
@@ -0,0 +1,379 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import logging
+import contextvars
+from collections import Counter
+from typing import Dict, List, Optional, Any, Tuple
+from dotenv import load_dotenv
+
+from llm import llm_client
+from pregen import post_buffer
+from bot import current_tick
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+def parse_action_weights(spec: str) -> Dict[str, float]:
+    """Parse weights given as "action=weight,action=weight" """
+    weights = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        action, _, weight = item.partition("=")
+        weights[action.strip()] = float(weight)
+    return weights
+
+# Configuration
+ACTION_WEIGHTS = parse_action_weights(os.getenv(
+    "ACTION_WEIGHTS",
+    "react_to_event=3,comment_on_post=3,create_post=2,like_post=4,send_connection_request=1,accept_connection_request=1"
+))
+# Routed events are handled unless their weight is explicitly set to 0
+ACTION_WEIGHTS.setdefault("react_to_event", 3)
+LLM_TOKENS_PER_SECOND = float(os.getenv("LLM_TOKENS_PER_SECOND", "100"))  # sustainable model throughput
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "30"))  # budget that may be spent at once
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "2"))  # concurrent LLM-backed actions
+
+# Actions that call the LLM, and the tokens assumed until real usage is measured
+LLM_ACTIONS = {"create_post", "comment_on_post", "react_to_event"}
+DEFAULT_ACTION_TOKENS = {"create_post": 400, "comment_on_post": 700, "react_to_event": 700}
+ESTIMATE_SMOOTHING = 0.2
+IDLE_HEADROOM = 2  # speculative work only runs while the budget covers this many times its estimate
+
+# Action that works through a bot's inbox, eligible while it holds routed events
+EVENT_ACTION = "react_to_event"
+
+# Tokens used by the LLM calls of the action running in the current task
+_action_tokens: contextvars.ContextVar = contextvars.ContextVar("action_tokens", default=None)
+
+class TokenBudget:
+    """Token bucket refilled at the LLM's sustainable tokens/second.
+
+    Actions reserve their estimated cost up front and settle the difference
+    once the real usage is known, so the balance may briefly go negative.
+    """
+
+    def __init__(self, tokens_per_second: float = LLM_TOKENS_PER_SECOND, burst_seconds: float = LLM_BURST_SECONDS):
+        self.rate = tokens_per_second
+        self.capacity = tokens_per_second * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def can_afford(self, tokens: float) -> bool:
+        """Check whether the budget currently covers the given cost"""
+        self._refill()
+        return self.tokens >= min(tokens, self.capacity)
+
+    def reserve(self, tokens: float) -> None:
+        """Take the estimated cost of an action from the budget"""
+        self._refill()
+        self.tokens -= tokens
+
+    def settle(self, reserved: float, used: float) -> None:
+        """Correct a reservation once the actual usage is known"""
+        self.tokens += reserved - used
+
+class BotPool:
+    """Set of bot ids supporting O(1) insertion, removal and random choice"""
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, user_id: str) -> None:
+        if user_id not in self.positions:
+            self.positions[user_id] = len(self.items)
+            self.items.append(user_id)
+
+    def discard(self, user_id: str) -> None:
+        position = self.positions.pop(user_id, None)
+        if position is None:
+            return
+        # Move the last item into the freed slot
+        last = self.items.pop()
+        if last != user_id:
+            self.items[position] = last
+            self.positions[last] = position
+
+    def choice(self) -> Optional[str]:
+        return random.choice(self.items) if self.items else None
+
+class CooldownQueue:
+    """Track when each bot becomes eligible for each action.
+
+    Bots off cooldown for an action sit in that action's pool; the others
+    wait in a min-heap ordered by their next eligible tick and move to the
+    pool once it passes. Picking an eligible bot is O(1) and every cooldown
+    change costs O(log n). Rescheduling leaves stale heap entries behind,
+    which are skipped when they surface. Bots running an action are held
+    out of all pools until it finishes. For EVENT_ACTION the pool holds the
+    bots with routed events in their inbox instead.
+    """
+
+    def __init__(self, actions: List[str]):
+        self.actions = actions
+        self.bots: Dict[str, Any] = {}
+        self.pools: Dict[str, BotPool] = {action: BotPool() for action in actions}
+        self.heaps: Dict[str, List[Tuple[int, str]]] = {action: [] for action in actions}
+        self.scheduled: Dict[str, Dict[str, int]] = {action: {} for action in actions}
+        self.held: Counter = Counter()
+
+    def track(self, bots: List[Any]) -> None:
+        for bot in bots:
+            self.bots[bot.user_id] = bot
+            self.refresh(bot)
+
+    def refresh(self, bot: Any) -> None:
+        """Place a bot in each action's pool or heap from its current cooldowns"""
+        if bot.user_id not in self.bots or self.held[bot.user_id]:
+            return
+        now = current_tick()
+        for action in self.actions:
+            if action == EVENT_ACTION:
+                if bot.inbox:
+                    self.pools[action].add(bot.user_id)
+                else:
+                    self.pools[action].discard(bot.user_id)
+                continue
+            ready = bot.next_eligible_tick(action)
+            if ready <= now:
+                self.scheduled[action].pop(bot.user_id, None)
+                self.pools[action].add(bot.user_id)
+            else:
+                self.pools[action].discard(bot.user_id)
+                if self.scheduled[action].get(bot.user_id) != ready:
+                    self.scheduled[action][bot.user_id] = ready
+                    heapq.heappush(self.heaps[action], (ready, bot.user_id))
+
+    def hold(self, bot: Any) -> None:
+        """Keep a bot out of the pools while it runs an action"""
+        if bot.user_id not in self.bots:
+            return
+        self.held[bot.user_id] += 1
+        for action in self.actions:
+            self.pools[action].discard(bot.user_id)
+            self.scheduled[action].pop(bot.user_id, None)
+
+    def release(self, bot: Any) -> None:
+        """Reschedule a bot once its action finished and may have started a cooldown"""
+        if self.held[bot.user_id] > 1:
+            self.held[bot.user_id] -= 1
+            return
+        self.held.pop(bot.user_id, None)
+        self.refresh(bot)
+
+    def advance(self) -> None:
+        """Move bots whose cooldown has passed into the pools"""
+        now = current_tick()
+        for action, heap in self.heaps.items():
+            scheduled = self.scheduled[action]
+            while heap and heap[0][0] <= now:
+                ready, user_id = heapq.heappop(heap)
+                if scheduled.get(user_id) == ready:
+                    del scheduled[user_id]
+                    self.pools[action].add(user_id)
+
+    def eligible(self, action: str) -> int:
+        return len(self.pools[action]) if action in self.pools else 0
+
+    def pick(self, action: str) -> Optional[Any]:
+        """Random bot eligible for an action"""
+        user_id = self.pools[action].choice()
+        return self.bots[user_id] if user_id is not None else None
+
+class ActionScheduler:
+    """Choose bot actions from configurable weights within the LLM token budget.
+
+    LLM-backed actions run as background tasks, up to LLM_MAX_IN_FLIGHT at a
+    time and only while the budget covers their estimated cost; otherwise the
+    tick is filled with a cheap database-only action instead. Bots registered
+    with track() are picked by next_dispatch() from those off cooldown for the
+    chosen action, so no tick lands on a bot that cannot act. The pick claims
+    the bot and any LLM capacity right away, before the action's task starts,
+    so concurrent arrivals cannot pick the same bot twice.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, budget: Optional[TokenBudget] = None):
+        self.weights = weights if weights is not None else ACTION_WEIGHTS
+        self.budget = budget or TokenBudget()
+        self.estimates = dict(DEFAULT_ACTION_TOKENS)
+        # LLM-backed actions by bot; None while claimed but not started yet
+        self.in_flight: Dict[str, Optional[asyncio.Task]] = {}
+        self.reserved: Dict[str, float] = {}
+        self.counts: Counter = Counter()
+        self.tokens_used = 0
+        self.started = time.monotonic()
+        self.cooldowns = CooldownQueue(list(self.weights))
+        llm_client.usage_listeners.append(self._record_usage)
+
+    def track(self, bots: List[Any]) -> None:
+        """Register the bots next_dispatch() picks from"""
+        self.cooldowns.track(bots)
+
+    def notify(self, bot: Any) -> None:
+        """Make a bot eligible to react once events were routed to its inbox"""
+        self.cooldowns.refresh(bot)
+
+    def _record_usage(self, tokens: int) -> None:
+        """Attribute LLM usage to the action running in the calling task"""
+        self.tokens_used += tokens
+        usage = _action_tokens.get()
+        if usage is not None:
+            usage[0] += tokens
+
+    def _llm_available(self, bot: Any, action: str) -> bool:
+        """Check whether an LLM-backed action may be started for a bot"""
+        return (
+            len(self.in_flight) < LLM_MAX_IN_FLIGHT
+            and bot.user_id not in self.in_flight
+            and not bot.is_on_cooldown(action)
+            and self.budget.can_afford(self.estimates[action])
+        )
+
+    def _needs_llm(self, bot: Any, action: str) -> bool:
+        """Check whether an action will call the LLM; buffered posts are published without it"""
+        if action == "create_post" and post_buffer.stock(bot.user_id):
+            return False
+        return action in LLM_ACTIONS
+
+    def choose_action(self, bot: Any) -> Optional[str]:
+        """Choose the next action for a bot"""
+        # Routed events take priority whenever the LLM has room for a reply
+        if bot.inbox and self._llm_available(bot, "react_to_event"):
+            return "react_to_event"
+
+        candidates = {
+            action: weight for action, weight in self.weights.items()
+            if weight > 0 and (self._llm_available(bot, action) if self._needs_llm(bot, action) else not bot.is_on_cooldown(action))
+        }
+        if not candidates:
+            return None
+        return random.choices(list(candidates), weights=list(candidates.values()), k=1)[0]
+
+    def next_dispatch(self) -> Tuple[Optional[Any], Optional[str]]:
+        """Choose an action by weight among those some tracked bot is eligible for, and a bot for it"""
+        self.cooldowns.advance()
+        candidates = {
+            action: weight for action, weight in self.weights.items()
+            if weight > 0 and self.cooldowns.eligible(action)
+        }
+        while candidates:
+            action = random.choices(list(candidates), weights=list(candidates.values()), k=1)[0]
+            bot = self.cooldowns.pick(action)
+            if not self._needs_llm(bot, action) or self._llm_available(bot, action):
+                self.claim(bot, action)
+                return bot, action
+            # The LLM has no room for this action now; fill the tick with another one
+            del candidates[action]
+        return None, None
+
+    def claim(self, bot: Any, action: str) -> None:
+        """Take a bot out of the pools and reserve the LLM capacity its action needs"""
+        self.counts[action] += 1
+        self.cooldowns.hold(bot)
+        if self._needs_llm(bot, action):
+            estimate = self.estimates[action]
+            self.budget.reserve(estimate)
+            self.reserved[bot.user_id] = estimate
+            self.in_flight[bot.user_id] = None
+
+    def unclaim(self, bot: Any) -> None:
+        """Give back a claim whose action will not run"""
+        reserved = self.reserved.pop(bot.user_id, 0)
+        if reserved:
+            self.budget.settle(reserved, 0)
+            self.in_flight.pop(bot.user_id, None)
+        self.cooldowns.release(bot)
+
+    async def dispatch(self, bot: Any, action: Optional[str] = None) -> bool:
+        """Start an action for a bot; LLM-backed actions continue in the background.
+
+        The action given must come from next_dispatch(), which already claimed
+        the bot; without one, an action is chosen and claimed here.
+        """
+        if action is None:
+            action = self.choose_action(bot)
+            if action is None:
+                logger.info(f"No action available for {bot.name}")
+                return False
+            self.claim(bot, action)
+
+        estimate = self.reserved.pop(bot.user_id, 0)
+        if not estimate:
+            return await self._run(bot, action)
+
+        task = asyncio.create_task(self._run(bot, action, estimate))
+        self.in_flight[bot.user_id] = task
+        task.add_done_callback(lambda t: self.in_flight.pop(bot.user_id, None))
+        logger.info(f"Dispatched {action} for {bot.name} (estimated {estimate:.0f} tokens)")
+        return True
+
+    async def _run(self, bot: Any, action: str, reserved: float = 0) -> bool:
+        """Run an action and account for the tokens it used"""
+        usage = [0]
+        token = _action_tokens.set(usage)
+        try:
+            result = await getattr(bot, action)()
+        except Exception as e:
+            logger.error(f"Error performing {action} for {bot.name}: {e}")
+            result = None
+        finally:
+            self.cooldowns.release(bot)
+            _action_tokens.reset(token)
+
+        if reserved:
+            self.budget.settle(reserved, usage[0])
+            if usage[0]:
+                self.estimates[action] += ESTIMATE_SMOOTHING * (usage[0] - self.estimates[action])
+
+        if result:
+            logger.info(f"Bot {bot.name} successfully performed {action}")
+        else:
+            logger.warning(f"Bot {bot.name} failed to perform {action}")
+        return bool(result)
+
+    async def run_idle(self, action: str, work: Any) -> Any:
+        """Run speculative LLM work for an action, but only while no live action needs the LLM"""
+        estimate = self.estimates[action]
+        if self.in_flight or not self.budget.can_afford(estimate * IDLE_HEADROOM):
+            return None
+        usage = [0]
+        token = _action_tokens.set(usage)
+        self.budget.reserve(estimate)
+        try:
+            return await work()
+        finally:
+            self.budget.settle(estimate, usage[0])
+            _action_tokens.reset(token)
+
+    async def shutdown(self) -> None:
+        """Cancel the LLM-backed actions still in flight"""
+        tasks = [task for task in self.in_flight.values() if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def report(self) -> str:
+        """Summarize the action mix and LLM budget usage"""
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        mix = ", ".join(f"{action}={count}" for action, count in self.counts.most_common())
+        eligible = ", ".join(f"{action}={len(pool)}" for action, pool in self.cooldowns.pools.items())
+        return (
+            f"Action mix: {mix or 'none'} | LLM tokens/s: {self.tokens_used / elapsed:.1f}/{self.budget.rate:.1f} "
+            f"| budget: {self.budget.tokens:.0f}/{self.budget.capacity:.0f} | in flight: {len(self.in_flight)} "
+            f"| eligible bots: {eligible or 'none'}"
+        )
@@ -0,0 +1,130 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type, Union, get_args, get_origin, get_type_hints
+
+# JSON schema types for the field annotations used by the response models
+JSON_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number"}
+
+def _field_schema(annotation: Any) -> Dict[str, Any]:
+    """JSON schema for a single field annotation"""
+    if get_origin(annotation) is Union:
+        # Optional[X] is the only union used by the models
+        inner = [arg for arg in get_args(annotation) if arg is not type(None)][0]
+        return {"type": [JSON_TYPES[inner], "null"]}
+    return {"type": JSON_TYPES[annotation]}
+
+def object_schema(model: Type) -> Dict[str, Any]:
+    """JSON schema for a response model dataclass"""
+    hints = get_type_hints(model)
+    return {
+        "type": "object",
+        "properties": {field.name: _field_schema(hints[field.name]) for field in fields(model)},
+        "required": [field.name for field in fields(model)]
+    }
+
+def response_schema(model: Type, many: bool = False, min_items: int = 1) -> Dict[str, Any]:
+    """JSON schema sent to the LLM for a response model, or a list of them"""
+    if many:
+        return {"type": "array", "items": object_schema(model), "minItems": min_items}
+    return object_schema(model)
+
+def _check_type(value: Any, annotation: Any) -> bool:
+    """Check a parsed JSON value against a field annotation"""
+    if get_origin(annotation) is Union:
+        return value is None or any(_check_type(value, arg) for arg in get_args(annotation) if arg is not type(None))
+    if annotation is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if annotation is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, annotation)
+
+def parse_object(model: Type, data: Any) -> Any:
+    """Validate a parsed JSON object and build the response model from it"""
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected an object for {model.__name__}, got {type(data).__name__}")
+    hints = get_type_hints(model)
+    values = {}
+    for field in fields(model):
+        annotation = hints[field.name]
+        optional = get_origin(annotation) is Union
+        if field.name not in data and not optional:
+            raise ValueError(f"Missing required field '{field.name}' in {model.__name__}")
+        value = data.get(field.name)
+        if not _check_type(value, annotation):
+            raise ValueError(f"Field '{field.name}' in {model.__name__} has invalid type {type(value).__name__}")
+        values[field.name] = value
+    return model(**values)
+
+def parse_response(model: Type, data: Any, many: bool = False, min_items: int = 1) -> Union[Any, List[Any]]:
+    """Validate a parsed JSON response against a response model, or a list of them"""
+    if not many:
+        return parse_object(model, data)
+    if not isinstance(data, list) or len(data) < min_items:
+        raise ValueError(f"Expected at least {min_items} {model.__name__} entries, got {len(data) if isinstance(data, list) else 'non-list'}")
+    return [parse_object(model, item) for item in data]
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    """Parse an ISO date, raising ValueError so the response counts as invalid"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid ISO date for '{name}': {value}")
+
+@dataclass
+class Profile:
+    """Basic profile of a new bot account"""
+    name: str
+    title: str
+    bio: str
+
+@dataclass
+class Experience:
+    """Work experience entry"""
+    title: str
+    company: str
+    location: str
+    startDate: str
+    endDate: Optional[str]
+    current: bool
+    description: str
+    employmentType: str
+    industry: str
+
+    def __post_init__(self):
+        self.start_date = _parse_date(self.startDate, "startDate")
+        self.end_date = _parse_date(self.endDate, "endDate")
+
+@dataclass
+class Skill:
+    """Professional skill"""
+    name: str
+    category: str
+
+@dataclass
+class Education:
+    """Education entry"""
+    school: str
+    degree: str
+    fieldOfStudy: str
+    startDate: str
+    endDate: Optional[str]
+    current: bool
+    grade: Optional[str]
+    activities: Optional[str]
+    description: Optional[str]
+
+    def __post_init__(self):
+        self.start_date = _parse_date(self.startDate, "startDate")
+        self.end_date = _parse_date(self.endDate, "endDate")
+
+@dataclass
+class Content:
+    """Text of a post or comment"""
+    content: str
+
+@dataclass
+class Summary:
+    """Rolling summary of a comment thread"""
+    summary: str
@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Any, Callable, Tuple, Hashable
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+READ_CACHE_SECONDS = float(os.getenv("READ_CACHE_SECONDS", "0.5"))  # identical reads reuse a result this long
+READ_CACHE_PRUNE_SIZE = 1000  # cached reads per collection beyond which expired ones are dropped
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    """Mark a failed load as handled in case every reader was cancelled"""
+    if not task.cancelled():
+        task.exception()
+
+class ReadCoalescer:
+    """Share one storage round trip between identical concurrent reads.
+
+    Reads run on a worker thread; a read that arrives while one with the same
+    namespace and key is in flight awaits the same result, and results stay
+    reusable for READ_CACHE_SECONDS. Results are shared, so callers must not
+    modify the returned documents. Writers call invalidate() for the
+    namespace they changed so bots see their own writes.
+    """
+
+    def __init__(self, cache_seconds: float = READ_CACHE_SECONDS):
+        self.cache_seconds = cache_seconds
+        self.in_flight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        self.cache: Dict[str, Dict[Hashable, Tuple[float, Any]]] = {}
+        self.generations: Counter = Counter()
+        self.requests = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    async def read(self, namespace: str, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Result of load(), shared with identical reads of the namespace"""
+        self.requests += 1
+        cached = self.cache.get(namespace, {}).get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self.cache_hits += 1
+            return cached[1]
+
+        task = self.in_flight.get((namespace, key))
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The load runs in its own task, so cancelling any reader leaves it to the others
+            self.executed += 1
+            task = asyncio.get_running_loop().create_task(self._load(namespace, key, load, self.generations[namespace]))
+            task.add_done_callback(_retrieve_exception)
+            self.in_flight[(namespace, key)] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, namespace: str, key: Hashable, load: Callable[[], Any], generation: int) -> Any:
+        try:
+            result = await asyncio.to_thread(load)
+        finally:
+            self.in_flight.pop((namespace, key), None)
+        # Results loaded before a write to the namespace are not cached
+        if self.cache_seconds > 0 and self.generations[namespace] == generation:
+            cache = self.cache.setdefault(namespace, {})
+            now = time.monotonic()
+            if len(cache) > READ_CACHE_PRUNE_SIZE:
+                for expired in [k for k, (expires, _) in cache.items() if expires <= now]:
+                    del cache[expired]
+            cache[key] = (now + self.cache_seconds, result)
+        return result
+
+    def invalidate(self, namespace: str) -> None:
+        """Forget cached reads of a namespace after writing to it"""
+        self.cache.pop(namespace, None)
+        self.generations[namespace] += 1
+
+    def report(self) -> str:
+        saved = self.coalesced + self.cache_hits
+        rate = saved / self.requests if self.requests else 0
+        return (
+            f"Shared reads: {self.requests} requests, {self.executed} queries, {self.coalesced} coalesced in flight, "
+            f"{self.cache_hits} from cache ({rate:.0%} saved)"
+        )
+
+# Read coalescer shared by all bots
+shared_reads = ReadCoalescer()
@@ -0,0 +1,443 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from itertools import islice
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Any, Set
+from bson import ObjectId, json_util
+from dotenv import load_dotenv
+
+from db import db, users, posts, comments, connections, experiences, skills, education
+from counters import sharded_counters
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")  # "mongo", "memory" or "jsonl"
+JSONL_SINK_FILE = os.getenv("JSONL_SINK_FILE", "simulator_writes.jsonl")  # written by the jsonl backend
+
+# Profile section collections, by the name used in the storage interface
+PROFILE_SECTION_COLLECTIONS = {"experiences": experiences, "skills": skills, "educations": education}
+
+def _project(doc: Optional[Dict[str, Any]], fields: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """Copy of a document with only _id and the given fields"""
+    if doc is None or fields is None:
+        return doc
+    return {key: doc[key] for key in ["_id", *fields] if key in doc}
+
+class Storage(ABC):
+    """Data operations the simulator performs on the social network.
+
+    Documents have the shapes the API uses. Inserts set the document's _id
+    when it has none and return it.
+    """
+
+    # Whether the backend can stream changes to the event router
+    change_streams = False
+
+    # Users
+    @abstractmethod
+    def get_user(self, user_id: ObjectId, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_users(self, user_ids: List[ObjectId], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def find_bot_users(self, limit: int = 0, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Simulator accounts, whose sub starts with "sim-" """
+
+    @abstractmethod
+    def find_bot_user_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def insert_user(self, user: Dict[str, Any]) -> ObjectId:
+        ...
+
+    @abstractmethod
+    def user_ids(self) -> Iterable[ObjectId]:
+        ...
+
+    # Posts
+    @abstractmethod
+    def get_post(self, post_id: ObjectId) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def insert_post(self, post: Dict[str, Any]) -> ObjectId:
+        ...
+
+    @abstractmethod
+    def posts_by_author(self, author: ObjectId, limit: int) -> List[Dict[str, Any]]:
+        """Newest posts of an author"""
+
+    @abstractmethod
+    def recent_posts_by_authors(self, authors: List[ObjectId], limit: int) -> Dict[ObjectId, List[Dict[str, Any]]]:
+        """Newest posts of many authors at once"""
+
+    @abstractmethod
+    def newest_posts(self, limit: int, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Most recently inserted posts, newest first"""
+
+    @abstractmethod
+    def posts_after(self, post_id: Optional[ObjectId], limit: int, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Posts inserted after the given one, oldest first"""
+
+    @abstractmethod
+    def increment_post_counter(self, post_id: ObjectId, field: str, amount: int = 1) -> None:
+        """Add to the likes or comments counter of a post"""
+
+    # Comments
+    @abstractmethod
+    def post_comments(self, post_id: ObjectId) -> List[Dict[str, Any]]:
+        """Comments of a post, oldest first"""
+
+    @abstractmethod
+    def insert_comment(self, comment: Dict[str, Any]) -> ObjectId:
+        ...
+
+    # Connections
+    @abstractmethod
+    def insert_connection(self, connection: Dict[str, Any]) -> ObjectId:
+        ...
+
+    @abstractmethod
+    def pending_requests(self, user_id: ObjectId) -> List[Dict[str, Any]]:
+        """Pending connection requests sent to a user"""
+
+    @abstractmethod
+    def accept_request(self, connection_id: ObjectId, updated_at: datetime) -> bool:
+        """Accept a request unless it was handled already; True if this call accepted it"""
+
+    @abstractmethod
+    def all_connections(self) -> Iterable[Dict[str, Any]]:
+        ...
+
+    # Profile sections
+    @abstractmethod
+    def insert_profile_entries(self, section: str, entries: List[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def profile_sections(self, user_ids: List[ObjectId]) -> Dict[ObjectId, Set[str]]:
+        """Sections each user has at least one entry in"""
+
+    @abstractmethod
+    def backfill_progress(self, user_ids: List[ObjectId]) -> Dict[ObjectId, Set[str]]:
+        """Sections recorded as backfilled per user"""
+
+    @abstractmethod
+    def record_backfill(self, user_id: ObjectId, sections: List[str]) -> None:
+        ...
+
+    def close(self) -> None:
+        """Release the backend's resources"""
+
+def _fields_projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    return {field: 1 for field in fields} if fields is not None else None
+
+class MongoStorage(Storage):
+    """The MongoDB database shared with the API, using each action's consistency profile"""
+
+    change_streams = True
+
+    def get_user(self, user_id, fields=None):
+        return users.find_one({"_id": user_id}, _fields_projection(fields))
+
+    def get_users(self, user_ids, fields=None):
+        return list(users.find({"_id": {"$in": user_ids}}, _fields_projection(fields)))
+
+    def find_bot_users(self, limit=0, fields=None):
+        return list(users.find({"sub": {"$regex": "^sim-"}}, _fields_projection(fields)).limit(limit))
+
+    def find_bot_user_by_name(self, name):
+        return users.find_one({"name": name, "sub": {"$regex": "^sim-"}})
+
+    def insert_user(self, user):
+        return users.for_action("create_account").insert_one(user).inserted_id
+
+    def user_ids(self):
+        return (user["_id"] for user in users.find({}, {"_id": 1}))
+
+    def get_post(self, post_id):
+        # Read from the primary so a post announced by a change event is already visible
+        return posts.for_action("read_post").find_one({"_id": post_id})
+
+    def insert_post(self, post):
+        return posts.for_action("create_post").insert_one(post).inserted_id
+
+    def posts_by_author(self, author, limit):
+        return list(posts.find({"author": author}).sort("timestamp", -1).limit(limit))
+
+    def recent_posts_by_authors(self, authors, limit):
+        # Group the newest posts of every author in a single aggregation
+        pipeline = [
+            {"$match": {"author": {"$in": authors}}},
+            {"$project": {"author": 1, "content": 1, "timestamp": 1}},
+            {"$sort": {"timestamp": -1}},
+            {"$group": {"_id": "$author", "posts": {"$push": "$$ROOT"}}},
+            {"$project": {"posts": {"$slice": ["$posts", limit]}}}
+        ]
+        return {group["_id"]: group["posts"] for group in posts.aggregate(pipeline, allowDiskUse=True)}
+
+    def newest_posts(self, limit, fields=None):
+        return list(posts.find({}, _fields_projection(fields)).sort("_id", -1).limit(limit))
+
+    def posts_after(self, post_id, limit, fields=None):
+        query = {"_id": {"$gt": post_id}} if post_id else {}
+        return list(posts.find(query, _fields_projection(fields)).sort("_id", 1).limit(limit))
+
+    def increment_post_counter(self, post_id, field, amount=1):
+        action = "like_post" if field == "likes" else "comment_on_post"
+        if sharded_counters.enabled:
+            # Spread the write over the post's counter shards; the roll-up updates the post
+            sharded_counters.increment(post_id, field, amount, action)
+        else:
+            posts.for_action(action).update_one({"_id": post_id}, {"$inc": {field: amount}})
+
+    def post_comments(self, post_id):
+        return list(comments.for_action("comment_on_post").find({"post": post_id}, {"author": 1, "content": 1}).sort("createdAt", 1))
+
+    def insert_comment(self, comment):
+        return comments.for_action("comment_on_post").insert_one(comment).inserted_id
+
+    def insert_connection(self, connection):
+        return connections.for_action("send_connection_request").insert_one(connection).inserted_id
+
+    def pending_requests(self, user_id):
+        return list(connections.for_action("accept_connection_request").find({"to": user_id, "status": "pending"}))
+
+    def accept_request(self, connection_id, updated_at):
+        result = connections.for_action("accept_connection_request").update_one(
+            {"_id": connection_id, "status": "pending"},
+            {"$set": {"status": "accepted", "updatedAt": updated_at}}
+        )
+        return result.modified_count > 0
+
+    def all_connections(self):
+        return connections.find({}, {"from": 1, "to": 1, "status": 1})
+
+    def insert_profile_entries(self, section, entries):
+        PROFILE_SECTION_COLLECTIONS[section].for_action("create_account").insert_many(entries)
+
+    def profile_sections(self, user_ids):
+        # Tag the owners of every section document with the section and collect them per user
+        def tagged(section: str) -> List[Dict]:
+            return [
+                {"$match": {"user": {"$in": user_ids}}},
+                {"$group": {"_id": "$user"}},
+                {"$project": {"section": {"$literal": section}}}
+            ]
+        pipeline = tagged("experiences") + [
+            {"$unionWith": {"coll": section, "pipeline": tagged(section)}}
+            for section in PROFILE_SECTION_COLLECTIONS if section != "experiences"
+        ] + [{"$group": {"_id": "$_id", "sections": {"$addToSet": "$section"}}}]
+        return {group["_id"]: set(group["sections"]) for group in experiences.aggregate(pipeline)}
+
+    def backfill_progress(self, user_ids):
+        return {
+            progress["_id"]: set(progress.get("completed", []))
+            for progress in db.profile_backfill.find({"_id": {"$in": user_ids}})
+        }
+
+    def record_backfill(self, user_id, sections):
+        db.profile_backfill.update_one(
+            {"_id": user_id},
+            {"$addToSet": {"completed": {"$each": sections}}, "$set": {"updatedAt": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+class MemoryStorage(Storage):
+    """Process-local storage for benchmarks and tests, indexed for every bot query"""
+
+    def __init__(self):
+        self.users: Dict[ObjectId, Dict[str, Any]] = {}
+        self.posts: Dict[ObjectId, Dict[str, Any]] = {}
+        self.posts_by: Dict[ObjectId, List[Dict[str, Any]]] = defaultdict(list)
+        self.comments_by_post: Dict[ObjectId, List[Dict[str, Any]]] = defaultdict(list)
+        self.connections: Dict[ObjectId, Dict[str, Any]] = {}
+        self.pending: Dict[ObjectId, Dict[ObjectId, Dict[str, Any]]] = defaultdict(dict)
+        self.sections: Dict[ObjectId, Set[str]] = defaultdict(set)
+        self.backfilled: Dict[ObjectId, Set[str]] = defaultdict(set)
+
+    @staticmethod
+    def _with_id(doc: Dict[str, Any]) -> ObjectId:
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()
+        return doc["_id"]
+
+    def get_user(self, user_id, fields=None):
+        return _project(self.users.get(user_id), fields)
+
+    def get_users(self, user_ids, fields=None):
+        return [_project(self.users[user_id], fields) for user_id in user_ids if user_id in self.users]
+
+    def find_bot_users(self, limit=0, fields=None):
+        bots = [_project(user, fields) for user in self.users.values() if str(user.get("sub", "")).startswith("sim-")]
+        return bots[:limit] if limit else bots
+
+    def find_bot_user_by_name(self, name):
+        return next((user for user in self.users.values()
+                     if user.get("name") == name and str(user.get("sub", "")).startswith("sim-")), None)
+
+    def insert_user(self, user):
+        user_id = self._with_id(user)
+        self.users[user_id] = user
+        return user_id
+
+    def user_ids(self):
+        return list(self.users)
+
+    def get_post(self, post_id):
+        return self.posts.get(post_id)
+
+    def insert_post(self, post):
+        post_id = self._with_id(post)
+        self.posts[post_id] = post
+        self.posts_by[post["author"]].append(post)
+        return post_id
+
+    def posts_by_author(self, author, limit):
+        return list(reversed(self.posts_by.get(author, [])[-limit:])) if limit else []
+
+    def recent_posts_by_authors(self, authors, limit):
+        return {author: self.posts_by_author(author, limit) for author in authors if self.posts_by.get(author)}
+
+    def newest_posts(self, limit, fields=None):
+        newest = list(self.posts.values())[-limit:] if limit else []
+        return [_project(post, fields) for post in reversed(newest)]
+
+    def posts_after(self, post_id, limit, fields=None):
+        # Posts are kept in insertion order, which is _id order for generated ids
+        if post_id is None:
+            return [_project(post, fields) for post in islice(self.posts.values(), limit)]
+        newer = []
+        for post in reversed(self.posts.values()):
+            if post["_id"] <= post_id:
+                break
+            newer.append(post)
+        return [_project(post, fields) for post in reversed(newer[-limit:])]
+
+    def increment_post_counter(self, post_id, field, amount=1):
+        post = self.posts.get(post_id)
+        if post is not None:
+            post[field] = post.get(field, 0) + amount
+
+    def post_comments(self, post_id):
+        return list(self.comments_by_post.get(post_id, []))
+
+    def insert_comment(self, comment):
+        comment_id = self._with_id(comment)
+        self.comments_by_post[comment["post"]].append(comment)
+        return comment_id
+
+    def insert_connection(self, connection):
+        connection_id = self._with_id(connection)
+        self.connections[connection_id] = connection
+        if connection.get("status") == "pending":
+            self.pending[connection["to"]][connection_id] = connection
+        return connection_id
+
+    def pending_requests(self, user_id):
+        return list(self.pending.get(user_id, {}).values())
+
+    def accept_request(self, connection_id, updated_at):
+        connection = self.connections.get(connection_id)
+        if connection is None or connection.get("status") != "pending":
+            return False
+        connection["status"] = "accepted"
+        connection["updatedAt"] = updated_at
+        self.pending[connection["to"]].pop(connection_id, None)
+        return True
+
+    def all_connections(self):
+        return list(self.connections.values())
+
+    def insert_profile_entries(self, section, entries):
+        for entry in entries:
+            self._with_id(entry)
+            self.sections[entry["user"]].add(section)
+
+    def profile_sections(self, user_ids):
+        return {user_id: set(self.sections[user_id]) for user_id in user_ids if self.sections.get(user_id)}
+
+    def backfill_progress(self, user_ids):
+        return {user_id: set(self.backfilled[user_id]) for user_id in user_ids if self.backfilled.get(user_id)}
+
+    def record_backfill(self, user_id, sections):
+        self.backfilled[user_id].update(sections)
+
+class JsonlStorage(MemoryStorage):
+    """In-memory storage that also appends every write to a JSON lines file.
+
+    Isolates the content generators from any database: throughput is
+    measured by the lines written, and the file can be inspected or loaded
+    elsewhere afterwards.
+    """
+
+    def __init__(self, path: str = JSONL_SINK_FILE):
+        super().__init__()
+        self.path = path
+        self.file = open(path, "a")
+        self.writes = 0
+
+    def _append(self, op: str, **fields: Any) -> None:
+        self.file.write(json_util.dumps({"op": op, **fields}, separators=(",", ":")) + "\n")
+        self.writes += 1
+
+    def insert_user(self, user):
+        user_id = super().insert_user(user)
+        self._append("insert_user", doc=user)
+        return user_id
+
+    def insert_post(self, post):
+        post_id = super().insert_post(post)
+        self._append("insert_post", doc=post)
+        return post_id
+
+    def increment_post_counter(self, post_id, field, amount=1):
+        super().increment_post_counter(post_id, field, amount)
+        self._append("increment_post_counter", post=post_id, field=field, amount=amount)
+
+    def insert_comment(self, comment):
+        comment_id = super().insert_comment(comment)
+        self._append("insert_comment", doc=comment)
+        return comment_id
+
+    def insert_connection(self, connection):
+        connection_id = super().insert_connection(connection)
+        self._append("insert_connection", doc=connection)
+        return connection_id
+
+    def accept_request(self, connection_id, updated_at):
+        accepted = super().accept_request(connection_id, updated_at)
+        if accepted:
+            self._append("accept_request", connection=connection_id, updatedAt=updated_at)
+        return accepted
+
+    def insert_profile_entries(self, section, entries):
+        super().insert_profile_entries(section, entries)
+        self._append("insert_profile_entries", section=section, docs=entries)
+
+    def close(self) -> None:
+        self.file.close()
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    """Create the configured storage backend"""
+    if backend == "mongo":
+        return MongoStorage()
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "jsonl":
+        return JsonlStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+# Storage used by the simulator
+storage = create_storage()
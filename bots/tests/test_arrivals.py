@@ -0,0 +1,46 @@
+import time
+import asyncio
+
+from arrivals import ArrivalController
+
+def test_wait_yields_when_behind_schedule():
+    async def run():
+        arrivals = ArrivalController(rate=1000, curve="constant")
+        # Fall far behind, so every arrival is already due
+        arrivals.next_due = time.monotonic() - 10
+        finished = []
+
+        async def action(i):
+            finished.append(i)
+
+        for i in range(50):
+            await arrivals.wait()
+            arrivals.start(action(i))
+        await arrivals.wait()
+        # Each wait let the previously started action run, so none piled up
+        return len(finished), arrivals.dropped
+
+    finished, dropped = asyncio.run(run())
+    assert finished == 50
+    assert dropped == 0
+
+def test_lateness_is_reported_when_behind():
+    async def run():
+        arrivals = ArrivalController(rate=10, curve="constant")
+        arrivals.next_due = time.monotonic() - 1
+        return await arrivals.wait()
+
+    assert asyncio.run(run()) >= 1
+
+def test_constant_curve_spaces_arrivals_evenly():
+    arrivals = ArrivalController(rate=4, curve="constant")
+    assert arrivals._next_gap(0) == 0.25
+
+def test_unserved_arrivals_do_not_count_as_achieved():
+    arrivals = ArrivalController(rate=10, curve="constant")
+    arrivals.arrivals = 10
+    arrivals.skip()
+    arrivals.started = time.monotonic() - 1
+    report = arrivals.report()
+    assert "unserved 1" in report
+    assert "achieved 9." in report
@@ -0,0 +1,39 @@
+from bson import ObjectId
+
+from bloom import BloomFilter, RotatingBloomFilter
+
+def test_added_keys_are_found():
+    bloom = BloomFilter(1000)
+    keys = [ObjectId() for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.full
+
+def test_false_positive_rate_is_near_target():
+    bloom = BloomFilter(2000, error_rate=0.01)
+    for _ in range(2000):
+        bloom.add(ObjectId())
+    false_positives = sum(ObjectId() in bloom for _ in range(5000))
+    assert false_positives < 5000 * 0.03
+
+def test_rotation_forgets_the_oldest_generation():
+    liked = RotatingBloomFilter(10)
+    oldest = [ObjectId() for _ in range(10)]
+    middle = [ObjectId() for _ in range(10)]
+    for key in oldest + middle:
+        liked.add(key)
+    assert all(key in liked for key in oldest + middle)
+
+    liked.add(ObjectId())
+    assert all(key in liked for key in middle)
+    assert sum(key in liked for key in oldest) < len(oldest)
+
+def test_state_round_trip():
+    liked = RotatingBloomFilter(5)
+    keys = [ObjectId() for _ in range(8)]
+    for key in keys:
+        liked.add(key)
+    restored = RotatingBloomFilter(5, state=liked.get_state())
+    assert all(key in restored for key in keys)
+    assert restored.current.count == liked.current.count
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+import bot as bot_module
+from bot import Bot
+from schemas import Content
+from storage import MemoryStorage
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryStorage()
+    monkeypatch.setattr(bot_module, "storage", store)
+
+    async def generate_structured(prompt, schema, **kwargs):
+        return Content(content="Thanks for the thoughtful comment!")
+
+    monkeypatch.setattr(bot_module.llm_client, "generate_structured", generate_structured)
+    return store
+
+def test_routed_comment_gets_a_reply_from_the_author(store):
+    author_id = store.insert_user({"sub": "sim-1", "name": "Ada", "title": "Engineer"})
+    commenter_id = store.insert_user({"sub": "sim-2", "name": "Grace", "title": "Admiral"})
+    post_id = store.insert_post({"author": author_id, "content": "Shipping day!", "likes": 0, "comments": 0})
+    comment_id = store.insert_comment({"post": post_id, "author": commenter_id, "content": "Congrats!"})
+
+    author = Bot(str(author_id))
+    author.inbox.append({"type": "comment", "post_id": post_id, "comment": {"_id": comment_id}})
+
+    assert asyncio.run(author.react_to_event())
+    thread = store.post_comments(post_id)
+    assert [comment["author"] for comment in thread] == [commenter_id, author_id]
+    assert store.get_post(post_id)["comments"] == 1
+
+def test_bots_still_skip_commenting_on_their_own_posts(store):
+    author_id = store.insert_user({"sub": "sim-1", "name": "Ada", "title": "Engineer"})
+    post_id = store.insert_post({"author": author_id, "content": "Shipping day!", "likes": 0, "comments": 0})
+
+    author = Bot(str(author_id))
+    assert asyncio.run(author.comment_on_post(store.get_post(post_id))) is None
+    assert store.post_comments(post_id) == []
@@ -0,0 +1,50 @@
+import json
+
+from bson import ObjectId
+
+from bloom import RotatingBloomFilter
+from checkpoint import BITMAP_SUFFIX, load_checkpoint, save_checkpoint
+
+def make_state(liked):
+    return {
+        "version": 1,
+        "savedAt": 1700000000.25,
+        "tick": 7,
+        "resumeToken": None,
+        "bots": {"bot": {"inbox": [], "liked_posts": liked.get_state()}}
+    }
+
+def filled_filter(post_ids):
+    liked = RotatingBloomFilter(2)
+    for post_id in post_ids:
+        liked.add(post_id)
+    return liked
+
+def test_bitmaps_are_stored_outside_the_json(tmp_path):
+    path = str(tmp_path / "state.json")
+    post_ids = [ObjectId() for _ in range(3)]
+    assert save_checkpoint(make_state(filled_filter(post_ids)), path)
+
+    with open(path) as f:
+        saved = json.load(f)
+    assert "bits" not in saved["bots"]["bot"]["liked_posts"]["current"]
+
+    state = load_checkpoint(path)
+    assert state["tick"] == 7
+    restored = RotatingBloomFilter(2, state=state["bots"]["bot"]["liked_posts"])
+    assert all(post_id in restored for post_id in post_ids)
+    assert restored.previous is not None
+
+def test_mismatched_bitmaps_are_dropped(tmp_path):
+    path = str(tmp_path / "state.json")
+    assert save_checkpoint(make_state(filled_filter([ObjectId()])), path)
+    newer = make_state(filled_filter([ObjectId()]))
+    newer["savedAt"] += 1
+    assert save_checkpoint(newer, str(tmp_path / "other.json"))
+    (tmp_path / "other.json").with_suffix(".json" + BITMAP_SUFFIX).replace(path + BITMAP_SUFFIX)
+
+    state = load_checkpoint(path)
+    assert state["bots"]["bot"]["liked_posts"] is None
+
+def test_missing_checkpoint_starts_fresh(tmp_path):
+    assert load_checkpoint(str(tmp_path / "none.json")) is None
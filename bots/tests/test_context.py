@@ -0,0 +1,52 @@
+import asyncio
+
+from bson import ObjectId
+
+from context import ThreadSummaryCache
+
+class FakeSummaryCache(ThreadSummaryCache):
+    def __init__(self, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.fail = fail
+        self.calls = 0
+        self.running = 0
+
+    async def _extend_summary(self, post_content, previous, new_lines):
+        self.calls += 1
+        self.running += 1
+        assert self.running == 1
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return None if self.fail else f"{previous}+{len(new_lines)}"
+
+def test_concurrent_callers_share_one_summary_and_release_the_lock():
+    async def run():
+        cache = FakeSummaryCache()
+        post_id = ObjectId()
+        results = await asyncio.gather(*(cache.summarize(post_id, "post", ["a", "b"]) for _ in range(5)))
+        return cache, results
+
+    cache, results = asyncio.run(run())
+    assert results == ["+2"] * 5
+    assert cache.calls == 1
+    assert cache.locks == {} and not cache.waiters
+
+def test_failed_summaries_leave_no_locks_behind():
+    async def run():
+        cache = FakeSummaryCache(fail=True, max_size=2)
+        for _ in range(10):
+            assert await cache.summarize(ObjectId(), "post", ["a"]) is None
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.locks == {} and not cache.waiters and not cache.entries
+
+def test_cache_is_bounded():
+    async def run():
+        cache = FakeSummaryCache(max_size=2)
+        for _ in range(5):
+            await cache.summarize(ObjectId(), "post", ["a"])
+        return cache
+
+    cache = asyncio.run(run())
+    assert len(cache.entries) == 2 and cache.locks == {}
@@ -0,0 +1,66 @@
+from bson import ObjectId
+
+from counters import ShardedCounters
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the counter updates"""
+
+    def __init__(self):
+        self.docs = {}
+
+    @staticmethod
+    def _key(_id):
+        return tuple(sorted(_id.items())) if isinstance(_id, dict) else _id
+
+    def update_one(self, query, update, upsert=False):
+        key = self._key(query["_id"])
+        if key not in self.docs:
+            if not upsert:
+                return
+            self.docs[key] = {"_id": query["_id"]}
+        for field, amount in update["$inc"].items():
+            self.docs[key][field] = self.docs[key].get(field, 0) + amount
+
+    def find(self, query):
+        return [dict(doc) for doc in self.docs.values()]
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.update_one(operation._filter, operation._doc)
+
+    def delete_many(self, query):
+        for key in [key for key, doc in self.docs.items() if all(doc.get(field) in (0, None) for field in query)]:
+            del self.docs[key]
+
+def test_rollup_moves_shard_totals_into_posts():
+    posts, shards = FakeCollection(), FakeCollection()
+    post_ids = [ObjectId(), ObjectId()]
+    for post_id in post_ids:
+        posts.docs[post_id] = {"_id": post_id, "likes": 0, "comments": 0}
+    counters = ShardedCounters(posts, shards, shards=4)
+
+    for i in range(100):
+        counters.increment(post_ids[i % 2], "likes")
+    counters.increment(post_ids[0], "comments", 3)
+    assert len(shards.docs) <= 8
+
+    assert counters.rollup() == 2
+    assert posts.docs[post_ids[0]] == {"_id": post_ids[0], "likes": 50, "comments": 3}
+    assert posts.docs[post_ids[1]]["likes"] == 50
+    assert shards.docs == {}
+    assert counters.rollup() == 0
+
+def test_increments_after_a_rollup_are_kept():
+    posts, shards = FakeCollection(), FakeCollection()
+    post_id = ObjectId()
+    posts.docs[post_id] = {"_id": post_id, "likes": 0}
+    counters = ShardedCounters(posts, shards, shards=2)
+
+    counters.increment(post_id, "likes")
+    counters.rollup()
+    counters.increment(post_id, "likes")
+    counters.rollup()
+    assert posts.docs[post_id]["likes"] == 2
+
+def test_disabled_without_shards():
+    assert not ShardedCounters(FakeCollection(), FakeCollection(), shards=0).enabled
@@ -0,0 +1,29 @@
+from bson import ObjectId
+
+from graph import SocialGraph
+
+def make_graph(links):
+    graph = SocialGraph()
+    users = [ObjectId() for _ in range(4)]
+    for user in users:
+        graph.node(user)
+    graph._build([(graph.index[users[u]], graph.index[users[v]], status) for u, v, status in links])
+    return graph, users
+
+def test_remove_pending_links_from_the_arrays_and_the_delta():
+    graph, (a, b, c, d) = make_graph([(0, 1, 0), (0, 2, 1)])
+    graph.add_link(a, d)
+
+    assert graph.remove_pending_links([(a, b), (d, a)]) == 2
+    assert not graph.is_linked(a, b)
+    assert not graph.is_linked(a, d)
+    assert graph.friends(a) == [c]
+    assert graph.delta_links == 0
+
+def test_accepted_and_unknown_links_are_kept():
+    graph, (a, b, c, d) = make_graph([(0, 1, 1)])
+    graph.add_link(c, d, accepted=True)
+
+    assert graph.remove_pending_links([(a, b), (c, d), (a, ObjectId())]) == 0
+    assert graph.friends(a) == [b]
+    assert graph.friends(c) == [d]
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+import retention
+from retention import RetentionPass
+
+class FakeConnections:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_many(self, query):
+        self.deleted.extend(query["_id"]["$in"])
+        return SimpleNamespace(deleted_count=len(query["_id"]["$in"]))
+
+def test_expired_requests_are_recorded_for_the_social_graph(monkeypatch):
+    fake = FakeConnections()
+    monkeypatch.setattr(retention, "connections", fake)
+    sim_user, person = ObjectId(), ObjectId()
+    expired = {"_id": ObjectId(), "from": sim_user, "to": person, "status": "pending"}
+    kept = {"_id": ObjectId(), "from": person, "to": sim_user, "status": "pending"}
+
+    retention_pass = RetentionPass(max_age_days=1)
+    retention_pass.sim_users = {sim_user}
+    retention_pass.expire_connections([expired, kept])
+
+    assert fake.deleted == [expired["_id"]]
+    assert retention_pass.removed_requests == [(sim_user, person)]
+    assert retention_pass.deleted["connections"] == 1
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import ActionScheduler, BotPool, CooldownQueue, TokenBudget
+
+class FakeBot:
+    def __init__(self, user_id, post_ready=0, comment_ready=0):
+        self.user_id = user_id
+        self.name = user_id
+        self.inbox = []
+        self.ready = {"create_post": post_ready, "comment_on_post": comment_ready}
+        self.runs = 0
+
+    def next_eligible_tick(self, action):
+        return self.ready.get(action, 0)
+
+    def is_on_cooldown(self, action):
+        return scheduler.current_tick() < self.next_eligible_tick(action)
+
+    async def like_post(self):
+        self.runs += 1
+        await asyncio.sleep(0)
+        return True
+
+    async def create_post(self):
+        self.runs += 1
+        await asyncio.sleep(0)
+        self.ready["create_post"] = scheduler.current_tick() + 5
+        return True
+
+@pytest.fixture
+def tick(monkeypatch):
+    now = [100]
+    monkeypatch.setattr(scheduler, "current_tick", lambda: now[0])
+    return now
+
+def test_bot_pool_add_discard_choice():
+    pool = BotPool()
+    for user_id in "abc":
+        pool.add(user_id)
+    pool.add("a")
+    pool.discard("a")
+    pool.discard("missing")
+    assert len(pool) == 2
+    assert sorted(pool.items) == ["b", "c"]
+    assert pool.positions == {user_id: i for i, user_id in enumerate(pool.items)}
+    assert pool.choice() in ("b", "c")
+
+def test_cooldown_queue_moves_bots_to_pool_when_cooldown_ends(tick):
+    queue = CooldownQueue(["create_post"])
+    ready_bot, waiting_bot = FakeBot("ready"), FakeBot("waiting", post_ready=105)
+    queue.track([ready_bot, waiting_bot])
+    assert queue.eligible("create_post") == 1
+
+    tick[0] = 105
+    queue.advance()
+    assert queue.eligible("create_post") == 2
+
+def test_cooldown_queue_skips_stale_entries(tick):
+    queue = CooldownQueue(["create_post"])
+    bot = FakeBot("bot", post_ready=103)
+    queue.track([bot])
+    bot.ready["create_post"] = 110
+    queue.refresh(bot)
+
+    tick[0] = 104
+    queue.advance()
+    assert queue.eligible("create_post") == 0
+    tick[0] = 110
+    queue.advance()
+    assert queue.eligible("create_post") == 1
+
+def test_held_bots_are_not_picked(tick):
+    queue = CooldownQueue(["like_post"])
+    bot = FakeBot("bot")
+    queue.track([bot])
+    queue.hold(bot)
+    assert queue.pick("like_post") is None
+    queue.release(bot)
+    assert queue.pick("like_post") is bot
+
+def test_next_dispatch_claims_bot_before_the_task_runs(tick):
+    bot = FakeBot("only")
+    actions = ActionScheduler(weights={"like_post": 1}, budget=TokenBudget(1000, 10))
+    actions.track([bot])
+
+    first = actions.next_dispatch()
+    # A second arrival before the first task started finds no eligible bot
+    assert first == (bot, "like_post")
+    assert actions.next_dispatch() == (None, None)
+
+    assert asyncio.run(actions.dispatch(*first))
+    assert actions.next_dispatch() == (bot, "like_post")
+
+def test_llm_capacity_is_reserved_at_claim(tick, monkeypatch):
+    monkeypatch.setattr(scheduler, "LLM_MAX_IN_FLIGHT", 1)
+    bots = [FakeBot("a"), FakeBot("b")]
+    actions = ActionScheduler(weights={"create_post": 1}, budget=TokenBudget(1000, 10))
+    actions.track(bots)
+
+    bot, action = actions.next_dispatch()
+    assert action == "create_post"
+    assert actions.next_dispatch() == (None, None)
+
+    actions.unclaim(bot)
+    assert not actions.in_flight and not actions.reserved
+    assert actions.budget.tokens == pytest.approx(actions.budget.capacity, rel=0.01)
+    assert actions.next_dispatch()[1] == "create_post"
+
+def test_cooldown_started_by_an_action_takes_effect(tick):
+    bot = FakeBot("bot")
+    actions = ActionScheduler(weights={"create_post": 1}, budget=TokenBudget(1000, 10))
+    actions.track([bot])
+
+    async def run():
+        assert await actions.dispatch(*actions.next_dispatch())
+        await asyncio.gather(*[task for task in actions.in_flight.values() if task])
+
+    asyncio.run(run())
+    assert bot.runs == 1
+    assert actions.next_dispatch() == (None, None)
+    tick[0] = 105
+    assert actions.next_dispatch() == (bot, "create_post")
+
+def test_routed_events_go_through_the_weighted_scheduler(tick):
+    quiet, chatty = FakeBot("quiet"), FakeBot("chatty")
+    actions = ActionScheduler(weights={"react_to_event": 1}, budget=TokenBudget(1000, 10))
+    actions.track([quiet, chatty])
+    assert actions.next_dispatch() == (None, None)
+
+    chatty.inbox.append({"type": "post"})
+    actions.notify(chatty)
+    assert actions.next_dispatch() == (chatty, "react_to_event")
+    # Claimed until its reaction finishes, even with events left in the inbox
+    assert actions.next_dispatch() == (None, None)
+
+def test_reacting_needs_llm_budget(tick):
+    bot = FakeBot("bot")
+    bot.inbox.append({"type": "post"})
+    budget = TokenBudget(1, 1)
+    budget.tokens = 0
+    actions = ActionScheduler(weights={"react_to_event": 1, "like_post": 1}, budget=budget)
+    actions.track([bot])
+    assert actions.next_dispatch() == (bot, "like_post")
+
+def test_inline_actions_do_not_leak_their_usage_counter(tick):
+    bot = FakeBot("bot")
+    actions = ActionScheduler(weights={"like_post": 1}, budget=TokenBudget(1000, 10))
+    actions.track([bot])
+
+    async def run():
+        assert await actions.dispatch(*actions.next_dispatch())
+        # Tokens used later in the main task are not charged to the finished action
+        return scheduler._action_tokens.get()
+
+    assert asyncio.run(run()) is None
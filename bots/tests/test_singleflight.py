@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from singleflight import ReadCoalescer
+
+def test_identical_concurrent_reads_share_one_load():
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"name": "Ada"}
+
+    async def run():
+        reads = ReadCoalescer(cache_seconds=0)
+        results = await asyncio.gather(*(reads.read("users", "ada", load) for _ in range(5)))
+        return reads, results
+
+    reads, results = asyncio.run(run())
+    assert results == [{"name": "Ada"}] * 5
+    assert len(calls) == 1
+    assert reads.coalesced == 4
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    release = threading.Event()
+
+    def load():
+        release.wait(5)
+        return "value"
+
+    async def run():
+        reads = ReadCoalescer(cache_seconds=0)
+        leader = asyncio.create_task(reads.read("posts", "p", load))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(reads.read("posts", "p", load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, reads.executed
+
+    assert asyncio.run(run()) == ("value", 1)
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        raise RuntimeError("down")
+
+    async def run():
+        reads = ReadCoalescer(cache_seconds=10)
+        results = await asyncio.gather(*(reads.read("users", "u", load) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await reads.read("users", "u", load)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 2
+
+def test_invalidate_drops_cached_and_in_flight_results():
+    values = iter(["old", "new"])
+
+    async def run():
+        reads = ReadCoalescer(cache_seconds=10)
+        pending = asyncio.create_task(reads.read("comments", "thread", lambda: next(values)))
+        await asyncio.sleep(0)
+        reads.invalidate("comments")
+        first = await pending
+        return first, await reads.read("comments", "thread", lambda: next(values))
+
+    assert asyncio.run(run()) == ("old", "new")
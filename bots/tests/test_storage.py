@@ -0,0 +1,92 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from populate import BULK_SUB_PREFIX
+from storage import JsonlStorage, MemoryStorage, create_storage
+
+@pytest.fixture
+def store():
+    return MemoryStorage()
+
+def add_user(store, name, sub="sim-1"):
+    return store.insert_user({"sub": sub, "name": name, "title": "Engineer"})
+
+def test_users(store):
+    bot_id = add_user(store, "Ada")
+    person_id = add_user(store, "Grace", sub="auth0|1")
+
+    assert store.get_user(bot_id)["name"] == "Ada"
+    assert store.get_user(bot_id, ["name"]) == {"_id": bot_id, "name": "Ada"}
+    assert [user["_id"] for user in store.find_bot_users()] == [bot_id]
+    assert store.find_bot_user_by_name("Ada")["_id"] == bot_id
+    assert store.find_bot_user_by_name("Grace") is None
+    assert [user["_id"] for user in store.get_users([person_id, ObjectId()])] == [person_id]
+    assert set(store.user_ids()) == {bot_id, person_id}
+
+def test_populated_users_are_not_bots(store):
+    bot_id = add_user(store, "Ada")
+    add_user(store, "Grace", sub=f"{BULK_SUB_PREFIX}42-0")
+
+    assert [user["_id"] for user in store.find_bot_users()] == [bot_id]
+    assert store.find_bot_user_by_name("Grace") is None
+    assert not BULK_SUB_PREFIX.startswith("sim-")
+
+def test_posts_are_ordered_and_paged(store):
+    author = add_user(store, "Ada")
+    post_ids = [store.insert_post({"author": author, "content": str(i), "likes": 0, "comments": 0}) for i in range(5)]
+
+    assert [post["content"] for post in store.posts_by_author(author, 3)] == ["4", "3", "2"]
+    assert [post["content"] for post in store.newest_posts(2, ["content"])] == ["4", "3"]
+    assert [post["content"] for post in store.posts_after(post_ids[1], 2)] == ["2", "3"]
+    assert [post["content"] for post in store.posts_after(None, 2)] == ["0", "1"]
+    assert store.posts_after(post_ids[-1], 10) == []
+    assert [post["content"] for post in store.recent_posts_by_authors([author, ObjectId()], 1)[author]] == ["4"]
+
+def test_counters_and_comments(store):
+    author = add_user(store, "Ada")
+    post_id = store.insert_post({"author": author, "content": "hi", "likes": 0, "comments": 0})
+    store.increment_post_counter(post_id, "likes")
+    store.increment_post_counter(post_id, "likes", 2)
+    store.increment_post_counter(ObjectId(), "likes")
+    comment_id = store.insert_comment({"post": post_id, "author": author, "content": "first"})
+
+    assert store.get_post(post_id)["likes"] == 3
+    assert [comment["_id"] for comment in store.post_comments(post_id)] == [comment_id]
+
+def test_connection_requests_are_accepted_once(store):
+    sender, receiver = add_user(store, "Ada"), add_user(store, "Grace")
+    request_id = store.insert_connection({"from": sender, "to": receiver, "status": "pending"})
+    now = datetime.now(timezone.utc)
+
+    assert [request["_id"] for request in store.pending_requests(receiver)] == [request_id]
+    assert store.accept_request(request_id, now)
+    assert not store.accept_request(request_id, now)
+    assert store.pending_requests(receiver) == []
+    assert [conn["status"] for conn in store.all_connections()] == ["accepted"]
+
+def test_profile_sections_and_backfill(store):
+    user_id = add_user(store, "Ada")
+    store.insert_profile_entries("skills", [{"user": user_id, "name": "Python"}])
+    store.record_backfill(user_id, ["experiences"])
+
+    assert store.profile_sections([user_id, ObjectId()]) == {user_id: {"skills"}}
+    assert store.backfill_progress([user_id]) == {user_id: {"experiences"}}
+
+def test_jsonl_storage_appends_writes(tmp_path):
+    path = tmp_path / "writes.jsonl"
+    store = JsonlStorage(str(path))
+    author = add_user(store, "Ada")
+    post_id = store.insert_post({"author": author, "content": "hi"})
+    store.increment_post_counter(post_id, "likes")
+    store.close()
+
+    ops = [json.loads(line)["op"] for line in path.read_text().splitlines()]
+    assert ops == ["insert_user", "insert_post", "increment_post_counter"]
+    assert store.get_post(post_id)["likes"] == 1
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_storage("sqlite")
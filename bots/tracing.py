@@ -0,0 +1,195 @@
+"""Action traces: record what the bots did, and replay it as a repeatable workload.
+
+While TRACE_FILE is set, the simulator appends one compact JSON line per
+executed bot action with everything needed to redo its writes (ids,
+targets and generated content), after a header with the bot accounts.
+Replaying re-executes those writes in order against the configured
+database, at the original pace, scaled by --speed, or as fast as possible:
+
+    MONGODB_URI=mongodb://localhost:27017/nexus-bench python tracing.py simulator_trace.jsonl --speed 0
+
+Created documents keep their recorded ids, so replays against a database
+seeded the same way (e.g. populate.py with the same seed) are identical.
+"""
+import os
+import time
+import random
+import logging
+import argparse
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Iterator
+from bson import ObjectId, json_util
+from dotenv import load_dotenv
+
+from db import users, posts, comments, connections
+
+# Configure logging
+logger = logging.getLogger("network-nexus-simulator")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+TRACE_FILE = os.getenv("TRACE_FILE", "")  # record executed actions to this file when set
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "5"))  # seconds between trace file flushes
+TRACE_VERSION = 1
+
+class TraceRecorder:
+    """Append-only recorder of executed bot actions, disabled without a path"""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self.file = None
+        self.started = 0.0
+        self.last_flush = 0.0
+        self.records = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.file is not None
+
+    def start(self, bots: List[Any], seed: Optional[int] = None) -> None:
+        """Open the trace file and write the header with the bot accounts"""
+        if not self.path:
+            return
+        self.file = open(self.path, "a")
+        self.started = self.last_flush = time.monotonic()
+        self._write({
+            "type": "header",
+            "version": TRACE_VERSION,
+            "startedAt": datetime.now(timezone.utc),
+            "seed": seed,
+            "users": [bot.user for bot in bots]
+        })
+        logger.info(f"Recording action trace to {self.path}")
+
+    def record(self, action: str, bot_id: Any, **fields: Any) -> None:
+        """Append an executed action with its offset from the start of the run"""
+        if self.file is None:
+            return
+        self._write({"type": "action", "t": round(time.monotonic() - self.started, 3), "action": action, "bot": bot_id, **fields})
+        self.records += 1
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self.file.write(json_util.dumps(record, separators=(",", ":")) + "\n")
+        now = time.monotonic()
+        if now - self.last_flush >= TRACE_FLUSH_INTERVAL:
+            self.file.flush()
+            self.last_flush = now
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            logger.info(f"Recorded {self.records} actions to {self.path}")
+
+# Trace recorder shared by all bots
+action_trace = TraceRecorder()
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """Read the records of a trace file, skipping a truncated last line"""
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json_util.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable trace line: {line[:80]}")
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def replay_action(record: Dict[str, Any]) -> None:
+    """Re-execute the database writes of one recorded action"""
+    action = record["action"]
+    bot_id = ObjectId(record["bot"])
+    current_time = _now()
+    if action == "create_post":
+        posts.insert_one({
+            "_id": record["_id"], "author": bot_id, "content": record["content"], "timestamp": current_time,
+            "likes": 0, "comments": 0, "createdAt": current_time, "updatedAt": current_time
+        })
+    elif action == "comment_on_post":
+        comments.insert_one({
+            "_id": record["_id"], "post": record["post"], "author": bot_id, "content": record["content"],
+            "createdAt": current_time, "updatedAt": current_time
+        })
+        posts.update_one({"_id": record["post"]}, {"$inc": {"comments": 1}})
+    elif action == "like_post":
+        posts.update_one({"_id": record["post"]}, {"$inc": {"likes": 1}})
+    elif action == "send_connection_request":
+        connections.insert_one({
+            "_id": record["_id"], "from": bot_id, "to": record["to"], "status": "pending",
+            "createdAt": current_time, "updatedAt": current_time
+        })
+    elif action == "accept_connection_request":
+        connections.update_one(
+            {"_id": record["_id"], "status": "pending"},
+            {"$set": {"status": "accepted", "updatedAt": current_time}}
+        )
+    else:
+        raise ValueError(f"Unknown action in trace: {action}")
+
+def replay(path: str, speed: float = 1.0, seed: Optional[int] = None, limit: Optional[int] = None) -> None:
+    """Replay a trace; speed 1 keeps the original pace, 0 runs as fast as possible"""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    max_lag = 0.0
+    count = 0
+    started = time.monotonic()
+
+    for record in read_trace(path):
+        if record.get("type") == "header":
+            if record.get("version") != TRACE_VERSION:
+                raise ValueError(f"Unsupported trace version {record.get('version')}")
+            # Seed from the recorded run unless overridden, for anything random downstream
+            random.seed(seed if seed is not None else record.get("seed"))
+            for user in record.get("users", []):
+                users.replace_one({"_id": user["_id"]}, user, upsert=True)
+            logger.info(f"Replaying trace {path} with {len(record.get('users', []))} bots at speed {speed or 'max'}")
+            continue
+
+        if limit is not None and count >= limit:
+            break
+        if speed > 0:
+            due = started + record["t"] / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+
+        action_start = time.perf_counter()
+        try:
+            replay_action(record)
+        except Exception as e:
+            errors[record["action"]] += 1
+            logger.debug(f"Failed to replay {record['action']}: {e}")
+        latencies[record["action"]].append(time.perf_counter() - action_start)
+        count += 1
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    logger.info(f"Replayed {count} actions in {elapsed:.1f}s ({count / elapsed:.1f} actions/s, max lag {max_lag:.3f}s)")
+    for action, samples in sorted(latencies.items()):
+        samples.sort()
+        p50 = samples[len(samples) // 2] * 1000
+        p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000
+        logger.info(f"{action}: {len(samples)} actions, p50 {p50:.1f}ms, p99 {p99:.1f}ms, {errors[action]} errors")
+
+if __name__ == "__main__":
+    from logging_setup import setup_logging, stop_logging
+
+    parser = argparse.ArgumentParser(description="Replay a recorded action trace against the configured database")
+    parser.add_argument("trace", help="trace file written with TRACE_FILE")
+    parser.add_argument("--speed", type=float, default=1.0, help="pace multiplier, 0 for as fast as possible")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, defaults to the recorded one")
+    parser.add_argument("--limit", type=int, default=None, help="replay at most this many actions")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        replay(args.trace, args.speed, args.seed, args.limit)
+    except KeyboardInterrupt:
+        logger.info("Replay interrupted")
+    finally:
+        stop_logging()